@@ -0,0 +1,96 @@
+"""
+Асинхронный фасад над Backend для GUI (Flet вызывает async-обработчики событий в своем цикле asyncio).
+Чтение и запись файлов/хранилища, вход (загрузка календаря) и тяжелые запросы выполняются в отдельном потоке
+через asyncio.to_thread, поэтому медленное сохранение не замораживает окно.
+Вызовы одного фасада выполняются по одному (asyncio.Lock), в том порядке, в котором их сделал пользователь.
+Все обращения к данным идут через методы Backend, которые берут его блокировки; календари напрямую не читаются.
+"""
+import asyncio
+from datetime import datetime, time, timedelta
+
+
+class AsyncBackend:
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = asyncio.Lock()
+
+    async def _run(self, func, *args, **kwargs):
+        """Выполняет func(*args, **kwargs) в отдельном потоке, не блокируя цикл событий."""
+        async with self._lock:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    @property
+    def logged_in_user(self):
+        return self.backend.logged_in_user
+
+    async def load_user_data(self):
+        return await self._run(self.backend.load_user_data)
+
+    async def save_user_data(self):
+        return await self._run(self.backend.save_user_data)
+
+    async def load_calendar_data(self):
+        return await self._run(self.backend.load_calendar_data)
+
+    async def save_calendar_data(self):
+        return await self._run(self.backend.save_calendar_data)
+
+    async def login(self, username, password):
+        return await self._run(self.backend.login, username, password)
+
+    async def logout(self):
+        return await self._run(self.backend.logout)
+
+    async def create_user(self, username, password):
+        return await self._run(self.backend.create_user, username, password)
+
+    async def drop_password(self, username, password):
+        return await self._run(self.backend.drop_password, username, password)
+
+    def validate_pass_by_regexp(self, password):
+        return self.backend.validate_pass_by_regexp(password)
+
+    async def create_event(self, *args, **kwargs):
+        return await self._run(self.backend.create_event, *args, **kwargs)
+
+    async def update_event(self, event, **kwargs):
+        return await self._run(self.backend.update_event, event, **kwargs)
+
+    async def delete_event(self, event):
+        return await self._run(self.backend.delete_event, event)
+
+    async def invite_participants(self, event, participants):
+        return await self._run(self.backend.invite_participants, event, participants)
+
+    async def accept_invitation(self, event, check_conflicts=False):
+        return await self._run(self.backend.accept_invitation, event, check_conflicts)
+
+    async def decline_invitation(self, event):
+        return await self._run(self.backend.decline_invitation, event)
+
+    async def get_unread_notifications(self):
+        """Непрочитанные уведомления текущего пользователя (список), они помечаются прочитанными."""
+        return await self._run(lambda: list(self.backend.get_unread_notifications()))
+
+    async def get_events_in_range(self, start_date, end_date):
+        """События текущего пользователя в промежутке, сгруппированные по дням (см. Calendar.get_events_in_range)."""
+        return await self.get_user_events_in_range(self.backend.logged_in_user, start_date, end_date)
+
+    async def get_user_events_in_range(self, user, start_date, end_date):
+        return await self._run(self.backend.get_user_events_in_range, user, start_date, end_date)
+
+    async def get_coming_events(self):
+        """События текущего пользователя на ближайшую неделю, сгруппированные по дням."""
+        today = datetime.now()
+        return await self.get_events_in_range(today, today + timedelta(weeks=1))
+
+    async def get_today_events(self):
+        """События текущего пользователя на сегодня, сгруппированные по дням (без пауз консольной версии)."""
+        today = datetime.now().date()
+        return await self.get_events_in_range(datetime.combine(today, time.min), datetime.combine(today, time(23, 59)))
+
+    async def find_common_free_slots(self, users, window, duration):
+        return await self._run(self.backend.find_common_free_slots, users, window, duration)
+
+    async def find_conflicts(self, *args, **kwargs):
+        return await self._run(self.backend.find_conflicts, *args, **kwargs)
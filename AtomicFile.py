@@ -0,0 +1,117 @@
+"""
+Атомарная запись файлов: новое содержимое пишется во временный файл рядом с целевым,
+сбрасывается на диск (fsync) и переименовывается на место целевого (os.replace атомарен).
+При сбое посреди записи на диске остается прежний файл целиком, а не обрезанный.
+
+Несколько файлов одного сохранения (снимок календарей и его индекс) записываются группой:
+сначала все временные файлы сбрасываются на диск, затем переименовываются,
+и каждый каталог синхронизируется один раз - вместо fsync после каждого файла.
+"""
+import os
+import secrets
+
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+
+
+def fsync_directory(directory):
+    """Сбрасывает на диск запись каталога (результат переименования). В Windows каталог открыть нельзя - пропускается."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AtomicWrites:
+    """Группа атомарных записей. Использование:
+
+        with AtomicWrites() as writes:
+            with writes.open('calendars.json', 'wb') as f: ...
+            with writes.open('calendars.json.idx', 'w', encoding='utf-8') as f: ...
+
+    При выходе из блока без ошибки файлы заменяются (commit), при ошибке временные файлы удаляются (abort).
+    commit можно разделить на sync (запись на диск) и replace (переименование), например,
+    чтобы переименовать файлы под блокировкой после проверки версии."""
+
+    def __init__(self):
+        self._files = []  # (файл, временный путь, целевой путь)
+        self._synced = False
+
+    def open(self, path, mode='wb', **kwargs):
+        """Открывает временный файл для path, содержимое станет содержимым path после commit."""
+        prefix = os.path.join(os.path.dirname(os.path.abspath(path)), os.path.basename(path))
+        while True:  # новое случайное имя, если файл с таким именем уже есть
+            temp_path = f'{prefix}.{secrets.token_hex(4)}.tmp'
+            try:
+                fd = os.open(temp_path, _TEMP_FLAGS, 0o666)  # права, как у open(): 0o666 без битов umask
+                break
+            except FileExistsError:
+                continue
+        try:
+            try:  # после замены права существующего файла должны остаться прежними
+                os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            f = os.fdopen(fd, mode, **kwargs)
+        except BaseException:
+            os.close(fd)
+            os.remove(temp_path)
+            raise
+        self._files.append((f, temp_path, path))
+        return f
+
+    def sync(self):
+        """Сбрасывает все временные файлы на диск."""
+        for f, temp_path, _ in self._files:
+            if f.closed:  # файл уже закрыт вызывающим кодом (блок with)
+                fd = os.open(temp_path, os.O_RDWR)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            else:
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+        self._synced = True
+
+    def replace(self):
+        """Переименовывает временные файлы на место целевых (в порядке открытия) и синхронизирует каталоги."""
+        if not self._synced:
+            self.sync()
+        directories = []
+        for _, temp_path, path in self._files:
+            os.replace(temp_path, path)
+            directory = os.path.dirname(os.path.abspath(path))
+            if directory not in directories:
+                directories.append(directory)
+        self._files = []
+        for directory in directories:
+            fsync_directory(directory)
+
+    commit = replace
+
+    def abort(self):
+        """Удаляет временные файлы, целевые файлы не меняются."""
+        for f, temp_path, _ in self._files:
+            f.close()
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+        self._files = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+        return False
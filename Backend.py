@@ -6,38 +6,122 @@
 (пароли пользователей хранятся как hash)
 
 Должен быть статическим или Синглтоном
+Данные общие для всего процесса, а вошедший пользователь - один на экземпляр: чтобы с одними данными
+работали несколько пользователей одновременно (сервер), каждому открывается сеанс (open_session, см. Session).
+Методы, которые действуют от имени вошедшего пользователя, принимают сеанс аргументом session
+(по умолчанию - вход самого Backend).
+Реестры пользователей и событий и счетчики id (User, Event, Notification) тоже общие для процесса,
+reset() возвращает к начальному состоянию и Backend, и реестры.
 
 *) Нужно хранить для каждого пользователя все события которые с ним произошли, но ещё не были обработаны.
 """
 import csv
+import functools
 import hashlib
+import inspect
 import json
 import os
 import re
+import threading
 import uuid
-from datetime import datetime, time
-from time import sleep, strftime, localtime
+import weakref
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, time, timedelta
+from time import strftime, localtime
 from typing import List
 
-from Calendar import Calendar
+from AtomicFile import AtomicWrites
+from Calendar import Calendar, RepetitionError
 from Event import Event
+from FileLock import VersionLock
+from FreeBusy import free_slots, join_days
+from IdAllocator import IdAllocator
+from Journal import Journal
+from LazyCalendars import LazyCalendars
+from Locks import LockStripes, SharedLock
 from Notification import Notification
+from NotificationDispatcher import NotificationDispatcher
+from Serializer import JsonSerializer
+from Session import Session
 from User import User
 
+EVENT_KEY_PREFIX = '#'  # ключи таблицы событий в снимке ('#<event_id>'), имена пользователей не содержат '#'
+
 class AuthenticationError(Exception):
     pass
 class PermissionError(Exception):
     pass
+class ConflictError(Exception):
+    """Событие пересекается по времени с другими событиями календаря (список в conflicts)."""
+    def __init__(self, conflicts):
+        super().__init__('Событие пересекается с другими событиями: ' +
+                         ', '.join(f"{c.title} ({c.start_time.strftime('%d.%m.%Y %H:%M')})" for c in conflicts))
+        self.conflicts = conflicts
+class StaleDataError(Exception):
+    """Данные сохранил другой процесс после того, как этот процесс их загрузил: сохранение отменено."""
+    pass
+
+
+def synchronized(method):
+    """Выполняет метод под исключительной блокировкой Backend.lock: загрузка, сохранение (в том числе фоновое,
+    см. WriteBehind) и изменение списка пользователей не пересекаются с другими операциями."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def locking(*targets):
+    """Выполняет метод под разделяемой блокировкой Backend.lock и блокировками календарей и события, которые он
+    меняет. targets - имена аргументов метода: событие (Event), пользователь или список пользователей;
+    календарь пользователя сеанса (аргумент session, по умолчанию - сам Backend) блокируется всегда
+    (см. Backend._locked)."""
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            arguments = signature.bind(self, *args, **kwargs).arguments
+            session = arguments.get('session') or self
+            with self._locked(session.logged_in_user, *(arguments.get(name) for name in targets)):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
 
 
 class Backend:
     __instance = None
+    lock = SharedLock()  # блокировка данных: разделяемая для операций с календарями, исключительная - для сохранения
+    stripes = LockStripes()  # блокировки календарей и событий (см. locking)
+    _calendars_lock = threading.RLock()  # создание и загрузка календарей в словаре calendars, создание журналов
     users = {}
     calendars = {}
     logged_in_user = None
     current_calendar = None
     users_storage_file = 'users.csv'
     calendars_storage_file = 'calendars.json'
+    journal_storage_file = None  # по умолчанию рядом с calendars_storage_file, с расширением .journal
+    use_journal = False  # режим хранения: дописывать изменения в журнал вместо перезаписи calendars.json
+    journal_compaction_threshold = 1000  # количество записей журнала, после которого он сворачивается в снимок
+    _journal = None
+    storage = None  # подключаемое хранилище (например, SqliteStorage), None - файлы users.csv и calendars.json
+    _calendar_offsets = {}  # username -> [смещение, длина] записи календаря в файле снимка
+    _event_offsets = {}  # event_id -> [смещение, длина] записи события в таблице событий снимка
+    _deleted_event_ids = set()  # удаленные события, которые не нужно копировать из старого снимка
+    serializer = JsonSerializer()  # формат снимка календарей (см. Serializer.get_serializer)
+    ids_storage_file = None  # счетчики id, по умолчанию рядом с calendars_storage_file, с расширением .ids
+    id_block_size = 100  # сколько id процесс резервирует за одно обращение к счетчику
+    _dispatcher = None
+    _calendars_version = 0  # версия снимка календарей, с которой работает процесс (см. FileLock.VersionLock)
+    _offsets_version = 0  # версия снимка, к которой относятся _calendar_offsets и _event_offsets
+    _changed_users = set()  # пользователи, созданные или измененные этим процессом и еще не сохраненные
+    _unsaved = []  # записи об изменениях после последнего сохранения снимка (без журнала и хранилища)
+    _locks = {}  # путь к файлу данных -> VersionLock
+    _sessions = weakref.WeakSet()  # открытые сеансы (см. open_session)
+    notification_retention = 100  # сколько прочитанных уведомлений хранится в календаре, остальные уходят в архив
+    notification_archive_file = None  # архив уведомлений, по умолчанию рядом с calendars_storage_file (.archive)
+    _notification_archive = None
 
 
     def __new__(cls, *args, **kwargs):
@@ -46,9 +130,29 @@ class Backend:
 
         return cls.__instance
 
+    @synchronized
+    def reset(self):
+        """Возвращает Backend к начальному состоянию: настройки и вход по умолчанию, без пользователей,
+        календарей, событий и открытых сеансов (например, между тестами)."""
+        vars(self).clear()  # значения по умолчанию - атрибуты класса
+        self.users, self.calendars = {}, {}
+        self._calendar_offsets, self._event_offsets, self._deleted_event_ids = {}, {}, set()
+        self._changed_users, self._unsaved, self._locks = set(), [], {}
+        self._sessions = weakref.WeakSet()
+        User._usernames.clear()
+        User._users_by_username.clear()
+        Event.events_map.clear()
+        Event.count = 1
+        Event.id_allocator = Notification.id_allocator = None
+
+    @synchronized
     def load_user_data(self):
-        """Загружает данные из CSV-файлов в переменные класса."""
-        if os.path.exists(self.users_storage_file):
+        """Загружает данные из CSV-файлов (или из подключенного хранилища) в переменные класса."""
+        if self.storage is not None:
+            for username, password_hash in self.storage.load_users():
+                if username not in self.users:
+                    self.users[username] = User(username, password_hash)
+        elif os.path.exists(self.users_storage_file):
             with open(self.users_storage_file, mode='r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
                 for row in reader:
@@ -58,41 +162,441 @@ class Backend:
                         password_hash = row['password']
                         self.users[username] = User(username, password_hash)
 
+    @synchronized
     def save_user_data(self):
-        """Сохраняет данные в CSV-файлы."""
-        with open(self.users_storage_file, 'w', newline='', encoding='utf-8') as file:
-            fieldnames = ['user_id', 'username', 'password']
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            for user in self.users.values():
-                writer.writerow({'user_id': user.user_id, 'username': user.username, 'password': user.get_password()})
-
+        """Сохраняет данные в CSV-файлы (или в подключенное хранилище)."""
+        if self.storage is not None:
+            self.storage.save_users(self.users.values())
+            return
+        # файл пользователей могут менять и другие процессы: под блокировкой сначала читаются их изменения,
+        # затем файл атомарно заменяется
+        with self._version_lock(self.users_storage_file).acquire(exclusive=True) as lock:
+            self._merge_user_data()
+            with AtomicWrites() as writes:
+                file = writes.open(self.users_storage_file, 'w', newline='', encoding='utf-8')
+                fieldnames = ['user_id', 'username', 'password']
+                writer = csv.DictWriter(file, fieldnames=fieldnames)
+                writer.writeheader()
+                for user in self.users.values():
+                    writer.writerow({'user_id': user.user_id, 'username': user.username, 'password': user.get_password()})
+            lock.bump()
+        self._changed_users = set()
+
+    def _merge_user_data(self):
+        """Добавляет пользователей, сохраненных другими процессами, и их новые пароли
+        (кроме пользователей, измененных этим процессом)."""
+        if not os.path.exists(self.users_storage_file):
+            return
+        with open(self.users_storage_file, mode='r', encoding='utf-8') as file:
+            for row in csv.DictReader(file):
+                username = row['username']
+                if username in self._changed_users:
+                    continue
+                if username in self.users:
+                    self.users[username].set_password(row['password'])
+                elif not User.is_username_taken(username):
+                    self.users[username] = User(username, row['password'])
+
+
+    @property
+    def journal(self):
+        """Журнал изменений календарей (см. Journal)."""
+        path = self.journal_storage_file or os.path.splitext(self.calendars_storage_file)[0] + '.journal'
+        with self._calendars_lock:  # один объект журнала на все потоки
+            if self._journal is None or self._journal.path != path:
+                self._journal = Journal(path)
+            return self._journal
+
+    @contextmanager
+    def _locked(self, *targets):
+        """Удерживает разделяемую блокировку данных и блокировки календарей пользователей из targets, организатора и участников событий из targets, а также самих событий.
+        Пока блокировки берутся, у события могут появиться новые участники: тогда набор блокировок
+        расширяется, и они берутся заново (в общем порядке, см. LockStripes)."""
+        with self.lock.shared():
+            keys = self._lock_keys(targets)
+            while True:
+                with self.stripes.hold(keys):
+                    missing = self._lock_keys(targets) - keys
+                    if not missing:
+                        yield
+                        return
+                keys |= missing
+
+    def _lock_keys(self, targets):
+        users, keys = [], set()
+        for target in targets:
+            if isinstance(target, Event):
+                keys.add(('event', target.event_id))
+                users.append(target.organizer)
+                users.extend(target.participants)
+            elif target is None or isinstance(target, User):
+                users.append(target)
+            else:
+                users.extend(target)
+        keys.update(('calendar', user.username) for user in users if isinstance(user, User))
+        return keys
+
+    def _version_lock(self, path):
+        """Файл блокировки с версией для файла данных path (рядом с ним, с расширением .lock)."""
+        if path not in self._locks:
+            self._locks[path] = VersionLock(path + '.lock')
+        return self._locks[path]
+
+    @property
+    def notification_archive(self):
+        """Архив прочитанных уведомлений (журнал в отдельном файле, в него только дописываются записи)."""
+        path = self.notification_archive_file or os.path.splitext(self.calendars_storage_file)[0] + '.archive'
+        with self._calendars_lock:
+            if self._notification_archive is None or self._notification_archive.path != path:
+                self._notification_archive = Journal(path)
+            return self._notification_archive
+
+    def _record(self, op, **data):
+        """Запоминает изменение для подключенного хранилища или для журнала, если включен режим хранения с журналом.
+        Без них запись хранится в памяти до сохранения снимка: по ней изменение переносится в снимок,
+        если его успел сохранить другой процесс (см. _merge_calendar_data)."""
+        if self.storage is not None:
+            self.storage.append(op, **data)
+        elif self.use_journal:
+            self.journal.append(op, **data)
+        else:
+            self._unsaved.append({'op': op, **data})
 
+    @synchronized
     def save_calendar_data(self):
-        """Сохраняет данные календаря в JSON-файл."""
-        with open(self.calendars_storage_file, 'w', encoding='utf-8') as f:
-            json.dump({username: calendar.to_dict() for username, calendar in self.calendars.items()}, f, indent=4)
+        """Сохраняет данные календаря.
+        В режиме журнала дописывает только накопленные изменения, иначе перезаписывает снимок целиком.
+        Подключенное хранилище сохраняет только накопленные изменения.
+        Если снимок успел сохранить другой процесс, изменения этого процесса переносятся в его снимок
+        (см. _merge_calendar_data); в режиме журнала изменения уже в общем журнале, и сворачивание просто
+        откладывается."""
+        if self.storage is not None:
+            self.storage.flush()
+        elif self.use_journal:
+            self.journal.flush()
+            if len(self.journal) >= self.journal_compaction_threshold:
+                self._try_compact_calendar_data()
+        else:
+            try:
+                self.compact_calendar_data()
+            except StaleDataError:
+                self._merge_calendar_data()
+                self.compact_calendar_data()  # снимок снова успел измениться - StaleDataError, повтор при следующем сохранении
+
+    def _merge_calendar_data(self):
+        """Переносит изменения этого процесса в снимок, сохраненный другим процессом: календари и события
+        перечитываются из нового снимка, и к ним заново применяются записи об изменениях, сделанных после
+        последнего сохранения (см. _record). Записи остаются до успешного сохранения снимка."""
+        self._merge_user_data()  # участники событий из нового снимка могут быть пользователями другого процесса
+        calendars = {}
+        with self._version_lock(self.calendars_storage_file).acquire() as lock:
+            self._calendars_version = self._offsets_version = lock.version
+            if os.path.exists(self.calendars_storage_file):
+                with open(self.calendars_storage_file, 'rb') as f:
+                    for key, data in self.serializer.iter_pairs(f):  # таблица событий записана перед календарями
+                        if key.startswith(EVENT_KEY_PREFIX):
+                            Event.restore(data)  # события в памяти обновляются на месте
+                        else:
+                            calendars[key] = Calendar.from_dict(data)
+        self.calendars = calendars
+        self._calendar_offsets, self._event_offsets, self._deleted_event_ids = {}, {}, set()
+        for record in self._unsaved:
+            self._apply_record(record)
+        for session in [self, *self._sessions]:  # текущие календари - из новых данных
+            if session.logged_in_user is not None:
+                session.current_calendar = self.get_calendar(session.logged_in_user)
+
+    def _try_compact_calendar_data(self):
+        """Сворачивает журнал в снимок, если с момента загрузки снимок и журнал не менял другой процесс."""
+        try:
+            self.compact_calendar_data()
+        except StaleDataError:
+            pass
+
+    @synchronized
+    def compact_calendar_data(self):
+        """Записывает снимок всех календарей в файл (в формате serializer) и очищает журнал изменений.
+        Сначала записывается таблица событий (каждое событие один раз, под ключом '#<event_id>'),
+        затем календари, которые ссылаются на события по id. Незагруженные календари и события
+        копируются из старого снимка без разбора. Рядом сохраняется индекс смещений записей в файле (файл .idx).
+        Снимок и индекс пишутся во временные файлы и заменяют прежние атомарно, под исключительной блокировкой
+        и только если версия снимка не изменилась с момента загрузки, а журнал не дописан другими процессами,
+        иначе - StaleDataError."""
+        loaded = self.calendars.loaded() if isinstance(self.calendars, LazyCalendars) else self.calendars
+        if self.storage is not None:
+            self.storage.save_calendars(loaded)
+            return
+        path = self.calendars_storage_file
+        serializer = self.serializer
+        events = {event_id: None for event_id in self._event_offsets if event_id not in self._deleted_event_ids}
+        for calendar in loaded.values():
+            for event in calendar.events + calendar.unprocessed_events:
+                events[event.event_id] = event
+        offsets, event_offsets = {}, {}
+        writes = AtomicWrites()
+        try:
+            out = writes.open(path, 'wb')
+            copied = len(loaded) < len(self.calendars) or any(
+                event is None and event_id not in Event.events_map for event_id, event in events.items())
+            # старого снимка может не быть (файл удален): копировать незагруженные записи неоткуда
+            old = open(path, 'rb') if copied and os.path.exists(path) else None
+            try:
+                serializer.write_header(out)
+                for event_id, event in events.items():
+                    event = event or Event.events_map.get(event_id)  # событие в памяти актуальнее сохраненной копии
+                    if event is not None:
+                        payload = serializer.dumps(event.to_dict())
+                    elif old is not None:
+                        payload = self._read_entry(old, self._event_offsets[event_id])
+                    else:
+                        continue
+                    offset = serializer.write_entry(out, EVENT_KEY_PREFIX + str(event_id), payload, first=not event_offsets)
+                    event_offsets[event_id] = [offset, len(payload)]
+                for username in self.calendars:
+                    if username in loaded:
+                        payload = serializer.dumps(loaded[username].to_dict())
+                    elif old is not None:
+                        payload = self._read_entry(old, self._calendar_offsets[username])
+                    else:
+                        continue
+                    offset = serializer.write_entry(out, username, payload, first=not event_offsets and not offsets)
+                    offsets[username] = [offset, len(payload)]
+                serializer.write_footer(out)
+            finally:
+                if old is not None:
+                    old.close()
+            json.dump({'size': out.tell(), 'format': serializer.format, 'next_event_id': Event.count,
+                       'next_notification_id': Notification.count, 'calendars': offsets, 'events': event_offsets},
+                      writes.open(path + '.idx', 'w', encoding='utf-8'), ensure_ascii=False)
+            writes.sync()  # запись на диск - до блокировки, под блокировкой только замена файлов
+            # журнал блокируется только в режиме журнала (или если он остался от него), без журнала файл не создается
+            journal_lock = self.journal.exclusive() if self.use_journal or os.path.exists(self.journal.path) \
+                else nullcontext(0)
+            with self._version_lock(path).acquire(exclusive=True) as lock, journal_lock as foreign:
+                # снимка еще нет - перезаписывать нечего, иначе его версия должна совпадать с загруженной
+                if os.path.exists(path) and lock.version != self._calendars_version or foreign:
+                    raise StaleDataError('Календари были сохранены другим процессом, загрузите данные заново.')
+                writes.replace()
+                self._calendars_version = self._offsets_version = lock.bump()
+                self.journal.truncate()
+        finally:
+            writes.abort()  # после замены временных файлов уже нет
+        self._calendar_offsets, self._event_offsets, self._deleted_event_ids = offsets, event_offsets, set()
+        self._unsaved = []
+
+    @staticmethod
+    def _read_entry(f, position):
+        """Читает сериализованную запись снимка по паре [смещение, длина]."""
+        offset, length = position
+        f.seek(offset)
+        return f.read(length)
 
+    @synchronized
     def load_calendar_data(self):
-        """Загружает данные календаря из JSON-файла."""
-        if os.path.exists(self.calendars_storage_file):
-            with open(self.calendars_storage_file, 'r', encoding='utf-8') as f:
-                self.calendars = {username: Calendar.from_dict(calendar_data) for username, calendar_data in
-                                  json.load(f).items()}
+        """Загружает список календарей, сами календари загружаются при первом обращении (см. LazyCalendars),
+        а их события - по ссылкам из таблицы событий снимка.
+        Если журнал изменений не пуст, календари загружаются целиком (снимок разбирается потоково,
+        по одной записи), к ним применяются записи журнала, и журнал сворачивается в новый снимок."""
+        self._install_id_allocators()
+        if self.storage is not None:
+            self.calendars = LazyCalendars(self._load_calendar, self.storage.calendar_usernames())
+            return
+        self._deleted_event_ids = set()
+        self._unsaved = []
+        self._journal = None  # количество записей журнала перечитывается с диска
+        with self._version_lock(self.calendars_storage_file).acquire() as lock:  # снимок не заменяется во время чтения
+            self._calendars_version = self._offsets_version = lock.version
+            journal_size = len(self.journal)
+            index = self._read_calendar_index()
+            if index is not None and not journal_size:
+                self._use_calendar_index(index)
+                Event.count = max(Event.count, index['next_event_id'])
+                Notification.count = max(Notification.count, index['next_notification_id'])
+                self.calendars = LazyCalendars(self._load_calendar, self._calendar_offsets)
+                return
+            calendars = {}
+            if os.path.exists(self.calendars_storage_file):
+                with open(self.calendars_storage_file, 'rb') as f:
+                    for key, data in self.serializer.iter_pairs(f):  # таблица событий записана перед календарями
+                        if key.startswith(EVENT_KEY_PREFIX):
+                            Event.create_or_get_event(data)
+                        else:  # календарь собирается сразу, разобранные записи не копятся
+                            calendars[key] = Calendar.from_dict(data)
+        self.calendars = calendars
+        self._calendar_offsets, self._event_offsets = {}, {}
+        if journal_size:
+            for record in self.journal.read():
+                self._apply_record(record)
+            self._try_compact_calendar_data()
+
+    def _use_calendar_index(self, index):
+        """Запоминает смещения календарей и событий из индекса снимка."""
+        self._calendar_offsets = index['calendars']
+        self._event_offsets = {int(event_id): position for event_id, position in index.get('events', {}).items()}
+
+    def _install_id_allocators(self):
+        """Подключает счетчики id событий и уведомлений, которые хранятся вместе с данными и общие для процессов,
+        работающих с одними данными: в подключенном хранилище или в файле .ids рядом со снимком."""
+        if self.storage is not None:
+            Event.id_allocator = IdAllocator.for_storage(self.storage, 'event', self.id_block_size)
+            Notification.id_allocator = IdAllocator.for_storage(self.storage, 'notification', self.id_block_size)
+        else:
+            path = self.ids_storage_file or os.path.splitext(self.calendars_storage_file)[0] + '.ids'
+            Event.id_allocator = IdAllocator.for_file(path, 'event', self.id_block_size)
+            Notification.id_allocator = IdAllocator.for_file(path, 'notification', self.id_block_size)
+
+    def _load_calendar(self, username):
+        """Загружает один календарь из подключенного хранилища или по смещению из файла снимка."""
+        if self.storage is not None:
+            return Calendar.from_dict(self.storage.load_calendar(username))
+        with self._version_lock(self.calendars_storage_file).acquire() as lock:
+            if lock.version != self._offsets_version:  # снимок заменил другой процесс, смещения устарели
+                self._use_calendar_index(self._read_calendar_index())
+                self._offsets_version = lock.version
+            with open(self.calendars_storage_file, 'rb') as f:
+                def load_event(event_id):
+                    if event_id not in self._event_offsets or event_id in self._deleted_event_ids:
+                        return None
+                    return Event.create_or_get_event(self.serializer.loads(self._read_entry(f, self._event_offsets[event_id])))
+                return Calendar.from_dict(self.serializer.loads(self._read_entry(f, self._calendar_offsets[username])),
+                                          load_event)
+
+    def _read_calendar_index(self):
+        """Индекс смещений календарей и событий в файле снимка: из файла .idx или, если он устарел
+        (или записан для другого формата), сканированием снимка. None, если снимка нет."""
+        path = self.calendars_storage_file
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path + '.idx', 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index['size'] == os.path.getsize(path) and index.get('format', 'json') == self.serializer.format:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+        return self._scan_calendar_index()
+
+    def _scan_calendar_index(self):
+        """Строит индекс смещений потоковым разбором снимка (подходит и для старых форматов: с отступами
+        и с полными копиями событий в календарях). В памяти одновременно находится только одна запись."""
+        offsets, event_offsets, next_event_id, next_notification_id = {}, {}, 1, 1
+        with open(self.calendars_storage_file, 'rb') as f:
+            for key, data, offset, length in self.serializer.iter_items(f):
+                if key.startswith(EVENT_KEY_PREFIX):
+                    event_offsets[int(data['event_id'])] = [offset, length]
+                    next_event_id = max(next_event_id, int(data['event_id']) + 1)
+                    continue
+                offsets[key] = [offset, length]
+                for event_data in data['events'] + data['unprocessed_events']:
+                    event_id = event_data['event_id'] if isinstance(event_data, dict) else event_data
+                    next_event_id = max(next_event_id, int(event_id) + 1)
+                for notification_data in data['notifications']:
+                    next_notification_id = max(next_notification_id, notification_data['id'] + 1)
+        return {'next_event_id': next_event_id, 'next_notification_id': next_notification_id, 'calendars': offsets,
+                'events': event_offsets}
+
+    def _apply_record(self, record):
+        """Применяет запись журнала к календарям. Повторное применение записи ничего не меняет,
+        поэтому журнал можно безопасно проиграть поверх снимка, в который он уже был свернут."""
+        op = record['op']
+        if op == 'calendar':
+            if record['username'] not in self.calendars:
+                self.calendars[record['username']] = Calendar(record['owner'])
+        elif op == 'event':
+            Event.restore(record['event'])
+        elif op == 'event_deleted':
+            event = Event.events_map.get(record['event_id'])
+            if event is not None:
+                for calendar in self.calendars.values():
+                    calendar.remove_event(event)
+                    if calendar.has_unprocessed_event(event):
+                        calendar.mark_event_as_processed(event)
+                Event.delete_event(event)
+            self._deleted_event_ids.add(record['event_id'])
+        elif op == 'notify':
+            n = Notification.from_dict(record['notification'])  # одно уведомление на всех получателей
+            for username in record['usernames']:
+                calendar = self.calendars.get(username)
+                if calendar is not None and not calendar.has_notification(n.id):
+                    calendar.notify(n)
+        else:
+            calendar = self.calendars.get(record['username'])
+            if calendar is None:
+                return
+            if op == 'read':
+                calendar.mark_notification_read(record['notification_id'])
+                return
+            if op == 'archive':
+                calendar.remove_notifications(record['notification_ids'])
+                return
+            event = Event.events_map.get(record['event_id'])
+            if event is None:
+                return
+            if op == 'add_event' and not calendar.has_event(event):
+                calendar.add_event(event)
+            elif op == 'remove_event':
+                calendar.remove_event(event)
+            elif op == 'invite' and not calendar.has_unprocessed_event(event) and not calendar.has_event(event):
+                calendar.add_unprocessed_events(event)
+            elif op == 'processed' and calendar.has_unprocessed_event(event):
+                calendar.mark_event_as_processed(event)
+
+    @property
+    def dispatcher(self):
+        """Рассылка уведомлений участникам событий (см. NotificationDispatcher)."""
+        if self._dispatcher is None:
+            self._dispatcher = NotificationDispatcher(self)
+        return self._dispatcher
+
+    def _notify(self, participants, n):
+        """Отправляет готовое уведомление в календари участников."""
+        self.dispatcher.deliver(participants, n)
 
 
     def get_calendar(self, owner: User):
-        """Возвращает календарь владельца."""
-        if owner.username not in self.calendars:
-            self.calendars[owner.username] = Calendar(owner.user_id)
-        return self.calendars.get(owner.username)
-
-    def create_user(self, username, password):
+        """Возвращает календарь владельца, сохраненный календарь загружается при первом обращении."""
+        with self._calendars_lock:
+            if owner.username not in self.calendars:
+                self.calendars[owner.username] = Calendar(owner.user_id)
+                self._record('calendar', username=owner.username, owner=owner.user_id)
+            return self.calendars.get(owner.username)
+
+    @locking('user')
+    def get_user_events_in_range(self, user, start_date, end_date):
+        """Находит события пользователя, пересекающиеся с периодом, сгруппированные по дням.
+        Если календарь пользователя не загружен, поиск выполняется в подключенном хранилище."""
+        loaded = self.calendars.is_loaded(user.username) if isinstance(self.calendars, LazyCalendars) \
+            else user.username in self.calendars
+        if self.storage is not None and not loaded:
+            events = [Event.events_map.get(event_data['event_id']) or Event.create_or_get_event(event_data)
+                      for event_data in self.storage.events_in_range(user.username, start_date, end_date)]
+            return Calendar.group_by_day(Calendar.expand_events(events, start_date, end_date))
+        return self.get_calendar(user).get_events_in_range(start_date, end_date)
+
+    @locking('users')
+    def find_common_free_slots(self, users, window, duration):
+        """Находит промежутки внутри window = (начало, конец), в которые свободны все пользователи users,
+        не короче duration (timedelta). Возвращает список пар (начало, конец) с точностью до минуты.
+        Занятость берется из битовых карт календарей (см. Calendar.busy_bitmap), карты участников объединяются."""
+        start, end = window
+        if end < start:
+            return []
+        days = [start.date() + timedelta(days=i) for i in range((end.date() - start.date()).days + 1)]
+        busy = 0
+        for user in dict.fromkeys(users):
+            calendar = self.get_calendar(user)
+            busy |= join_days(calendar.busy_bitmap(day) for day in days)
+        return free_slots(busy, days[0], window, duration)
+
+    @synchronized
+    def create_user(self, username, password, session=None):
         """Создает нового пользователя."""
+        session = session or self
         try:
             user = User(username, self.hash_password(password))
             self.users[username] = user
-            self.login(username, password)
+            self._changed_users = self._changed_users | {username}
+            self.login(username, password, session=session)
             return user
         except Exception as e:
             print(str(e))
@@ -113,6 +617,7 @@ class Backend:
         password, salt = hashed_password.split(':')
         return password == hashlib.sha256(salt.encode() + user_password.encode()).hexdigest()
 
+    @synchronized
     def drop_password(self, username, password):
         """Сброс пароля."""
         if self.check_username_exists(username):
@@ -120,24 +625,35 @@ class Backend:
 
                 user = self.users.get(username)
                 user.set_password(self.hash_password(password))
+                self._changed_users = self._changed_users | {username}
             else:
                 raise ValueError('Пароль долен содержать не менее 8 символов, включая цифру и строчную букву.')
         else:
             raise ValueError('Пользователь с таким именем не найден.')
 
-    def login(self, username, password):
+    @locking()
+    def login(self, username, password, session=None):
         """Аутентифицирует пользователя."""
+        session = session or self
         if username not in self.users or not self.check_password(self.users[username].get_password(), password):
             raise AuthenticationError('Неверное имя пользователя или пароль.')
         else:
             user = self.users.get(username)
-            self.logged_in_user = user
-            self.current_calendar = self.get_calendar(self.logged_in_user)
+            session.logged_in_user = user
+            session.current_calendar = self.get_calendar(session.logged_in_user)
             return user
-    def logout(self):
+    @locking()
+    def logout(self, session=None):
         """Выход пользователя из системы."""
-        self.logged_in_user = None
-        self.current_calendar = None
+        session = session or self
+        session.logged_in_user = None
+        session.current_calendar = None
+
+    def open_session(self):
+        """Новый сеанс со своим вошедшим пользователем над общими данными этого Backend (см. Session)."""
+        session = Session(self)
+        self._sessions.add(session)
+        return session
 
 
 
@@ -176,43 +692,61 @@ class Backend:
             raise ValueError('Некорретный ввод.')
 
 
-    def invite_participants(self, event, participants):
-        """Приглашение участников на событие."""
-        if self.logged_in_user == event.organizer:
-            n = Notification(event.event_id, f"Вы были приглашены на событие '{event.title}'.")
-            for participant in participants:
-                if participant.username in self.calendars:
-                    try:
-                        participant_calendar = self.calendars[participant.username]
-                        participant_calendar.add_unprocessed_events(event)
-                        print(f'Участник {participant.username} успешно приглашен на событие, он может принять приглашение или отклонить его.')
-                        participant_calendar.notify(n)
-                    except Exception as e:
-                        print(str(e))
+    @locking('event', 'participants')
+    def invite_participants(self, event, participants, session=None):
+        """Приглашение участников на событие, возвращает список приглашенных.
+        Если кого-то из участников пригласить нельзя (пользователь не найден - ValueError, уже приглашен
+        или участвует - RepetitionError), не приглашается никто."""
+        session = session or self
+        if session.logged_in_user == event.organizer:
+            invited = list(dict.fromkeys(participants))  # без повторов
+            if any(participant.username not in self.users for participant in invited):
+                raise ValueError('Пользователь(-и) не найден(-ы).')
+            calendars = [self.get_calendar(participant) for participant in invited]
+            for participant, participant_calendar in zip(invited, calendars):
+                if participant_calendar.has_event(event) or participant_calendar.has_unprocessed_event(event):
+                    raise RepetitionError(f'Участник {participant.username} уже был приглашен на событие.')
+            for participant, participant_calendar in zip(invited, calendars):
+                participant_calendar.add_unprocessed_events(event)
+                self._record('invite', username=participant.username, event_id=event.event_id)
+            self.dispatcher.dispatch(event, 'invited', invited)
+            return invited
         else:
             raise PermissionError('Вы не можете добавить участников в событие, в котором Вы не организатор.')
 
-    def remove_participants(self, event, participants):
+    @locking('event', 'participants')
+    def remove_participants(self, event, participants, session=None):
         """Удаление участников из события."""
-        if self.logged_in_user == event.organizer: # только организатор
-            for participant in participants:
-                if participant in event.participants: # пользователь должен быть среди участников события
-                    if participant != event.organizer: # организатор не может удалить себя из события
-                        try:
-                            event.remove_participant(participant)
-                            participant_calendar = self.calendars[participant.username]
-                            participant_calendar.remove_event(event)
-                            n = Notification(event.event_id, f"Вы были удалены из мероприятия '{event.title}'.")
-                            participant_calendar.notify(n)
-                        except Exception as e:
-                            print(str(e))
-                    else:
-                        raise ValueError('Вы не можете удалить себя из участников, так как Вы являетесь организатором.')
-                else:
-                    raise ValueError('Участник не был приглашен на событие.')
+        session = session or self
+        if session.logged_in_user == event.organizer: # только организатор
+            removed = []
+            try:
+                self._remove_participants(event, participants, removed)
+            finally:
+                if removed:
+                    self._record('event', event=event.to_dict())
+                self.dispatcher.dispatch(event, 'removed', removed)
         else:
             raise PermissionError('Вы не можете удалить участников из события, в котором Вы не организатор.')
 
+    def _remove_participants(self, event, participants, removed):
+        """Удаляет участников из события, удаленные участники добавляются в список removed."""
+        for participant in participants:
+            if event.has_participant(participant): # пользователь должен быть среди участников события
+                if participant != event.organizer: # организатор не может удалить себя из события
+                    try:
+                        event.remove_participant(participant)
+                        participant_calendar = self.get_calendar(participant)
+                        participant_calendar.remove_event(event)
+                        self._record('remove_event', username=participant.username, event_id=event.event_id)
+                        removed.append(participant)
+                    except Exception as e:
+                        print(str(e))
+                else:
+                    raise ValueError('Вы не можете удалить себя из участников, так как Вы являетесь организатором.')
+            else:
+                raise ValueError('Участник не был приглашен на событие.')
+
     def validate_participants(self, participants, prompt=None):
         """Проверка корректности участников и перевод из объекта str в объект list с элементами User"""
         if participants:
@@ -223,34 +757,40 @@ class Backend:
                 raise ValueError('Пользователь(-и) не найден(-ы).')
 
 
-    def manage_unprocessed_evens(self):
+    def manage_unprocessed_evens(self, session=None):
         """Получение списка необработанных событий из текущего календаря."""
-        unprocessed_events = self.current_calendar.get_unprocessed_events()
+        session = session or self
+        unprocessed_events = session.current_calendar.get_unprocessed_events()
         return unprocessed_events
 
-    def accept_invitation(self, event):
+    @locking('event')
+    def accept_invitation(self, event, check_conflicts=False, session=None):
         """Принятие приглашения на участие в событии.
         Осуществляется попытка добавить текущего пользователя как участника события.
     В случае успеха отправляются уведомления остальным участникам.
-    При возникновении ошибки выводится информация об ошибке.
+    Без приглашения (или если оно уже обработано) - ValueError.
+    С check_conflicts=True событие не добавляется, если оно пересекается с событиями календаря (ConflictError).
     """
-        try:
-            event.add_participant(self.logged_in_user)  # добавление участника в событие, если он согласился участвовать
-            self.current_calendar.mark_event_as_processed(event)
-            self.current_calendar.add_event(event)
-            n = Notification(event.event_id, f"Участник {self.logged_in_user} присоединился к событию {event.title}.")
-            for participant in event.participants:
-                if participant != self.logged_in_user:
-                    self.calendars.get(participant.username).notify(n)
-        except Exception as e:
-            print(str(e))
+        session = session or self
+        if check_conflicts:
+            self._check_conflicts(event.start_time, event.end_time, event.recurrence, event, session=session)
+        session.current_calendar.mark_event_as_processed(event)  # без приглашения - ошибка, участник не добавляется
+        event.add_participant(session.logged_in_user)  # добавление участника в событие, если он согласился участвовать
+        session.current_calendar.add_event(event)
+        self._record('event', event=event.to_dict())
+        self._record('processed', username=session.logged_in_user.username, event_id=event.event_id)
+        self._record('add_event', username=session.logged_in_user.username, event_id=event.event_id)
+        self.dispatcher.dispatch(event, 'joined', [participant for participant in event.participants
+                                                   if participant != session.logged_in_user], user=session.logged_in_user)
 
                     # отправка уведомления о добавлении нового участника
-    def decline_invitation(self, event):
+    @locking('event')
+    def decline_invitation(self, event, session=None):
         """Отказ от участия в событии.Событие отмечается как обработанное, и отправляется уведомление организатору."""
-        self.current_calendar.mark_event_as_processed(event)
-        n = Notification(event.event_id, f"Участник {self.logged_in_user} отказался присоединиться к событию {event.title}.")
-        self.calendars.get(event.organizer.username).notify(n)
+        session = session or self
+        session.current_calendar.mark_event_as_processed(event)
+        self._record('processed', username=session.logged_in_user.username, event_id=event.event_id)
+        self.dispatcher.dispatch(event, 'declined', [event.organizer], user=session.logged_in_user)
 
     @staticmethod
     def validate_number_input(user_input, prompt=None):
@@ -294,17 +834,39 @@ class Backend:
             except Exception as e:
                 print(f'{str(e)} Попробуйте снова.')
 
-    def create_event(self, title, start_time, end_time, description, recurrence):
-        """Создание нового события в календаре."""
-        organizer = self.logged_in_user
+    @locking('event', 'user')
+    def find_conflicts(self, start_time, end_time, recurrence=None, event=None, user=None, session=None):
+        """Находит события календаря пользователя (по умолчанию - текущего), пересекающиеся с промежутком
+        (и его повторениями для периодического события), событие event не учитывается. См. Calendar.find_conflicts."""
+        session = session or self
+        calendar = session.current_calendar if user is None else self.get_calendar(user)
+        return calendar.find_conflicts(start_time, end_time, recurrence, exclude=event)
+
+    def _check_conflicts(self, start_time, end_time, recurrence, event=None, session=None):
+        session = session or self
+        conflicts = self.find_conflicts(start_time, end_time, recurrence, event, session=session)
+        if conflicts:
+            raise ConflictError(conflicts)
+
+    @locking()
+    def create_event(self, title, start_time, end_time, description, recurrence, check_conflicts=False, session=None):
+        """Создание нового события в календаре.
+        С check_conflicts=True событие не создается, если оно пересекается с событиями календаря (ConflictError)."""
+        session = session or self
+        if check_conflicts:
+            self._check_conflicts(start_time, end_time, recurrence, session=session)
+        organizer = session.logged_in_user
         event = Event(title, start_time, end_time, description, recurrence=recurrence, organizer=organizer)
         if event:
-            self.current_calendar.add_event(event)
+            session.current_calendar.add_event(event)
+            self._record('event', event=event.to_dict())
+            self._record('add_event', username=organizer.username, event_id=event.event_id)
         return event
 
-    def get_events_in_range(self, start_date, end_date):
+    def get_events_in_range(self, start_date, end_date, session=None):
         """Получение списка событий за определённый промежуток дат."""
-        events_in_range = self.current_calendar.get_events_in_range(start_date, end_date)
+        session = session or self
+        events_in_range = self.get_user_events_in_range(session.logged_in_user, start_date, end_date)
         if events_in_range:
             print('События в данном промежутке времени:')
             for date, events in events_in_range.items():
@@ -313,9 +875,11 @@ class Backend:
         else:
             print('Не найдено ни одного события.')
 
-    def get_coming_events(self):
+    def get_coming_events(self, session=None):
         """Получение списка предстоящих событий, ближайшая неделя."""
-        coming_events = self.current_calendar.get_coming_events()
+        session = session or self
+        today = datetime.now()
+        coming_events = self.get_user_events_in_range(session.logged_in_user, today, today + timedelta(weeks=1))
         if coming_events:
             print('Предстоящие события:')
             for date, events in coming_events.items():
@@ -326,19 +890,18 @@ class Backend:
         else:
             print('У вас нет событий на ближайшую неделю.')
 
-    def get_today_events(self):
+    def get_today_events(self, session=None):
         """Получение и вывод списка событий на текущий день."""
+        session = session or self
         print("Календарь запускается...")
-        sleep(1)  # Пауза в 1 секунду
         # Вывод текущей даты
         print("Сегодняшняя дата: " + strftime("%A %d %b, %Y", localtime()))
         # Вывод текущего времени
         print("Текущее время: " + strftime("%H:%M", localtime()))
-        sleep(1)  # Пауза в 1 секунду
         current_date = datetime.now().date()
         start_of_day = datetime.combine(current_date, time.min)
         end_of_day = datetime.combine(current_date, time(23, 59))
-        today_events = self.current_calendar.get_events_in_range(start_of_day, end_of_day)
+        today_events = self.get_user_events_in_range(session.logged_in_user, start_of_day, end_of_day)
         if today_events:
             print(f'События на сегодня:')
             for event in today_events:
@@ -346,66 +909,104 @@ class Backend:
         else:
             print('На сегодня у вас ничего не запланировано.')
 
-    def show_all_events(self):
+    def show_all_events(self, session=None):
         """Возвращает список всех событий для текущего вошедшего пользователя."""
-        all_events = self.calendars[self.logged_in_user.username].events
+        session = session or self
+        all_events = self.get_calendar(session.logged_in_user).events
         return all_events
 
-    def update_event(self, event, **kwargs): # **kwargs: Параметры для обновления события.
+    @locking('event')
+    def update_event(self, event, session=None, **kwargs): # **kwargs: Параметры для обновления события.
         """Обновляет событие, если текущий пользователь является его организатором."""
-        if self.logged_in_user == event.organizer:
-            if len(event.participants) > 1:
-                n = Notification(event.event_id, f"Событие '{event.title}' было изменено организатором.")
-                for participant in event.participants:
-                    if participant != event.organizer:
-                        self.calendars.get(participant.username).notify(n)
-            return event.update_event(**kwargs)
+        session = session or self
+        if session.logged_in_user == event.organizer:
+            title = event.title  # в уведомлении - название события до изменения
+            result = event.update_event(**kwargs)
+            self._record('event', event=event.to_dict())
+            self.dispatcher.dispatch(event, 'updated', [participant for participant in event.participants
+                                                        if participant != event.organizer], title=title)
+            return result
         else:
             raise PermissionError("Вы не можете изменить событие, так как не являетесь его организатором.")
 
 
-    def leave_event(self, event):
+    @locking('event')
+    def leave_event(self, event, session=None):
         """Покидает событие, если текущий пользователь является участником, но не организатором."""
-        if self.logged_in_user in event.participants and self.logged_in_user != event.organizer:
-            event.remove_participant(self.logged_in_user)
-            self.current_calendar.remove_event(event)
-            for participant in event.participants:
-                if participant != self.logged_in_user:
-                    n = Notification(event.event_id, f"Участник {self.logged_in_user} покинул событие {event.title}.")
-                    self.calendars.get(participant.username).notify(n)
+        session = session or self
+        if event.has_participant(session.logged_in_user) and session.logged_in_user != event.organizer:
+            event.remove_participant(session.logged_in_user)
+            session.current_calendar.remove_event(event)
+            self._record('event', event=event.to_dict())
+            self._record('remove_event', username=session.logged_in_user.username, event_id=event.event_id)
+            self.dispatcher.dispatch(event, 'left', event.participants, user=session.logged_in_user)
         else:
             raise PermissionError("Вы не можете покинуть событие, в котором Вы организатор.")
 
-    def delete_event(self, event):
-        """Удаляет событие, если текущий пользователь является организатором."""
-        n = Notification(event.event_id, f"Событие '{event.title}' было удалено организатором.")
-        if self.logged_in_user in event.participants and self.logged_in_user == event.organizer:
-            for participant in event.participants:
-                participant_calendar = self.calendars.get(participant.username)
+    @locking('event')
+    def delete_event(self, event, session=None):
+        """Удаляет событие, если текущий пользователь является организатором.
+        Событие убирается из календарей участников и из приглашений, которые еще не обработаны."""
+        session = session or self
+        if event.has_participant(session.logged_in_user) and session.logged_in_user == event.organizer:
+            participants = list(event.participants)  # список участников изменяется в цикле
+            for participant in participants:
+                participant_calendar = self.get_calendar(participant)
                 event.remove_participant(participant)
-                if participant != event.organizer:
-                    participant_calendar.notify(n)
                 participant_calendar.remove_event(event)
-                Event.delete_event(event)
+            # приглашенные не известны событию: просматриваются загруженные календари (в незагруженных ссылка
+            # на удаленное событие отбрасывается при загрузке); приглашения на событие меняются только под его блокировкой
+            with self._calendars_lock:
+                calendars = list((self.calendars.loaded() if isinstance(self.calendars, LazyCalendars)
+                                  else self.calendars).values())
+            for calendar in calendars:
+                if calendar.has_unprocessed_event(event):
+                    calendar.mark_event_as_processed(event)
+            Event.delete_event(event)
+            self._deleted_event_ids.add(event.event_id)
+            self._record('event_deleted', event_id=event.event_id)
+            self.dispatcher.dispatch(event, 'deleted', [participant for participant in participants
+                                                        if participant != event.organizer])
 
         else:
             raise PermissionError('Вы не можете удалить событие, так как не являетесь его организатором.')
 
-    def get_unread_notifications(self):
+    def get_unread_notifications(self, session=None):
         """Генератор, возвращающий непрочитанные уведомления для текущего календаря пользователя.
                После вызова уведомление помечается как прочитанное."""
-        unread_notifications = list(filter(lambda n:n.status == 'unread', self.current_calendar.notifications))
+        session = session or self
+        calendar = session.current_calendar
+        unread_notifications = calendar.unread_notifications  # очередь непрочитанных, история не просматривается
         if unread_notifications:
-            if len(unread_notifications) > 1:
-                for i, n in enumerate(unread_notifications, 1):
-                    yield f'{i}. {n.message}'
-                    n.status = 'read'
-            else:
-                yield unread_notifications[0].message
-                unread_notifications[0].status = 'read'
-
+            for i, n in enumerate(unread_notifications, 1):
+                yield f'{i}. {n.message}' if len(unread_notifications) > 1 else n.message
+                with self._locked(session.logged_in_user):
+                    calendar.mark_notification_read(n.id)
+                    self._record('read', username=session.logged_in_user.username, notification_id=n.id)
+            self.archive_notifications(session.logged_in_user)
         else:
             yield 'У вас нет непрочитанных уведомлений.'
 
+    @locking('user')
+    def archive_notifications(self, user):
+        """Переносит прочитанные уведомления пользователя сверх notification_retention в архив.
+        Возвращает количество перенесенных уведомлений."""
+        archived = self.get_calendar(user).pop_archivable_notifications(self.notification_retention)
+        if not archived:
+            return 0
+        if self.storage is None:
+            for n in archived:
+                self.notification_archive.append('archived', username=user.username, notification=n.to_dict())
+            self.notification_archive.flush()
+        self._record('archive', username=user.username, notification_ids=[n.id for n in archived])
+        return len(archived)
+
+    def get_archived_notifications(self, user):
+        """Возвращает уведомления пользователя из архива (читается весь архив, для редких запросов истории)."""
+        if self.storage is not None:
+            return [Notification.from_dict(data) for data in self.storage.archived_notifications(user.username)]
+        return [Notification.from_dict(record['notification']) for record in self.notification_archive.read()
+                if record['username'] == user.username]
+
 
 
@@ -0,0 +1,220 @@
+"""
+Нагрузочный бенчмарк операций Backend: задержки (перцентили) и пропускная способность.
+Строится синтетический набор данных: users пользователей по events событий (разовые и периодические
+с разной частотой, в пределах полугода от текущей даты) и large-meetings больших встреч
+на meeting-size участников. Затем замеряются операции:
+    login, get_events_in_range (неделя), get_coming_events, invite_participants, accept_invitation,
+    save_calendar_data, load_calendar_data (снимок с индексом, календари загружаются при первом обращении)
+    и load_all_calendars (загрузка с обращением к каждому календарю, как после перезапуска: события
+    разбираются заново).
+С --threads N операции каждого вида выполняются пулом из N потоков, каждый пользователь - в своем сеансе
+(см. Session), так измеряется пропускная способность при одновременных запросах.
+
+Результаты печатаются таблицей и сохраняются в JSON (--output) вместе с коммитом и параметрами запуска,
+--compare сравнивает их с результатами прошлого запуска (например, другого коммита).
+
+Запуск: python BenchBackend.py [--users 1000] [--events 20] [--large-meetings 20] [--meeting-size 100]
+                               [--operations 2000] [--threads 1] [--output bench_results.json]
+                               [--compare old_results.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from Backend import Backend
+from Event import Event
+from User import User
+
+PASSWORD = 'Password123'
+RECURRENCES = ['один раз'] * 6 + ['каждый день', 'каждую неделю', 'каждый месяц', 'каждый год']  # в основном разовые
+PERCENTILES = (50, 90, 99)
+
+
+def build_dataset(backend, users, events, large_meetings, meeting_size, rng):
+    """Создает пользователей, их события и большие встречи (приглашения приняты).
+    Возвращает сеансы пользователей (имя -> Session, вход выполнен) и начало периода событий."""
+    password_hash = backend.hash_password(PASSWORD)  # соль одна на всех: хеширование не входит в построение набора
+    usernames = [f'user{i}' for i in range(users)]
+    for username in usernames:
+        backend.users[username] = User(username, password_hash)
+    origin = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=90)
+    sessions = {}
+    for username in usernames:
+        session = sessions[username] = backend.open_session()
+        session.login(username, PASSWORD)
+        for _ in range(events):
+            start = origin + timedelta(days=rng.randrange(180), minutes=rng.randrange(8 * 60, 20 * 60, 15))
+            session.create_event('Событие', start, start + timedelta(minutes=rng.choice((30, 60, 90))),
+                                 'Описание события', rng.choice(RECURRENCES))
+    for i in range(large_meetings):
+        organizer = sessions[rng.choice(usernames)]
+        start = origin + timedelta(days=rng.randrange(180), hours=rng.randrange(9, 18))
+        meeting = organizer.create_event(f'Большая встреча {i}', start, start + timedelta(hours=1), '',
+                                         rng.choice(('один раз', 'каждую неделю')))
+        invitees = [backend.users[username] for username in rng.sample(usernames, min(meeting_size, users))
+                    if backend.users[username] is not organizer.logged_in_user]
+        organizer.invite_participants(meeting, invitees)
+        for invitee in invitees:
+            sessions[invitee.username].accept_invitation(meeting)
+    return sessions, origin
+
+
+def measure(calls, threads):
+    """Выполняет вызовы calls (функции без аргументов), возвращает задержки каждого вызова (с)
+    и общее время выполнения (с)."""
+    def timed(call):
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as executor:
+            latencies = list(executor.map(timed, calls))
+    else:
+        latencies = [timed(call) for call in calls]
+    return latencies, time.perf_counter() - started
+
+
+def percentile(values, p):
+    """Перцентиль p по методу ближайшего ранга, values отсортированы."""
+    return values[max(0, min(len(values) - 1, -(-len(values) * p // 100) - 1))]
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    result = {'count': len(latencies), 'mean_ms': sum(latencies) / len(latencies) * 1000}
+    for p in PERCENTILES:
+        result[f'p{p}_ms'] = percentile(latencies, p) * 1000
+    result['max_ms'] = latencies[-1] * 1000
+    result['throughput_per_s'] = len(latencies) / elapsed if elapsed else float('inf')
+    return result
+
+
+def run(args):
+    """Строит набор данных и замеряет операции. Возвращает результаты по операциям и сведения о наборе данных."""
+    rng = random.Random(args.seed)
+    backend = Backend()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):  # Backend печатает сообщения
+        backend.calendars_storage_file = os.path.join(tmp, 'calendars.json')
+        backend.users_storage_file = os.path.join(tmp, 'users.csv')
+        backend.calendars = {}
+        started = time.perf_counter()
+        sessions, origin = build_dataset(backend, args.users, args.events, args.large_meetings, args.meeting_size, rng)
+        build_time = time.perf_counter() - started
+        usernames = list(sessions)
+
+        def login(username):
+            session = backend.open_session()
+            return lambda: session.login(username, PASSWORD)
+        results['login'] = measure([login(rng.choice(usernames)) for _ in range(args.operations)], args.threads)
+
+        def events_in_range(session, start):
+            return lambda: list(session.get_events_in_range(start, start + timedelta(days=7)))
+        results['get_events_in_range'] = measure(
+            [events_in_range(sessions[rng.choice(usernames)], origin + timedelta(days=rng.randrange(173)))
+             for _ in range(args.operations)], args.threads)
+
+        results['get_coming_events'] = measure(
+            [sessions[rng.choice(usernames)].get_coming_events for _ in range(args.operations)], args.threads)
+
+        invitations = []  # (событие, приглашенные) для accept_invitation
+        invites = []
+        for i in range(max(1, args.operations // 10)):
+            organizer = sessions[rng.choice(usernames)]
+            start = origin + timedelta(days=rng.randrange(180), hours=rng.randrange(9, 18))
+            event = organizer.create_event(f'Приглашение {i}', start, start + timedelta(hours=1), '', 'один раз')
+            invitees = [backend.users[username] for username in rng.sample(usernames, min(args.invitees, len(usernames)))
+                        if username != organizer.logged_in_user.username]
+            invites.append(lambda organizer=organizer, event=event, invitees=invitees:
+                           organizer.invite_participants(event, invitees))
+            invitations.append((event, invitees))
+        results['invite_participants'] = measure(invites, args.threads)
+        results['accept_invitation'] = measure(
+            [lambda event=event, invitee=invitee: sessions[invitee.username].accept_invitation(event)
+             for event, invitees in invitations for invitee in invitees], args.threads)
+
+        results['save_calendar_data'] = measure([backend.save_calendar_data] * args.io_repeat, 1)
+        results['load_calendar_data'] = measure([backend.load_calendar_data] * args.io_repeat, 1)
+
+        def load_all_calendars():
+            Event.events_map.clear()  # как после перезапуска: события не в памяти
+            backend.load_calendar_data()
+            for username in usernames:
+                backend.calendars[username]
+        results['load_all_calendars'] = measure([load_all_calendars] * args.io_repeat, 1)
+        snapshot_size = os.path.getsize(backend.calendars_storage_file)
+    summary = {name: summarize(*measured) for name, measured in results.items()}
+    return summary, {'build_s': build_time, 'snapshot_bytes': snapshot_size}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    columns = ['count', 'mean_ms'] + [f'p{p}_ms' for p in PERCENTILES] + ['max_ms', 'throughput_per_s']
+    print(f"{'операция':>20} " + ' '.join(f'{column:>16}' for column in columns)
+          + (f" {'p50, изм.':>10} {'throughput, изм.':>17}" if baseline else ''))
+    for name, result in results.items():
+        line = f'{name:>20} ' + ' '.join(f'{result[column]:>16.3f}' if isinstance(result[column], float)
+                                         else f'{result[column]:>16}' for column in columns)
+        old = (baseline or {}).get(name)
+        if old:
+            line += f" {(result['p50_ms'] / old['p50_ms'] - 1) * 100:>+9.1f}%" \
+                    f" {(result['throughput_per_s'] / old['throughput_per_s'] - 1) * 100:>+16.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=20, help='событий в календаре каждого пользователя')
+    parser.add_argument('--large-meetings', type=int, default=20)
+    parser.add_argument('--meeting-size', type=int, default=100, help='участников большой встречи')
+    parser.add_argument('--operations', type=int, default=2000, help='замеров каждой операции чтения и входа')
+    parser.add_argument('--invitees', type=int, default=5, help='приглашенных в одном invite_participants')
+    parser.add_argument('--io-repeat', type=int, default=3, help='замеров сохранения и загрузки')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='JSON-файл с результатами прошлого запуска')
+    args = parser.parse_args()
+    results, dataset = run(args)
+    report = {
+        'commit': git_commit(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'parameters': {name: value for name, value in vars(args).items() if name not in ('output', 'compare')},
+        'dataset': dataset,
+        'results': results,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print(f"Набор данных построен за {dataset['build_s']:.1f} с, снимок {dataset['snapshot_bytes'] / 2 ** 20:.1f} МБ")
+    print_results(results, baseline)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'Результаты сохранены в {args.output}')
+
+
+if __name__ == '__main__':
+    main()
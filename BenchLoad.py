@@ -0,0 +1,112 @@
+"""
+Бенчмарк загрузки calendars.json: пиковое потребление памяти (RSS) в зависимости от размера файла.
+Сравниваются разбор всего документа через json.load, потоковый разбор (JsonStream, по одному календарю)
+загрузка только индекса календарей (Backend.load_calendar_data, без файла .idx индекс строится сканированием)
+и полная загрузка всех календарей при непустом журнале (Backend.load_calendar_data с проигрыванием журнала,
+без сворачивания журнала в новый снимок).
+Каждый замер выполняется в отдельном процессе, модули импортируются до начального замера.
+Пиковый RSS берется из resource.getrusage (в КБ), поэтому бенчмарк работает только в Linux.
+
+Запуск: python BenchLoad.py [--users 1000 5000 20000] [--events 20]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODES = {  # режим -> (импорты, не входящие в замер; замеряемый код)
+    'json.load': ('import json', '''
+with open(path, 'rb') as f:
+    data = json.load(f)
+'''),
+    'stream': ('from JsonStream import iter_items', '''
+with open(path, 'rb') as f:
+    for username, calendar_data, offset, length in iter_items(f):
+        pass
+'''),
+    'lazy index': ('from Backend import Backend', '''
+backend = Backend()
+backend.calendars_storage_file = path
+backend.load_calendar_data()
+'''),
+    'journal replay': ('from Backend import Backend', '''
+backend = Backend()
+backend.calendars_storage_file = path
+backend.journal.append('read', username='user0', notification_id=1)  # непустой журнал - календари загружаются все
+backend.journal.flush()
+backend._try_compact_calendar_data = lambda: None  # замеряется только загрузка, снимок не перезаписывается
+backend.load_calendar_data()
+'''),
+}
+
+CHILD = '''
+import resource, sys
+sys.path.insert(0, {repo!r})
+path = {path!r}
+{imports}
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+{code}
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(after - before)
+'''
+
+
+def generate(path, users, events):
+    """Записывает синтетический снимок календарей, не собирая его целиком в памяти."""
+    event_id = 1
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for i in range(users):
+            calendar_events = []
+            for j in range(events):
+                calendar_events.append({'event_id': event_id, 'title': f'Событие {j}',
+                                        'start_time': f'2024-{j % 12 + 1:02d}-{j % 28 + 1:02d}T10:00:00',
+                                        'end_time': f'2024-{j % 12 + 1:02d}-{j % 28 + 1:02d}T11:00:00',
+                                        'description': 'Описание события ' * 3, 'recurrence': 'один раз',
+                                        'participants': [], 'organizer': None})
+                event_id += 1
+            calendar = {'owner': f'user{i}', 'events': calendar_events, 'unprocessed_events': [],
+                        'notifications': [{'id': i + 1, 'event_id': event_id - 1, 'status': 'read',
+                                           'message': 'Вы были приглашены на событие.'}]}
+            f.write((',\n' if i else '\n') + json.dumps(f'user{i}') + ': ' + json.dumps(calendar))
+        f.write('\n}\n')
+
+
+def peak_rss_kb(path, imports, code):
+    """Прирост пикового RSS процесса (в КБ) при выполнении code после импортов imports."""
+    child = CHILD.format(repo=os.path.dirname(os.path.abspath(__file__)), path=path, imports=imports, code=code)
+    return int(subprocess.run([sys.executable, '-c', child], capture_output=True, text=True, check=True).stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--events', type=int, default=20, help='событий в календаре каждого пользователя')
+    args = parser.parse_args()
+    if resource is None or not sys.platform.startswith('linux'):
+        print('Бенчмарк пропущен: пиковый RSS в КБ (resource.getrusage) замеряется только в Linux.')
+        return
+    print(f"{'пользователей':>14} {'размер, МБ':>11} " + ' '.join(f'{mode + ", МБ":>16}' for mode in MODES))
+    with tempfile.TemporaryDirectory() as tmp:
+        for users in args.users:
+            path = os.path.join(tmp, 'calendars.json')
+            generate(path, users, args.events)
+            peaks = [peak_rss_kb(path, imports, code) / 1024 for imports, code in MODES.values()]
+            print(f'{users:>14} {os.path.getsize(path) / 2 ** 20:>11.1f} ' + ' '.join(f'{peak:>16.1f}' for peak in peaks))
+            for suffix in ('', '.idx'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            journal = os.path.join(tmp, 'calendars.journal')
+            if os.path.exists(journal):
+                os.remove(journal)
+
+
+if __name__ == '__main__':
+    main()
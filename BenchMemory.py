@@ -0,0 +1,87 @@
+"""
+Бенчмарк памяти: сколько байт приходится на одно событие в календаре из 10 000 / 100 000 событий.
+Замеряется прирост выделенной памяти (tracemalloc) при создании событий и добавлении их в календарь
+(вместе с интервальным индексом и словарем Event.events_map).
+Для сравнения приводится прежнее представление события - объект со словарем атрибутов (__dict__)
+и временами начала/окончания в виде datetime.
+
+Запуск: python BenchMemory.py [--events 10000 100000]
+"""
+import argparse
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+
+from Calendar import Calendar
+from Event import Event
+from User import User
+
+
+class LegacyEvent:
+    """Событие без __slots__ с временами datetime, как до перехода на компактное хранение."""
+
+    def __init__(self, title, start_time, end_time, description, participants, recurrence, organizer, event_id):
+        self._title = title
+        self._event_id = event_id
+        self._start_time = start_time
+        self._end_time = end_time
+        self._description = description
+        self._participants = dict.fromkeys(participants)
+        self._organizer = organizer
+        self._recurrence = recurrence
+        self._rule = None
+        self._observers = []
+
+
+def measure(create):
+    """Возвращает прирост выделенной памяти (в байтах) после вызова create; результат create удерживается."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = create()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def calendar_of(count, organizer):
+    calendar = Calendar(organizer.username)
+    start = datetime(2024, 1, 1, 9)
+    for i in range(count):
+        begin = start + timedelta(minutes=30 * i)
+        calendar.add_event(Event(f'Событие {i}', begin, begin + timedelta(hours=1), '', None,
+                                 'один раз', organizer))
+    return calendar
+
+
+def legacy_events_of(count, organizer):
+    """Прежние события, как и Event, регистрируются в словаре по id."""
+    start = datetime(2024, 1, 1, 9)
+    events = [LegacyEvent(f'Событие {i}', start + timedelta(minutes=30 * i), start + timedelta(minutes=30 * i + 60),
+                          '', [organizer], 'один раз', organizer, i + 1) for i in range(count)]
+    return events, {event._event_id: event for event in events}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+    organizer = User('organizer', 'Password123')
+    print(f"{'событий':>8} {'календарь, байт/событие':>24} {'событие, байт':>14} {'прежнее событие, байт':>22}")
+    for count in args.events:
+        Event.events_map.clear()
+        Event.count = 1
+        calendar_bytes = measure(lambda: calendar_of(count, organizer))
+        Event.events_map.clear()
+        Event.count = 1
+        event_bytes = measure(lambda: [Event(f'Событие {i}', datetime(2024, 1, 1, 9) + timedelta(minutes=30 * i),
+                                             datetime(2024, 1, 1, 10) + timedelta(minutes=30 * i), '', None,
+                                             'один раз', organizer) for i in range(count)])
+        Event.events_map.clear()
+        legacy_bytes = measure(lambda: legacy_events_of(count, organizer))
+        print(f'{count:>8} {calendar_bytes / count:>24.0f} {event_bytes / count:>14.0f} {legacy_bytes / count:>22.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Бенчмарк сериализаторов снимка календарей: размер и время сериализации/разбора (туда и обратно).
+Для сравнения приводится прежний формат - json.dump(indent=4) с экранированием кириллицы.
+Сериализаторы, библиотеки которых не установлены, пропускаются.
+
+Запуск: python BenchSerializer.py [--users 1000] [--events 20] [--repeat 5]
+"""
+import argparse
+import json
+import timeit
+
+from Serializer import SERIALIZERS
+
+
+class LegacyJsonSerializer:
+    name = 'json (indent=4)'
+
+    def dumps(self, obj):
+        return json.dumps(obj, indent=4).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+
+def generate(users, events):
+    """Синтетические календари, события записаны внутри календарей (словари Event.to_dict)."""
+    calendars = {}
+    event_id = 1
+    for i in range(users):
+        calendar_events = []
+        for j in range(events):
+            calendar_events.append({'event_id': event_id, 'title': f'Событие {j}',
+                                    'start_time': f'2024-{j % 12 + 1:02d}-{j % 28 + 1:02d}T10:00:00',
+                                    'end_time': f'2024-{j % 12 + 1:02d}-{j % 28 + 1:02d}T11:00:00',
+                                    'description': 'Описание события ' * 3,
+                                    'recurrence': ('один раз', 'каждую неделю', 'каждый месяц')[j % 3],
+                                    'participants': [f'user{i}', f'user{(i + 1) % users}'], 'organizer': f'user{i}'})
+            event_id += 1
+        calendars[f'user{i}'] = {'owner': f'user{i}', 'events': calendar_events, 'unprocessed_events': [],
+                                 'notifications': [{'id': i + 1, 'event_id': event_id - 1, 'status': 'unread',
+                                                    'message': 'Вы были приглашены на событие.'}]}
+    return calendars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--events', type=int, default=20, help='событий в календаре каждого пользователя')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    calendars = list(generate(args.users, args.events).values())
+    serializers = [LegacyJsonSerializer()] + [serializer() for serializer in SERIALIZERS.values() if serializer.available]
+    print(f"{'сериализатор':>16} {'размер, КБ':>11} {'запись, мс':>11} {'чтение, мс':>11}")
+    for serializer in serializers:
+        payloads = [serializer.dumps(calendar) for calendar in calendars]
+        assert [serializer.loads(payload) for payload in payloads] == calendars
+        dump_time = min(timeit.repeat(lambda: [serializer.dumps(calendar) for calendar in calendars],
+                                      number=1, repeat=args.repeat))
+        load_time = min(timeit.repeat(lambda: [serializer.loads(payload) for payload in payloads],
+                                      number=1, repeat=args.repeat))
+        size = sum(len(payload) for payload in payloads)
+        print(f'{serializer.name:>16} {size / 1024:>11.1f} {dump_time * 1000:>11.1f} {load_time * 1000:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,59 +1,137 @@
 """
 Класс календаря - хранит события.
-он умеет искать все события из промежутка (в том числе повторяющиеся)
+он умеет искать все события из промежутка (в том числе повторяющиеся),
+для этого разовые события хранятся в индексе интервалов (см. IntervalIndex), а периодические - отдельно
 он умеет добавлять/удалять события.
 У каждого календаря ровно один пользователь.
 """
 
 from datetime import datetime, timedelta
-from dateutil.rrule import rrule, WEEKLY, DAILY, MONTHLY, YEARLY
-from Event import Event
-from collections import defaultdict
+from Event import Event, Occurrence
+from FreeBusy import day_bitmap, day_bounds
+from Recurrence import MIN_STEPS, RecurrenceRule, expand_fixed
+from collections import defaultdict, deque
+from itertools import chain
+from operator import attrgetter
+from IntervalIndex import IntervalIndex
 from Notification import Notification
 
+CONFLICT_HORIZON = timedelta(days=365)  # на сколько вперед проверяются повторения периодического события
+
 
 class RepetitionError(Exception): # ошибка, возникающая при попытке повторного добавления участника в событие
     pass
 
 class Calendar:
+    __slots__ = ('_events', '_unprocessed_events', '_notifications', '_unread', '_owner', '_index', '_recurring',
+                 '_busy')
+
     def __init__(self, owner:str):
-        self._events = []
-        self._unprocessed_events = []
-        self._notifications = []
+        # события хранятся в словарях (упорядоченных множествах): порядок добавления и проверка/удаление за O(1)
+        self._events = {}
+        self._unprocessed_events = {}
+        self._notifications = []  # прочитанные уведомления, старые переносятся в архив (см. Backend.archive_notifications)
+        self._unread = deque()  # очередь непрочитанных уведомлений, ее начало - курсор прочтения
         self._owner = owner
+        self._index = IntervalIndex(self._event_bounds)  # разовые события
+        self._recurring = {}  # периодические события: их повторения вычисляются по правилу (см. Recurrence)
+        self._busy = {}  # день -> битовая карта занятых минут (см. FreeBusy), вычисляется при первом запросе
 
     def to_dict(self):
-        """Преобразование календаря в словарь для дальнейшей записи в json файл."""
+        """Преобразование календаря в словарь для дальнейшей записи в json файл.
+        События хранятся в общей таблице событий (см. Backend.compact_calendar_data), календарь ссылается на них по id."""
         return {
             "owner": self.owner,
-            "events": [event.to_dict() for event in self.events],
-            "unprocessed_events": [event.to_dict() for event in self.unprocessed_events],
+            "events": [event.event_id for event in self._events],
+            "unprocessed_events": [event.event_id for event in self._unprocessed_events],
             "notifications": [notification.to_dict() for notification in self.notifications]
         }
 
     @staticmethod
-    def from_dict(data):
-        """Создание календаря из словаря."""
+    def from_dict(data, load_event=None):
+        """Создание календаря из словаря.
+        События задаются идентификаторами (их загружает функция load_event: event_id -> Event или None)
+        или, в старом формате, словарями Event.to_dict."""
         calendar = Calendar(data["owner"])
-        calendar._events = [Event.create_or_get_event(event_data) for event_data in data["events"]]
-        calendar._unprocessed_events = [Event.create_or_get_event(event_data) for event_data in data["unprocessed_events"]]
-        calendar._notifications = [Notification.from_dict(notification_data) for notification_data in data["notifications"]]
+        for event_data in data["events"]:
+            event = Calendar._load_event(event_data, load_event)
+            if event is not None:
+                calendar.add_event(event)
+        calendar._unprocessed_events = dict.fromkeys(event for event in (Calendar._load_event(event_data, load_event)
+                                                                         for event_data in data["unprocessed_events"])
+                                                     if event is not None)
+        for notification_data in data["notifications"]:
+            calendar.notify(Notification.from_dict(notification_data))
         return calendar
 
+    @staticmethod
+    def _load_event(event_data, load_event=None):
+        """Событие, уже загруженное в память вместе с другим календарем (оно актуальнее сохраненной копии),
+        событие по ссылке (id) или новое событие из словаря."""
+        if not isinstance(event_data, dict):
+            event_id = int(event_data)
+            return Event.events_map.get(event_id) or (load_event(event_id) if load_event is not None else None)
+        return Event.events_map.get(int(event_data['event_id'])) or Event.create_or_get_event(event_data)
+
     @property
     def events(self):
-        """Список событий в календаре."""
-        return self._events
+        """События календаря (кортеж только для чтения, для изменения используйте add_event/remove_event)."""
+        return tuple(self._events)
 
     @property
     def unprocessed_events(self):
-        """Список непрошедших событий в календаре."""
-        return self._unprocessed_events
+        """Непрошедшие события календаря (кортеж только для чтения)."""
+        return tuple(self._unprocessed_events)
+
+    def has_event(self, event):
+        """Проверяет, есть ли событие в календаре."""
+        return event in self._events
+
+    def has_unprocessed_event(self, event):
+        """Проверяет, есть ли необработанное приглашение на событие."""
+        return event in self._unprocessed_events
 
     @property
     def notifications(self):
-        """Список уведомлений в календаре."""
-        return self._notifications
+        """Уведомления календаря в порядке поступления (кортеж только для чтения).
+        Прочитанные и непрочитанные хранятся раздельно, порядок восстанавливается по id."""
+        return tuple(sorted(chain(self._notifications, self._unread), key=attrgetter('id')))
+
+    @property
+    def unread_notifications(self):
+        """Список непрочитанных уведомлений в порядке поступления."""
+        return list(self._unread)
+
+    def has_notification(self, notification_id):
+        """Проверяет, есть ли в календаре (не в архиве) уведомление с указанным id."""
+        return any(n.id == notification_id for n in self._unread) or \
+            any(n.id == notification_id for n in self._notifications)
+
+    def mark_notification_read(self, notification_id):
+        """Помечает уведомление прочитанным и переносит его из очереди непрочитанных в прочитанные.
+        Уведомления обычно читаются по порядку, тогда это начало очереди и операция выполняется за O(1)."""
+        if self._unread and self._unread[0].id == notification_id:
+            n = self._unread.popleft()
+        else:
+            n = next((n for n in self._unread if n.id == notification_id), None)
+            if n is None:
+                return None
+            self._unread.remove(n)
+        n = n.marked_read()
+        self._notifications.append(n)
+        return n
+
+    def pop_archivable_notifications(self, keep):
+        """Убирает из календаря прочитанные уведомления, кроме keep последних, и возвращает их для архивации."""
+        archived = self._notifications[:max(len(self._notifications) - keep, 0)]
+        del self._notifications[:len(archived)]
+        return archived
+
+    def remove_notifications(self, notification_ids):
+        """Убирает из календаря уведомления с указанными id (перенесенные в архив)."""
+        notification_ids = set(notification_ids)
+        self._notifications = [n for n in self._notifications if n.id not in notification_ids]
+        self._unread = deque(n for n in self._unread if n.id not in notification_ids)
 
     @property
     def owner(self):
@@ -67,33 +145,148 @@ class Calendar:
     def add_event(self, new_event):
         """Добавление события в календарь"""
         if isinstance(new_event, Event):
-            self._events.append(new_event)
+            if new_event not in self._events:
+                self._events[new_event] = None
+                self._add_to_index(new_event)
+                new_event.subscribe(self)
+                self._invalidate_busy(new_event)
         else:
             raise TypeError('Событие,добавляемое в календарь должно быть объектом класса Event.')
 
+    @staticmethod
+    def _event_bounds(event):
+        """Границы разового события для индекса."""
+        return event.start_time, event.end_time
 
-    def get_events_in_range(self, start_date, end_date):
-        """Находит события, которые начинаются в указанный период времени."""
-        rec_dct = {i: freq for i, freq in zip(['один раз', 'каждый день', 'каждую неделю', 'каждый месяц', 'каждый год'], [0, DAILY, WEEKLY, MONTHLY, YEARLY])}
+    def _add_to_index(self, event):
+        """Добавляет событие в индекс разовых событий или в список периодических."""
+        if event.rule is not None:
+            self._recurring[event] = None
+        else:
+            self._index.add(event.event_id, event)
+
+    def _remove_from_index(self, event):
+        self._index.remove(event.event_id)
+        self._recurring.pop(event, None)
+
+    def event_changed(self, event):
+        """Переиндексирует событие после изменения его времени или периодичности."""
+        self._remove_from_index(event)
+        self._add_to_index(event)
+        self._busy.clear()  # прежние границы события неизвестны
+
+    def _invalidate_busy(self, event):
+        """Сбрасывает карты занятости дней, которые затрагивает событие (для периодического - все дни после начала)."""
+        if not self._busy or event.start_time is None:
+            return
+        first = event.start_time.date()
+        if event.rule is not None:
+            for day in [day for day in self._busy if day >= first]:
+                del self._busy[day]
+        else:
+            last = (event.end_time or event.start_time).date()
+            for offset in range((last - first).days + 1):
+                self._busy.pop(first + timedelta(days=offset), None)
+
+    def busy_bitmap(self, day):
+        """Битовая карта занятых минут дня day (date): бит i установлен, если i-я минута дня занята.
+        Карта вычисляется по интервальному индексу и хранится до изменения событий этого дня."""
+        bitmap = self._busy.get(day)
+        if bitmap is None:
+            bitmap = self._busy[day] = day_bitmap(self.iter_occurrences(*day_bounds(day)), day)
+        return bitmap
+
+    def iter_occurrences(self, start_date, end_date):
+        """Лениво перебирает события и повторения периодических событий, пересекающиеся с периодом.
+        Для периодических событий возвращаются легковесные объекты Occurrence."""
+        events = self._index.overlapping(start_date, end_date)
+        recurring = [event for event in self._recurring if event.start_time <= end_date]
+        if recurring:
+            events = sorted(events + recurring, key=lambda event: (event.start_time, event.event_id))
+        return self.expand_events(events, start_date, end_date)
+
+    def find_conflicts(self, start_time, end_time, recurrence=None, exclude=None, horizon=CONFLICT_HORIZON):
+        """Находит события и повторения периодических событий календаря, пересекающиеся по времени с событием
+        (start_time, end_time, recurrence). Касание границами пересечением не считается, событие exclude пропускается.
+        Повторения проверяемого периодического события берутся на horizon вперед от start_time.
+        Разовые события ищутся в интервальном индексе за O(log n + k) для каждого повторения проверяемого события.
+        Для периодических событий возвращается первое пересекающееся повторение, оно находится арифметически
+        по правилам повторения, без перебора повторений обоих событий."""
+        rule = RecurrenceRule.from_recurrence(recurrence, start_time)
+        duration = end_time - start_time
+        last = start_time + horizon if rule is not None else start_time  # начало последнего проверяемого повторения
+        conflicts = {}
+        for start in rule.between(start_time, last) if rule is not None else [start_time]:
+            end = start + duration
+            for event in self._index.overlapping(start, end):
+                if event != exclude and event.start_time < end and (event.end_time or event.start_time) > start:
+                    conflicts[event] = None
+        conflicts = list(conflicts)
+        for event in self._recurring:
+            if event != exclude:
+                start = self._first_overlap(rule, start_time, duration, last, event.rule, event.get_timing())
+                if start is not None:
+                    conflicts.append(Occurrence(event, start, start + event.get_timing()))
+        return conflicts
+
+    @staticmethod
+    def _first_overlap(rule, start_time, duration, last, other, other_duration):
+        """Начало первого повторения правила other (длительностью other_duration), которое пересекается
+        с событием (start_time, duration, rule) или его повторением, начинающимся не позже last. None - если такого нет.
+        Перебираются повторения более редкого из двух правил, повторение другого ищется арифметически."""
+        if rule is None:
+            return other.first_between(start_time - other_duration, start_time + duration)
+        if not rule.may_overlap(duration, other, other_duration):
+            return None
+        if MIN_STEPS[rule.freq] >= MIN_STEPS[other.freq]:
+            for start in rule.between(max(start_time, other.dtstart - duration), last):
+                found = other.first_between(start - other_duration, start + duration)
+                if found is not None:
+                    return found
+        else:
+            for found in other.between(max(other.dtstart, start_time - other_duration), last + duration):
+                start = rule.first_between(found - duration, found + other_duration)
+                if start is not None and start <= last:
+                    return found
+        return None
+
+    @staticmethod
+    def expand_events(events, start_date, end_date):
+        """Перебирает события из events, пересекающиеся с периодом, раскрывая периодические в повторения.
+        Повторения ежедневных и еженедельных событий вычисляются сразу для всех событий (см. expand_fixed)."""
+        events = list(events)
+        recurring = [event for event in events if event.rule is not None]
+        expanded = dict(zip(recurring, expand_fixed([event.rule for event in recurring],
+                                                    [start_date - event.get_timing() for event in recurring],
+                                                    end_date)))
+        for event in events:
+            if event in expanded:
+                duration = event.get_timing()
+                for dt in expanded[event]:
+                    yield Occurrence(event, dt, dt + duration)
+            elif event.start_time <= end_date and (event.end_time or event.start_time) >= start_date:
+                yield event
+
+    @staticmethod
+    def group_by_day(occurrences):
+        """Группирует события и повторения по дням начала."""
         daily_events = defaultdict(list)
-        start_date = start_date
-        end_date = end_date
-        for event in sorted(self.events, key=lambda x: x.start_time):
-            if event.start_time > end_date:
-                break
-            if rec_dct[event.recurrence]:
-                freq_rule = rrule(rec_dct[event.recurrence], dtstart=event.start_time)
-                for dt in sorted(freq_rule.between(start_date - timedelta(seconds=1), end_date + timedelta(seconds=1))): # границы диапазона не включаются в выборку
-                    daily_events[dt.strftime('%a, %d.%m.%Y')].append(event.generate_periodic_event(dt, dt + event.get_timing()))
-            elif start_date <= event.start_time <= end_date:
+        for event in occurrences:
+            if isinstance(event, Occurrence):
+                daily_events[event.start_time.strftime('%a, %d.%m.%Y')].append(event)
+            else:
                 daily_events[event.start_time.strftime('%d.%m.%Y')].append(event)
         return daily_events
 
+    def get_events_in_range(self, start_date, end_date):
+        """Находит события, которые пересекаются с указанным периодом времени."""
+        return self.group_by_day(self.iter_occurrences(start_date, end_date))
+
     def add_unprocessed_events(self, event):
         """Добавление необработанного события в календарь участника, после его приглашения в событие"""
         if isinstance(event, Event):
-            if event not in self.unprocessed_events and event not in self.events:
-                self.unprocessed_events.append(event)
+            if event not in self._unprocessed_events and event not in self._events:
+                self._unprocessed_events[event] = None
             else:
                 raise RepetitionError('Участник уже был приглашен на событие.')
         else:
@@ -101,20 +294,28 @@ class Calendar:
 
     def get_unprocessed_events(self):
         """Получение всех необработанных событий для пользователя."""
-        return self._unprocessed_events
+        return list(self._unprocessed_events)
 
     def mark_event_as_processed(self, event):
         """Отметить событие как обработанное для пользователя и добавить его в список events."""
-        self._unprocessed_events.remove(event)
+        if event not in self._unprocessed_events:
+            raise ValueError('Приглашение на событие не найдено.')
+        del self._unprocessed_events[event]
     def __repr__(self):
         return f"Calendar(User=@{self._owner})"
 
     def remove_event(self, event):
         """Удаление события из календаря."""
-        if event in self.events:
-            self.events.remove(event)
+        if event in self._events:
+            del self._events[event]
+            self._remove_from_index(event)
+            event.unsubscribe(self)
+            self._invalidate_busy(event)
 
     def notify(self, n: Notification):
         """Уведомление об изменениях произошедших с событием."""
-        self.notifications.append(n)
+        if n.status == 'unread':
+            self._unread.append(n)
+        else:
+            self._notifications.append(n)
 
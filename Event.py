@@ -14,30 +14,63 @@
 Иметь покрытие тестами
 Комментарии на нетривиальных методах и в целом документация
 """
+import threading
 from datetime import datetime, timedelta
+from Recurrence import RecurrenceRule
 from User import User
 
+EPOCH = datetime(1970, 1, 1)
+MINUTE = timedelta(minutes=1)
+
+
+def to_minutes(dt):
+    """Переводит datetime (или строку в формате Event.formate_date) в целое число минут от EPOCH,
+    секунды отбрасываются. None остается None."""
+    if dt is None:
+        return None
+    if isinstance(dt, str):
+        dt = Event.formate_date(dt)
+    return (dt - EPOCH) // MINUTE
+
+
+def from_minutes(minutes):
+    """Переводит число минут от EPOCH обратно в datetime."""
+    return None if minutes is None else EPOCH + timedelta(minutes=minutes)
+
 
 class Event:
     """
     An Event class representing an event with a title, description, participants, and occurrence type.
+    Время начала и окончания хранится как целое число минут от EPOCH, свойства start_time/end_time возвращают datetime.
     """
+    __slots__ = ('_title', '_event_id', '_start_time', '_end_time', '_description', '_participants', '_organizer',
+                 '_recurrence', '_rule', '_observers')
     events_map = {} #  Словарь, содержащий все созданные события с ключами - идентификаторами событий.
     count = 1 # Счетчик объектов класса, используется для присвоения уникального идентификатора каждому событию.
+    id_allocator = None  # общий для процессов выделитель id (см. IdAllocator), None - используется только count
+    _id_lock = threading.Lock()  # события создаются из разных потоков
 
     def __init__(self, title, start_time=None, end_time=None, description="", participants=None, recurrence=None,
-                 organizer:User=None):
+                 organizer:User=None, event_id=None):
         self._title = title
-        self._event_id = Event.count
-        Event.count += 1 # создание уникального id
-        self._start_time = start_time
-        self._end_time = end_time
+        with Event._id_lock:
+            if event_id is None:
+                event_id = Event.id_allocator.allocate(Event.count) if Event.id_allocator is not None else Event.count
+            Event.count = max(Event.count, event_id + 1) # создание уникального id
+        self._event_id = event_id
+        self._start_time = to_minutes(start_time)
+        self._end_time = to_minutes(end_time)
         self._description = description
-        self._participants = participants or []
+        # участники хранятся в словаре (упорядоченное множество): порядок добавления и проверка участия за O(1)
+        if isinstance(participants, User):  # один участник, переданный без списка
+            participants = [participants]
+        self._participants = dict.fromkeys(participants or [])
         self._organizer = organizer
         if isinstance(self._organizer, User) and self._organizer not in self._participants:
-            self._participants.insert(0, self._organizer)  # Insert organizer at the beginning of the participants list
+            self._participants = {self._organizer: None, **self._participants}  # организатор - первый участник
         self._recurrence = recurrence
+        self._rule = None  # скомпилированное правило повторения, см. свойство rule
+        self._observers = []  # календари, в индексах которых находится событие
         Event.events_map[self._event_id] = self
 
 
@@ -72,37 +105,49 @@ class Event:
 
     @recurrence.setter
     def recurrence(self, recurrence):
-        self.recurrence = recurrence
+        self._recurrence = recurrence
+        self._rule = None
+        self._notify_observers()
+
+    @property
+    def rule(self):
+        """Скомпилированное правило повторения (кэшируется), None для неповторяющегося события."""
+        if self._rule is None:
+            self._rule = RecurrenceRule.from_recurrence(self._recurrence, self.start_time)
+        return self._rule
+
     @property
     def start_time(self):
-        return self._start_time
+        return from_minutes(self._start_time)
 
     @start_time.setter
     def start_time(self, start_time):
-        if isinstance(start_time, str):
-            self._start_time = self.formate_date(start_time)
-        else:
-            self._start_time = start_time
+        self._start_time = to_minutes(start_time)
+        self._rule = None
+        self._notify_observers()
 
     @property
     def participants(self):
-        return self._participants
+        """Участники события (кортеж только для чтения, для изменения используйте add_participant/remove_participant)."""
+        return tuple(self._participants)
 
     @participants.setter
     def participants(self, participants):
         if isinstance(participants, list):
-            self._participants.extend(participants)
+            self._participants.update(dict.fromkeys(participants))
+
+    def has_participant(self, user):
+        """Проверяет, является ли пользователь участником события."""
+        return user in self._participants
 
     @property
     def end_time(self):
-        return self._end_time
+        return from_minutes(self._end_time)
 
     @end_time.setter
     def end_time(self, end_time):
-        if isinstance(end_time, str):
-            self._end_time = self.formate_date(end_time)
-        else:
-            self._end_time = end_time
+        self._end_time = to_minutes(end_time)
+        self._notify_observers()
 
     def update_event(self, **kwargs):
         """Обновляет атрибуты события с использованием предоставленных именованных аргументов, участники обрабатываются отдельно"""
@@ -110,12 +155,33 @@ class Event:
 
         for key, value in kwargs.items():
             # Assuming the attribute names begin with underscore and match the keys directly
+            if key in ('start_time', 'end_time'):
+                value = to_minutes(value)
             if hasattr(self, f'_{key}'):
                 setattr(self, f'_{key}', value)
 
         if participants is not None:
-            unique_participants = set(self.participants + participants)
-            self._participants = list(unique_participants)
+            self._participants.update(dict.fromkeys(participants))
+
+        if kwargs.keys() & {'start_time', 'recurrence'}:  # правило повторения нужно пересобрать
+            self._rule = None
+        if kwargs.keys() & {'start_time', 'end_time', 'recurrence'}:  # изменились границы события
+            self._notify_observers()
+
+    def subscribe(self, observer):
+        """Подписывает наблюдателя (например, календарь) на изменения времени события."""
+        if observer not in self._observers:
+            self._observers.append(observer)
+
+    def unsubscribe(self, observer):
+        """Отписывает наблюдателя от изменений события."""
+        if observer in self._observers:
+            self._observers.remove(observer)
+
+    def _notify_observers(self):
+        """Сообщает наблюдателям, что время или периодичность события изменились."""
+        for observer in self._observers:
+            observer.event_changed(self)
 
     @classmethod
     def create_or_get_event(cls, data):
@@ -134,12 +200,22 @@ class Event:
                 existing_event.update_event(**data)
                 return existing_event
             else:
-                return cls(**data)
+                return cls(**data, event_id=event_id)  # загруженное событие сохраняет свой идентификатор
         except Exception as e:
             print(str(e))
 
 
 
+    @classmethod
+    def restore(cls, data):
+        """Создает или обновляет событие по записи журнала, список участников заменяется целиком."""
+        usernames = data.get('participants') or []
+        event = cls.create_or_get_event(dict(data, participants=None))
+        if event is not None:
+            participants = [User.get_user_by_username(username) for username in usernames]
+            event._participants = dict.fromkeys(participant for participant in participants if participant is not None)
+        return event
+
     @staticmethod
     def formate_recurrence(recurrence):
         """Проверяет валидность и возвращает удобочитаемое описание частоты повторения события."""
@@ -153,16 +229,15 @@ class Event:
 
     def leave_event(self, participant):
         """Удаляет участника из списка участников события."""
-        if participant in self.participants:
-            self.participants.remove(participant)
+        self._participants.pop(participant, None)
 
     def to_dict(self):
         """Подготавливает данные из Event для записи в json."""
         return {
             "event_id": self._event_id,
             "title": self.title,
-            "start_time": self._start_time.isoformat() if self._start_time else None,
-            "end_time": self._end_time.isoformat() if self._end_time else None,
+            "start_time": self.start_time.isoformat() if self._start_time is not None else None,
+            "end_time": self.end_time.isoformat() if self._end_time is not None else None,
             "description": self.description,
             "recurrence": self.recurrence,
             "participants": [participant.username for participant in self._participants],
@@ -187,12 +262,9 @@ Cобытие: {self.title},
 Периодичность: {self.recurrence}""")
 
     def generate_periodic_event(self, start_time, end_time):
-        """Генерирует периодическое событие на основе текущего, внося изменения во времена начала и окончания."""
-        event_copy = Event(title=self.title, description=self.description, recurrence=self.recurrence,
-                           organizer=self.organizer)
-        event_copy.start_time = start_time
-        event_copy.end_time = end_time
-        return event_copy
+        """Возвращает повторение периодического события с указанными временами начала и окончания.
+        Повторение не является самостоятельным событием и не регистрируется в events_map."""
+        return Occurrence(self, start_time, end_time)
 
     def get_timing(self):
         """Возвращает продолжительность события как разность между временем окончания и временем начала."""
@@ -201,14 +273,14 @@ Cобытие: {self.title},
     def add_participant(self, participant: User):
         """Добавляет пользователя в список участников события, если он еще не добавлен."""
         if participant not in self._participants:
-            self._participants.append(participant)
+            self._participants[participant] = None
         else:
             raise TypeError('Участник уже был добавлен в событие')
 
     def remove_participant(self, user: User):
         """Удаляет пользователя из списка участников события, если он там присутствует."""
         if user in self._participants:
-            self._participants.remove(user)
+            del self._participants[user]
         else:
             raise ValueError
 
@@ -217,6 +289,10 @@ Cобытие: {self.title},
             return self.event_id == other.event_id
         return False
 
+    def __hash__(self):
+        """Хэширует идентификатор события, события можно хранить в множествах и ключах словарей."""
+        return hash(self.event_id)
+
     @classmethod
     def delete_event(cls, event):
         """Удаляет событие из словаря events_map."""
@@ -226,3 +302,43 @@ Cобытие: {self.title},
             raise ValueError(f"No event found with event_id {event.event_id}")
 
 
+
+
+class Occurrence:
+    """
+    Повторение периодического события - ссылка на исходное событие и собственные времена начала и окончания.
+    Остальные атрибуты (название, описание, участники...) берутся из исходного события.
+    """
+    __slots__ = ('event', 'start_time', 'end_time')
+
+    def __init__(self, event, start_time, end_time):
+        self.event = event
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def __getattr__(self, name):
+        return getattr(self.event, name)
+
+    def get_timing(self):
+        """Возвращает продолжительность повторения."""
+        return self.end_time - self.start_time
+
+    def __eq__(self, other):
+        if isinstance(other, Occurrence):
+            return self.event == other.event and self.start_time == other.start_time
+        return False
+
+    def __hash__(self):
+        return hash((self.event.event_id, self.start_time))
+
+    def __repr__(self):
+        return f"Occurrence(event_id={self.event.event_id}, start_time={self.start_time!r})"
+
+    def __str__(self):
+        return (f"""
+Cобытие: {self.title},
+Начало: {self.start_time.strftime('%d.%m.%Y %H:%M')},
+Конец: {self.end_time.strftime('%d.%m.%Y %H:%M')},
+Организатор: {self.organizer},
+Участники: {', '.join([participant.username for participant in self.participants])},
+Периодичность: {self.recurrence}""")
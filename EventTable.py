@@ -0,0 +1,106 @@
+"""
+Колоночное представление календарей для массовых запросов по промежуткам времени (аналитика, недельный вид).
+Каждая строка таблицы - событие в календаре одного владельца, столбцы - массивы NumPy:
+начало и окончание (в минутах от Event.EPOCH), код периодичности, номер владельца и идентификатор события.
+Пересечение с промежутком проверяется векторным сравнением сразу для всех строк:
+один промежуток для всех пользователей (events_in_range) или много промежутков для одного (user_events_in_windows).
+
+Таблица - снимок календарей на момент создания, после изменений ее нужно построить заново.
+Результаты совпадают с Calendar.get_events_in_range (в том числе порядок событий внутри дня):
+строки упорядочены так же, как в интервальном индексе календаря, а периодические события
+раскрываются в повторения через Calendar.expand_events.
+Если NumPy не установлен, запросы выполняются через индексы самих календарей.
+"""
+from Calendar import Calendar
+from Event import EPOCH, MINUTE, to_minutes
+from Recurrence import RECURRENCE_FREQUENCIES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+RECURRENCE_CODES = {recurrence: code for code, recurrence in enumerate(RECURRENCE_FREQUENCIES)}  # 0 - один раз
+NEVER = 2 ** 63 - 1  # окончание периодического события: оно повторяется бесконечно
+
+
+def ceil_minutes(dt):
+    """Число минут от EPOCH, округленное вверх: событие заканчивается не раньше dt, если его окончание >= результата."""
+    return -((EPOCH - dt) // MINUTE)
+
+
+class EventTable:
+    available = np is not None
+
+    def __init__(self, calendars):
+        """calendars - словарь username -> Calendar (например, Backend.calendars)."""
+        self.calendars = dict(calendars)
+        self.owners = list(self.calendars)
+        self.events = []  # строка таблицы -> событие
+        if not self.available:
+            return
+        starts, ends, codes, owners, event_ids = [], [], [], [], []
+        for owner, calendar in enumerate(self.calendars.values()):
+            for event in calendar.events:
+                start = to_minutes(event.start_time)
+                if start is None:
+                    continue
+                self.events.append(event)
+                starts.append(start)
+                if event.rule is not None:
+                    ends.append(NEVER)
+                else:
+                    end = to_minutes(event.end_time)
+                    ends.append(start if end is None else end)
+                codes.append(RECURRENCE_CODES.get(event.recurrence, 0))
+                owners.append(owner)
+                event_ids.append(event.event_id)
+        event_ids = np.array(event_ids, dtype=np.int64)
+        starts = np.array(starts, dtype=np.int64)
+        owners = np.array(owners, dtype=np.int32)
+        order = np.lexsort((event_ids, starts, owners))  # как в индексе календаря: по началу, затем по id
+        self.events = [self.events[row] for row in order]
+        self.event_ids = event_ids[order]
+        self.starts = starts[order]
+        self.ends = np.array(ends, dtype=np.int64)[order]
+        self.codes = np.array(codes, dtype=np.int8)[order]
+        self.owner_ids = owners[order]
+        # строки владельца занимают непрерывный отрезок [bounds[i], bounds[i + 1])
+        self.bounds = np.searchsorted(self.owner_ids, np.arange(len(self.owners) + 1))
+
+    @classmethod
+    def from_backend(cls, backend, users=None):
+        """Таблица по календарям пользователей users (по умолчанию - всех), незагруженные календари загружаются."""
+        if users is None:
+            return cls(backend.calendars)
+        return cls({user.username: backend.get_calendar(user) for user in users})
+
+    def _expand(self, rows, start_date, end_date):
+        """События строк rows (одного владельца), сгруппированные по дням, как в Calendar.get_events_in_range."""
+        events = (self.events[row] for row in rows.tolist())
+        return Calendar.group_by_day(Calendar.expand_events(events, start_date, end_date))
+
+    def events_in_range(self, start_date, end_date):
+        """События всех владельцев, пересекающиеся с промежутком: словарь username -> события по дням."""
+        if not self.available:
+            return {owner: calendar.get_events_in_range(start_date, end_date)
+                    for owner, calendar in self.calendars.items()}
+        mask = (self.starts <= to_minutes(end_date)) & (self.ends >= ceil_minutes(start_date))
+        rows = np.flatnonzero(mask)
+        split = np.searchsorted(rows, self.bounds)
+        return {owner: self._expand(rows[split[i]:split[i + 1]], start_date, end_date)
+                for i, owner in enumerate(self.owners)}
+
+    def user_events_in_windows(self, username, windows):
+        """События владельца для каждого промежутка (start_date, end_date) из windows, список в порядке windows."""
+        windows = list(windows)
+        if not self.available:
+            calendar = self.calendars[username]
+            return [calendar.get_events_in_range(start_date, end_date) for start_date, end_date in windows]
+        owner = self.owners.index(username)
+        first, last = self.bounds[owner], self.bounds[owner + 1]
+        lows = np.array([ceil_minutes(start_date) for start_date, _ in windows], dtype=np.int64)
+        highs = np.array([to_minutes(end_date) for _, end_date in windows], dtype=np.int64)
+        mask = (self.starts[None, first:last] <= highs[:, None]) & (self.ends[None, first:last] >= lows[:, None])
+        return [self._expand(np.flatnonzero(mask[i]) + first, start_date, end_date)
+                for i, (start_date, end_date) in enumerate(windows)]
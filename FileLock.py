@@ -0,0 +1,82 @@
+"""
+Рекомендательная (advisory) блокировка открытого файла между процессами:
+fcntl.flock в POSIX-системах, msvcrt.locking в Windows.
+"""
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def locked(f, exclusive=True):
+    """Удерживает блокировку файла f на время блока with. Разделяемая блокировка (exclusive=False)
+    позволяет нескольким читателям работать одновременно, в Windows блокировка всегда исключительная."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield f
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class VersionLock:
+    """
+    Файл блокировки с номером версии защищаемых данных (например, calendars.json.lock для calendars.json).
+    Оптимистичная проверка версий: процесс запоминает версию при чтении данных, готовит новую версию
+    без блокировки и только на время замены файлов берет исключительную блокировку. Если версия за это время
+    изменилась (данные сохранил другой процесс), замена отменяется. Каждая замена увеличивает версию.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @contextmanager
+    def acquire(self, exclusive=False):
+        """Удерживает блокировку (разделяемую - для чтения данных, исключительную - для замены).
+        Возвращает удерживаемую блокировку (HeldVersion): у каждого вызова свой открытый файл,
+        поэтому блокировку могут одновременно брать разные потоки."""
+        with open(self.path, 'a+', encoding='utf-8') as f, locked(f, exclusive):
+            yield HeldVersion(f)
+
+    @property
+    def version(self):
+        """Текущая версия данных, читается под разделяемой блокировкой (0 - данные еще не сохранялись)."""
+        with self.acquire(exclusive=False) as held:
+            return held.version
+
+
+class HeldVersion:
+    """Версия в файле блокировки, которая удерживается блоком VersionLock.acquire."""
+
+    def __init__(self, f):
+        self._file = f
+
+    @property
+    def version(self):
+        self._file.seek(0)
+        text = self._file.read().strip()
+        return int(text) if text else 0
+
+    def bump(self):
+        """Увеличивает версию, вызывается под исключительной блокировкой после замены данных."""
+        version = self.version + 1
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(str(version))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return version
+
@@ -0,0 +1,61 @@
+"""
+Занятость пользователя по минутам (free/busy).
+Для каждого дня календарь хранит битовую карту - целое число из 1440 бит, бит i установлен,
+если i-я минута дня занята событием или повторением периодического события (см. Calendar.busy_bitmap).
+Карты нескольких дней склеиваются в одно число, занятость группы - побитовое ИЛИ карт участников,
+свободные промежутки - серии нулевых бит.
+"""
+from datetime import datetime, timedelta
+
+MINUTES_PER_DAY = 24 * 60
+MINUTE = timedelta(minutes=1)
+
+
+def day_bounds(day):
+    """Начало дня и последний момент дня (границы включаются, как в Calendar.get_events_in_range)."""
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1) - timedelta(microseconds=1)
+
+
+def day_bitmap(occurrences, day):
+    """Битовая карта занятых минут дня day по событиям и повторениям occurrences."""
+    day_start, _ = day_bounds(day)
+    bitmap = 0
+    for occurrence in occurrences:
+        if occurrence.end_time is None:
+            continue
+        first = max((occurrence.start_time - day_start) // MINUTE, 0)
+        last = min(-((day_start - occurrence.end_time) // MINUTE), MINUTES_PER_DAY)  # округление вверх
+        if last > first:
+            bitmap |= ((1 << (last - first)) - 1) << first
+    return bitmap
+
+
+def join_days(bitmaps):
+    """Склеивает карты идущих подряд дней в одну: минута j дня с номером i - бит i * 1440 + j."""
+    joined = 0
+    for i, bitmap in enumerate(bitmaps):
+        joined |= bitmap << (i * MINUTES_PER_DAY)
+    return joined
+
+
+def free_runs(busy, first, last):
+    """Перебирает серии свободных (нулевых) бит на отрезке [first, last) как пары (начало, конец)."""
+    free = ~busy & (((1 << (last - first)) - 1) << first)
+    while free:
+        start = (free & -free).bit_length() - 1
+        run = free >> start
+        length = (run ^ (run + 1)).bit_length() - 1  # число единиц подряд с младшего бита
+        yield start, start + length
+        free &= ~(((1 << length) - 1) << start)
+
+
+def free_slots(busy, origin, window, duration):
+    """Свободные промежутки (начало, конец) не короче duration внутри window = (начало, конец).
+    busy - склеенная карта дней, начиная с дня origin."""
+    origin_start, _ = day_bounds(origin)
+    first = -((origin_start - window[0]) // MINUTE)  # промежуток не начинается раньше window[0]
+    last = (window[1] - origin_start) // MINUTE
+    needed = -(-duration // MINUTE)
+    return [(origin_start + start * MINUTE, origin_start + end * MINUTE)
+            for start, end in free_runs(busy, first, max(first, last)) if end - start >= needed]
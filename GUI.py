@@ -1,6 +1,7 @@
 import flet as ft
 from flet_core import page
 
+from AsyncBackend import AsyncBackend
 from Backend import Backend
 import asyncio
 
@@ -10,10 +11,9 @@ import asyncio
 class UserManager(ft.UserControl):
     """Класс, отвечающий за авторизацию, регистрацию, выход из аккаунта, сброс пароля и показ welcome страницы."""
 
-    def __init__(self, backend, step: str = 'login'):
+    def __init__(self, backend: AsyncBackend, step: str = 'login'):
         super(UserManager, self).__init__()
         self.backend = backend
-        self.backend.load_user_data()
         self.step = step
         self.username = ft.Ref[ft.TextField]()
         self.password = ft.Ref[ft.TextField]()
@@ -128,7 +128,7 @@ class UserManager(ft.UserControl):
                                                                 weight='w500'),
                                                 width=280,
                                                 bgcolor='black',
-                                                on_click=lambda e: self.handle_auth(e, operation=self.step)
+                                                on_click=self.on_auth_click
                                             ), padding=ft.padding.only(25, 10)),
                                         self.step_variables['footer']]))
 
@@ -202,42 +202,47 @@ class UserManager(ft.UserControl):
                 padding=10),
             ft.TextButton(icon=ft.icons.ARROW_BACK, on_click=lambda e: e.page.go('/'))])
 
-    def handle_auth(self, e, operation):
-        """Отвечает за связь с backend и выполнение необходимых действий по авторизации, регистрации и сбросу пароля на бэке."""
+    async def on_auth_click(self, e):
+        await self.handle_auth(e, operation=self.step)
+
+    async def handle_auth(self, e, operation):
+        """Отвечает за связь с backend и выполнение необходимых действий по авторизации, регистрации и сбросу пароля на бэке.
+        Обращения к backend выполняются в отдельном потоке, окно не замирает."""
         # считывание ввода пользователя
         username = self.username.current.value
         password = self.password.current.value
         try:
             if operation == 'login':
-                self.backend.login(username, password)
+                await self.backend.login(username, password)
                 print("Вход в систему произведен успешно.")
                 e.page.go("/home")
             elif operation == 'register':
                 self.backend.validate_pass_by_regexp(password)
-                self.backend.create_user(username, password)
+                await self.backend.create_user(username, password)
                 print("Учетная запись создана успешно.")
-                self.backend.login(username, password)
+                await self.backend.login(username, password)
                 e.page.go('/home')
             elif operation == 'password_drop':
-                self.backend.drop_password(username, password)
+                await self.backend.drop_password(username, password)
                 print("Пароль успешно изменен.")
-                self.backend.login(username, password)
+                await self.backend.login(username, password)
                 e.page.go('/home')
 
         except Exception as ex:
             self.alert_dialog = str(ex)
             self.open_dialog_window(e)
-        self.backend.save_user_data()
+        await self.backend.save_user_data()
 
-    def handle_logout(self, e):
+    async def handle_logout(self, e):
         """Выход из аккаунта"""
         e.page.go('/')
-        self.backend.logout()
+        await self.backend.logout()
 
-def main(page: ft.Page):
-    """Создает экземпляр класса Backend, передает его в ManagerUser class"""
-    backend = Backend()
-    backend.load_user_data()
+async def main(page: ft.Page):
+    """Создает экземпляр класса Backend, передает его в ManagerUser class через асинхронный фасад AsyncBackend"""
+    backend = AsyncBackend(Backend())
+    await backend.load_user_data()
+    await backend.load_calendar_data()  # загружается только индекс, календари читаются при входе пользователя
     login_page = UserManager(backend, step='login')
     registration_page = UserManager(backend, step='register')
     welcome_page = UserManager(backend, step='welcome')
@@ -0,0 +1,58 @@
+"""
+Выдача уникальных идентификаторов событий и уведомлений, согласованная между процессами.
+Счетчики хранятся вместе с данными (файл рядом со снимком календарей или таблица в подключенном хранилище).
+Процесс резервирует у хранилища блок идентификаторов и выдает их из памяти, поэтому к общему счетчику
+обращаются один раз на блок, а не на каждый идентификатор. Неиспользованный остаток блока просто пропускается.
+"""
+import json
+import os
+import threading
+
+from FileLock import locked
+
+
+class IdAllocator:
+    def __init__(self, reserve, block_size=100):
+        self._reserve = reserve  # функция (количество, минимальный id) -> первый id зарезервированного блока
+        self.block_size = block_size
+        self._next = self._end = 0  # текущий зарезервированный блок [_next, _end)
+        self._lock = threading.Lock()  # id выдаются из разных потоков
+
+    def allocate(self, floor=1):
+        """Возвращает следующий идентификатор, не меньший floor (например, Event.count)."""
+        with self._lock:
+            self._next = max(self._next, floor)
+            if self._next >= self._end:
+                self._next = self._reserve(self.block_size, floor)
+                self._end = self._next + self.block_size
+            self._next += 1
+            return self._next - 1
+
+    def allocate_block(self, count, floor=1):
+        """Резервирует сразу count идентификаторов подряд (для массового создания событий), возвращает range."""
+        with self._lock:
+            first = self._reserve(count, max(self._next, floor))
+        return range(first, first + count)
+
+    @classmethod
+    def for_file(cls, path, name, block_size=100):
+        """Выделитель, счетчик которого хранится в JSON-файле path под ключом name (файл общий для счетчиков)."""
+        def reserve(count, floor):
+            with open(path, 'a+', encoding='utf-8') as f, locked(f):
+                f.seek(0)
+                text = f.read()
+                counters = json.loads(text) if text.strip() else {}
+                first = max(counters.get(name, 1), floor)
+                counters[name] = first + count
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(counters))
+                f.flush()
+                os.fsync(f.fileno())
+            return first
+        return cls(reserve, block_size)
+
+    @classmethod
+    def for_storage(cls, storage, name, block_size=100):
+        """Выделитель, счетчик которого хранится в подключенном хранилище (Storage.reserve_ids)."""
+        return cls(lambda count, floor: storage.reserve_ids(name, count, floor), block_size)
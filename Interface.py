@@ -12,7 +12,8 @@ import locale
 
 locale.setlocale(locale.LC_ALL, "")
 
-from Backend import Backend
+from Backend import Backend, ConflictError
+from WriteBehind import WriteBehind
 
 from time import sleep
 
@@ -23,6 +24,7 @@ class Interface:
     с системой календаря MyCalendar.
     """
     backend = None # Ссылка на экземпляр класса Backend, через который осуществляется работа с данными.
+    persister = None # Отложенное сохранение изменений в фоновом потоке (WriteBehind).
     func_request = list() # Очередь функций, которые должны быть выполнены.
 
     @staticmethod
@@ -33,6 +35,8 @@ class Interface:
             Interface.func_request[0]()
             del Interface.func_request[0]
 
+        if Interface.persister is not None:
+            Interface.persister.close()
         print("Работа календаря завершена.")
 
     @staticmethod
@@ -41,6 +45,8 @@ class Interface:
         print("Добро пожаловать в MyCalendar!")
         print('Использование календаря доступно только зарегистрированным пользователям.')
         Interface.backend = Backend()
+        if Interface.persister is None:
+            Interface.persister = WriteBehind(Interface.backend)
         # Добавляем последовательность функций для выполнения.
         Interface.func_request.append(Interface.backend.load_user_data)
         Interface.func_request.append(Interface.backend.load_calendar_data)
@@ -83,7 +89,7 @@ class Interface:
                     Interface.backend.validate_pass_by_regexp)
                 Interface.backend.create_user(username, password)
                 print("Учетная запись создана успешно.")
-                Interface.backend.save_user_data()
+                Interface.persister.mark_dirty(users=True)
                 Interface.func_request.append(Interface.main_menu)
                 break
 
@@ -98,7 +104,7 @@ class Interface:
         try:
             Interface.backend.login(username, password)
             print(f'Добро пожаловать, {username}!')
-            Interface.backend.save_calendar_data()
+            Interface.persister.mark_dirty()
             Interface.func_request.append(Interface.show_notifications)
             Interface.func_request.append(Interface.manage_unprocessed_evens)
 
@@ -121,7 +127,12 @@ class Interface:
                     Interface.backend.validate_number_input)
                 if reply == '1':
                     try:
-                        Interface.backend.accept_invitation(event)
+                        try:
+                            Interface.backend.accept_invitation(event, check_conflicts=True)
+                        except ConflictError as e:
+                            if not Interface.confirm_despite_conflicts(e):
+                                continue
+                            Interface.backend.accept_invitation(event)
                         print('Событие успешно добавлено в Ваш календарь. Другие участники получат уведомление о том, что вы присоединитесь к собранию.')
                     except Exception as e:
                         print(str(e))
@@ -130,7 +141,7 @@ class Interface:
                     print('Вы отказались от участия в событии. Об этом будет сообщено организатору.')
                 elif reply == '3':
                     continue
-        Interface.backend.save_calendar_data()
+        Interface.persister.mark_dirty()
         Interface.func_request.append(Interface.main_menu)
 
     @staticmethod
@@ -174,8 +185,16 @@ class Interface:
             "Введите частоту повторения события (0: никогда, 1: каждый день, 2: каждую неделю, 3: каждый месяц, 4: каждый год): ",
             Interface.backend.validate_recurrence)
         description = input("Введите описание события или оставьте поле пустым: ")
-        new_event = Interface.backend.create_event(title=title, start_time=start_time, end_time=end_time,
-                                                   description=description, recurrence=recurrence)
+        try:
+            new_event = Interface.backend.create_event(title=title, start_time=start_time, end_time=end_time,
+                                                       description=description, recurrence=recurrence,
+                                                       check_conflicts=True)
+        except ConflictError as e:
+            if not Interface.confirm_despite_conflicts(e):
+                Interface.func_request.append(Interface.main_menu)
+                return
+            new_event = Interface.backend.create_event(title=title, start_time=start_time, end_time=end_time,
+                                                       description=description, recurrence=recurrence)
         if new_event:
             print('Событие успешно создано и добавлено в Ваш календарь.')
         while True:
@@ -185,15 +204,24 @@ class Interface:
             if user_input is None:
                 break
             try:
-                Interface.backend.invite_participants(new_event, user_input)
+                for participant in Interface.backend.invite_participants(new_event, user_input):
+                    print(f'Участник {participant.username} успешно приглашен на событие, он может принять приглашение или отклонить его.')
                 break
             except Exception as e:
                 print(str(e))
-        Interface.backend.save_calendar_data()
+        Interface.persister.mark_dirty()
 
         sleep(1)
         Interface.func_request.append(Interface.main_menu)
 
+    @staticmethod
+    def confirm_despite_conflicts(error):
+        """Показывает события, пересекающиеся с новым, и спрашивает, добавить ли событие все равно."""
+        print('Событие пересекается по времени с другими событиями Вашего календаря:')
+        for conflict in error.conflicts:
+            print(conflict)
+        return input("Все равно добавить событие? (да/нет): ").lower() == "да"
+
     @staticmethod
     def get_coming_events():
         """Метод для получения информации о предстоящих событиях. Ближайшие 7 дней."""
@@ -228,6 +256,7 @@ class Interface:
         logout_confirmation = Interface.backend.input_with_validation('Вы действительно хотите выйти? (да/нет): ',
                                                                       Interface.backend.validate_str_input)
         if logout_confirmation == 'да':
+            Interface.persister.flush()
             Interface.backend.logout()
             Interface.func_request.append(Interface.start)
         elif logout_confirmation == 'нет':
@@ -338,7 +367,7 @@ class Interface:
                     Interface.func_request.append(Interface.main_menu)
         else:
             print('У вас пока нет ни одного события.')
-        Interface.backend.save_calendar_data()
+        Interface.persister.mark_dirty()
         Interface.func_request.append(Interface.main_menu)
 
     @staticmethod
@@ -347,7 +376,7 @@ class Interface:
         notifications = Interface.backend.get_unread_notifications()
         for n in notifications:
             print(n)
-        Interface.backend.save_calendar_data()
+        Interface.persister.mark_dirty()
 
 
 Interface.work()
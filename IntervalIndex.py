@@ -0,0 +1,134 @@
+"""
+Индекс интервалов - хранит элементы с временем начала и окончания.
+Реализован как декартово дерево (treap), упорядоченное по времени начала,
+каждый узел дополнительно хранит максимальное время окончания в своем поддереве.
+Это позволяет добавлять и удалять элементы за O(log n),
+а находить все элементы, пересекающиеся с промежутком, за O(log n + k).
+"""
+import random
+
+
+class _Node:
+    __slots__ = ('key', 'start', 'end', 'item', 'priority', 'left', 'right', 'max_end')
+
+    def __init__(self, key, start, end, item):
+        self.key = key
+        self.start = start
+        self.end = end
+        self.item = item
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+    def update(self):
+        """Пересчитывает максимальное время окончания в поддереве."""
+        max_end = self.end
+        if self.left is not None and self.left.max_end > max_end:
+            max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > max_end:
+            max_end = self.right.max_end
+        self.max_end = max_end
+
+
+class IntervalIndex:
+    """
+    Индекс интервалов, ключ элемента - (время начала, идентификатор).
+    bounds - функция, возвращающая для элемента пару (начало, окончание).
+    """
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        self._root = None
+        self._keys = {}  # идентификатор элемента -> ключ узла в дереве
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, item_id):
+        return item_id in self._keys
+
+    def add(self, item_id, item):
+        """Добавляет элемент в индекс (или переиндексирует, если он уже есть)."""
+        if item_id in self._keys:
+            self.remove(item_id)
+        start, end = self._bounds(item)
+        if start is None:  # элементы без времени начала не индексируются
+            return
+        if end is None or end < start:
+            end = start
+        key = (start, item_id)
+        left, right = self._split(self._root, key)
+        self._root = self._merge(self._merge(left, _Node(key, start, end, item)), right)
+        self._keys[item_id] = key
+
+    def remove(self, item_id):
+        """Удаляет элемент из индекса, если он там есть."""
+        key = self._keys.pop(item_id, None)
+        if key is not None:
+            self._root = self._delete(self._root, key)
+
+    def overlapping(self, start, end):
+        """Возвращает элементы, пересекающиеся с промежутком [start, end], упорядоченные по времени начала."""
+        result = []
+        self._collect(self._root, start, end, result)
+        return result
+
+    def __iter__(self):
+        """Обходит все элементы в порядке времени начала."""
+        stack, node = [], self._root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.item
+            node = node.right
+
+    def _collect(self, node, start, end, result):
+        if node is None or node.max_end < start:  # в поддереве нет интервалов, заканчивающихся после start
+            return
+        self._collect(node.left, start, end, result)
+        if node.start > end:  # правое поддерево начинается еще позже
+            return
+        if node.end >= start:
+            result.append(node.item)
+        self._collect(node.right, start, end, result)
+
+    def _split(self, node, key):
+        """Разделяет дерево на узлы с ключом < key и >= key."""
+        if node is None:
+            return None, None
+        if node.key < key:
+            node.right, right = self._split(node.right, key)
+            node.update()
+            return node, right
+        left, node.left = self._split(node.left, key)
+        node.update()
+        return left, node
+
+    def _merge(self, left, right):
+        """Объединяет два дерева, все ключи left меньше ключей right."""
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            left.update()
+            return left
+        right.left = self._merge(left, right.left)
+        right.update()
+        return right
+
+    def _delete(self, node, key):
+        if node is None:
+            return None
+        if key == node.key:
+            return self._merge(node.left, node.right)
+        if key < node.key:
+            node.left = self._delete(node.left, key)
+        else:
+            node.right = self._delete(node.right, key)
+        node.update()
+        return node
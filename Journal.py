@@ -0,0 +1,102 @@
+"""
+Журнал изменений (write-ahead log) календарей.
+Вместо перезаписи всего calendars.json в файл журнала дописываются компактные записи
+об изменениях (создано событие, добавлен участник, прочитано уведомление...), по одной JSON-записи в строке.
+Периодически журнал сворачивается в снимок (calendars.json) и очищается.
+Журнал может быть общим для нескольких процессов: записи дописываются под блокировкой файла (см. FileLock).
+"""
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from FileLock import locked
+
+
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self._pending = []  # записи, еще не записанные на диск
+        self._size = None  # количество записей в файле журнала
+        self._exclusive_file = None  # файл журнала, заблокированный на время сворачивания (см. exclusive)
+        self._lock = threading.Lock()  # записи добавляются из разных потоков
+
+    def __len__(self):
+        """Количество записей в журнале с момента последнего сворачивания (включая незаписанные)."""
+        if self._size is None:
+            self._size = sum(1 for _ in self.read())
+        return self._size + len(self._pending)
+
+    def append(self, op, **data):
+        """Добавляет запись об изменении, на диск она попадет при вызове flush."""
+        with self._lock:
+            self._pending.append({'op': op, **data})
+
+    def flush(self):
+        """Дописывает накопленные записи в конец файла журнала одной операцией записи."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            lines = ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                            for record in self._pending)
+            written = len(self._pending)
+            size = len(self)
+            with self._locked() as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._size = size
+            self._pending = []
+            return written
+
+    def read(self):
+        """Читает записи журнала с диска по порядку. Недописанная последняя строка (сбой при записи) пропускается."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    return
+
+    @contextmanager
+    def _locked(self):
+        """Открывает файл журнала для дописывания под исключительной блокировкой. Если другой процесс
+        удалил файл (свернул журнал) между открытием и блокировкой, файл открывается заново."""
+        while True:
+            with open(self.path, 'a+', encoding='utf-8') as f, locked(f):
+                if os.path.exists(self.path) and os.path.samestat(os.fstat(f.fileno()), os.stat(self.path)):
+                    yield f
+                    return
+
+    @contextmanager
+    def exclusive(self):
+        """Запрещает другим процессам дописывать журнал на время сворачивания.
+        Возвращает, сколько записей в файле журнала не записано этим объектом (дописаны другими процессами)."""
+        with self._locked() as f:
+            f.seek(0)
+            on_disk = sum(1 for line in f if line.endswith('\n'))
+            known = self._size if self._size is not None else on_disk
+            self._exclusive_file = f
+            try:
+                yield on_disk - known
+            finally:
+                self._exclusive_file = None
+
+    def truncate(self):
+        """Очищает журнал после того, как все изменения (в том числе незаписанные) попали в снимок."""
+        if self._exclusive_file is not None:
+            self._remove(self._exclusive_file)
+        elif os.path.exists(self.path):
+            with self._locked() as f:
+                self._remove(f)
+        self._pending = []
+        self._size = 0
+
+    def _remove(self, f):
+        try:
+            os.remove(self.path)
+        except OSError:  # в Windows открытый файл удалить нельзя, он очищается
+            f.seek(0)
+            f.truncate()
@@ -0,0 +1,101 @@
+"""
+Потоковый разбор JSON-файла, в котором верхний уровень - объект (как calendars.json).
+Записи верхнего уровня читаются по одной, поэтому в памяти одновременно находится
+только одна запись (один календарь), а не весь документ.
+Если установлен ijson, он используется для быстрого разбора (без смещений записей).
+"""
+import codecs
+import json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _Reader:
+    """Буфер над бинарным файлом, в котором хранится только еще не разобранная часть документа."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.offset = 0  # смещение начала буфера в файле, в байтах
+        self.eof = False
+
+    def fill(self, size=None):
+        """Дочитывает следующий фрагмент файла в буфер, возвращает False в конце файла."""
+        if self.eof:
+            return False
+        data = self.f.read(size or self.chunk_size)
+        self.eof = not data
+        self.buffer += self.text_decoder.decode(data, final=self.eof)
+        return not self.eof
+
+    def peek(self):
+        """Пропускает пробельные символы и возвращает следующий символ ('' в конце файла)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'Ожидался символ {char!r} на позиции {self.offset + self.pos}.')
+        self.pos += 1
+
+    def decode(self):
+        """Разбирает следующее значение, при необходимости дочитывая файл фрагментами растущего размера."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                if end < len(self.buffer) or self.eof:  # число в конце буфера могло быть прочитано не полностью
+                    start, self.pos = self.pos, end
+                    return value, start, end
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.fill(size)
+            size *= 2
+
+    def discard(self, end):
+        """Удаляет из буфера разобранную часть документа."""
+        self.offset += len(self.buffer[:end].encode('utf-8'))
+        self.buffer = self.buffer[end:]
+        self.pos -= end
+
+
+def iter_items(f, chunk_size=1 << 16):
+    """Перебирает записи объекта верхнего уровня из бинарного файла f.
+    Возвращает кортежи (ключ, значение, смещение значения в байтах, длина значения в байтах)."""
+    reader = _Reader(f, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key, _, _ = reader.decode()
+        reader.expect(':')
+        value, start, end = reader.decode()
+        offset = reader.offset + len(reader.buffer[:start].encode('utf-8'))
+        yield key, value, offset, len(reader.buffer[start:end].encode('utf-8'))
+        reader.discard(end)
+        if reader.peek() == '}':
+            return
+        reader.expect(',')
+
+
+def iter_pairs(f):
+    """Перебирает пары (ключ, значение) объекта верхнего уровня из бинарного файла f, используя ijson, если он установлен."""
+    if ijson is not None:
+        yield from ijson.kvitems(f, '', use_float=True)
+    else:
+        for key, value, _, _ in iter_items(f):
+            yield key, value
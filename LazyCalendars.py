@@ -0,0 +1,54 @@
+"""
+Словарь календарей username -> Calendar с загрузкой по требованию.
+Заранее известны только имена владельцев, сам календарь загружается из хранилища
+при первом обращении к нему (get_calendar, вход в систему, приглашение участников...).
+"""
+from collections.abc import MutableMapping
+
+
+class LazyCalendars(MutableMapping):
+    def __init__(self, loader, usernames=()):
+        self._loader = loader  # функция username -> Calendar
+        self._loaded = {}
+        self._unloaded = dict.fromkeys(usernames)  # упорядоченное множество еще не загруженных календарей
+
+    def __getitem__(self, username):
+        if username in self._loaded:
+            return self._loaded[username]
+        if username in self._unloaded:
+            calendar = self._loader(username)
+            del self._unloaded[username]
+            self._loaded[username] = calendar
+            return calendar
+        raise KeyError(username)
+
+    def __setitem__(self, username, calendar):
+        self._unloaded.pop(username, None)
+        self._loaded[username] = calendar
+
+    def __delitem__(self, username):
+        if username in self._unloaded:
+            del self._unloaded[username]
+        else:
+            del self._loaded[username]
+
+    def __contains__(self, username):
+        return username in self._loaded or username in self._unloaded
+
+    def __iter__(self):
+        yield from list(self._loaded)
+        yield from list(self._unloaded)
+
+    def __len__(self):
+        return len(self._loaded) + len(self._unloaded)
+
+    def __repr__(self):
+        return f"LazyCalendars(loaded={list(self._loaded)}, unloaded={len(self._unloaded)})"
+
+    def is_loaded(self, username):
+        """Проверяет, загружен ли календарь пользователя."""
+        return username in self._loaded
+
+    def loaded(self):
+        """Загруженные календари (словарь username -> Calendar)."""
+        return self._loaded
@@ -0,0 +1,118 @@
+"""
+Блокировки для одновременной работы многих потоков (например, обработчиков запросов сервера) с данными Backend.
+
+SharedLock - блокировка чтения-записи. Операции с календарями и событиями выполняются одновременно
+под разделяемой блокировкой, а загрузка, сохранение и изменение списка пользователей - под исключительной
+(with lock: ...), пока не завершатся начатые операции.
+
+LockStripes - блокировки календарей и событий. Ключ (календарь пользователя или событие) отображается
+на одну из полос (stripes) - фиксированного набора блокировок, поэтому блокировки не хранятся в каждом объекте.
+Операция заранее называет все ключи, которые будет менять, и блокировки берутся по возрастанию номера полосы.
+Порядок один для всех потоков, поэтому взаимная блокировка (deadlock) невозможна.
+"""
+import threading
+from contextlib import contextmanager
+
+
+class SharedLock:
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0  # потоки, удерживающие разделяемую блокировку
+        self._writer = None  # поток, удерживающий исключительную блокировку
+        self._writer_depth = 0
+        self._waiting_writers = 0  # ожидающие исключительной блокировки (новые читатели их пропускают вперед)
+        self._local = threading.local()  # глубина вложенности разделяемой блокировки в потоке
+
+    @contextmanager
+    def shared(self):
+        """Удерживает разделяемую блокировку. Повторный вход в том же потоке (и вход под исключительной
+        блокировкой этого потока) не ждет."""
+        local = self._local
+        depth = getattr(local, 'depth', 0)
+        if depth or self._writer == threading.get_ident():
+            local.depth = depth + 1
+            try:
+                yield
+            finally:
+                local.depth = depth
+            return
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        local.depth = 1
+        try:
+            yield
+        finally:
+            local.depth = 0
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    def acquire(self):
+        """Берет исключительную блокировку (повторно в том же потоке - без ожидания)."""
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return True
+            if getattr(self._local, 'depth', 0):
+                raise RuntimeError('Нельзя взять исключительную блокировку, удерживая разделяемую.')
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer, self._writer_depth = me, 1
+        return True
+
+    def release(self):
+        with self._condition:
+            if self._writer != threading.get_ident():
+                raise RuntimeError('Исключительная блокировка не принадлежит этому потоку.')
+            self._writer_depth -= 1
+            if not self._writer_depth:
+                self._writer = None
+                self._condition.notify_all()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+class LockStripes:
+    def __init__(self, count=64):
+        self._locks = [threading.Lock() for _ in range(count)]
+        self._local = threading.local()  # номера полос, удерживаемых потоком
+
+    def index(self, key):
+        """Номер полосы блокировки для ключа."""
+        return hash(key) % len(self._locks)
+
+    @contextmanager
+    def hold(self, keys):
+        """Удерживает блокировки всех ключей, они берутся по возрастанию номера полосы.
+        Во вложенном вызове уже удерживаемые полосы не берутся повторно, а новые должны идти
+        после удерживаемых, иначе порядок нарушился бы - RuntimeError."""
+        held = getattr(self._local, 'held', None)
+        if held is None:
+            held = self._local.held = set()
+        indices = sorted({self.index(key) for key in keys} - held)
+        if held and indices and indices[0] < max(held):
+            raise RuntimeError('Нарушен порядок блокировок: во вложенной операции нужны новые календари или события.')
+        acquired = []
+        try:
+            for i in indices:
+                self._locks[i].acquire()
+                acquired.append(i)
+                held.add(i)
+            yield
+        finally:
+            for i in reversed(acquired):
+                held.discard(i)
+                self._locks[i].release()
@@ -1,14 +1,29 @@
+import threading
+
+
 class Notification:
+    __slots__ = ('id', 'event_id', 'status', 'message')
     count = 1
+    id_allocator = None  # общий для процессов выделитель id (см. IdAllocator), None - используется только count
+    _id_lock = threading.Lock()  # уведомления создаются из разных потоков
 
-    def __init__(self, event_id,  message, status="unread"):
+    def __init__(self, event_id,  message, status="unread", id=None):
         """Инициализация уведомления с указанным идентификатором события, сообщением и статусом."""
-        self.id = Notification.count
-        Notification.count += 1
+        with Notification._id_lock:
+            if id is None:
+                id = Notification.id_allocator.allocate(Notification.count) if Notification.id_allocator is not None \
+                    else Notification.count
+            Notification.count = max(Notification.count, id + 1)
+        self.id = id
         self.event_id = event_id
         self.status = status
         self.message = message
 
+    def marked_read(self):
+        """Прочитанная копия уведомления: одно непрочитанное уведомление общее для всех получателей рассылки
+        (см. NotificationDispatcher), поэтому оно не меняется, а у прочитавшего получателя заменяется копией."""
+        return Notification(self.event_id, self.message, 'read', id=self.id)
+
     def to_dict(self):
         """Сериализация уведомления в словарь."""
         return {
@@ -21,8 +36,5 @@ class Notification:
     @staticmethod
     def from_dict(n_data):
         """Десериализация уведомления из словаря."""
-        notification = Notification(n_data['event_id'], n_data['message'], n_data['status'])
-        notification.id = n_data['id']
-        Notification.count = max(Notification.count, notification.id + 1)
-        return notification
+        return Notification(n_data['event_id'], n_data['message'], n_data['status'], id=n_data['id'])
 
@@ -0,0 +1,49 @@
+"""
+Рассылка уведомлений о событии участникам.
+Сообщение собирается по шаблону один раз на рассылку, уведомление создается один раз и общее для всех
+получателей: в ящик получателя добавляется ссылка на него, статус прочтения у каждого получателя свой
+(прочитанное уведомление заменяется в ящике прочитанной копией, см. Calendar.mark_notification_read).
+Об изменении делается одна запись ('notify' со списком получателей), сохраняет ее save_calendar_data
+(например, фоновое сохранение WriteBehind), а не каждая рассылка.
+"""
+from LazyCalendars import LazyCalendars
+from Notification import Notification
+
+TEMPLATES = {
+    'invited': "Вы были приглашены на событие '{title}'.",
+    'removed': "Вы были удалены из мероприятия '{title}'.",
+    'joined': "Участник {user} присоединился к событию {title}.",
+    'declined': "Участник {user} отказался присоединиться к событию {title}.",
+    'updated': "Событие '{title}' было изменено организатором.",
+    'left': "Участник {user} покинул событие {title}.",
+    'deleted': "Событие '{title}' было удалено организатором.",
+}
+
+
+class NotificationDispatcher:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def dispatch(self, event, template, recipients, **context):
+        """Отправляет уведомление по шаблону из TEMPLATES (с подстановкой названия события title и context)
+        всем получателям из recipients, повторы и None пропускаются. Возвращает уведомление или None,
+        если получателей нет."""
+        recipients = [recipient for recipient in dict.fromkeys(recipients) if recipient is not None]
+        if not recipients:
+            return None
+        context.setdefault('title', event.title)
+        n = Notification(event.event_id, TEMPLATES[template].format(**context))
+        self.deliver(recipients, n)
+        return n
+
+    def deliver(self, recipients, n):
+        """Добавляет уведомление n в ящики получателей (одно на всех) и записывает об этом одну запись.
+        Незагруженные календари подключенного хранилища не загружаются: уведомление попадает в них через хранилище."""
+        backend = self.backend
+        calendars = backend.calendars
+        skip_unloaded = backend.storage is not None and isinstance(calendars, LazyCalendars)
+        for recipient in recipients:
+            if skip_unloaded and recipient.username in calendars and not calendars.is_loaded(recipient.username):
+                continue
+            backend.get_calendar(recipient).notify(n)
+        backend._record('notify', usernames=[recipient.username for recipient in recipients], notification=n.to_dict())
@@ -0,0 +1,171 @@
+"""
+Правило повторения периодического события.
+Повторения вычисляются арифметически: поиск сразу переходит к нужному промежутку,
+поэтому стоимость не зависит от того, как давно началось событие.
+Результат совпадает с dateutil.rrule(freq, dtstart=...).
+"""
+from datetime import date, datetime, timedelta
+
+from dateutil.rrule import rrule, WEEKLY, DAILY, MONTHLY, YEARLY
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# частота повторения события в терминах dateutil.rrule, None - событие не повторяется
+# (YEARLY в dateutil равен 0, поэтому частоту нельзя проверять на истинность)
+RECURRENCE_FREQUENCIES = {i: freq for i, freq in zip(['один раз', 'каждый день', 'каждую неделю', 'каждый месяц', 'каждый год'], [None, DAILY, WEEKLY, MONTHLY, YEARLY])}
+
+FIXED_STEPS = {DAILY: timedelta(days=1), WEEKLY: timedelta(weeks=1)}  # частоты с постоянным шагом
+MIN_STEPS = {**FIXED_STEPS, MONTHLY: timedelta(days=28), YEARLY: timedelta(days=365)}  # наименьший шаг повторений
+EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+def days_in_month(year, month):
+    """Количество дней в месяце (модуль calendar не используется: на Windows он совпадает с Calendar.py)."""
+    if month == 12:
+        return 31
+    return (date(year, month + 1, 1) - date(year, month, 1)).days
+
+
+class RecurrenceRule:
+    """Скомпилированное правило повторения: частота и момент первого повторения."""
+    __slots__ = ('freq', 'dtstart', '_rrule')
+
+    def __init__(self, freq, dtstart):
+        self.freq = freq
+        self.dtstart = dtstart.replace(microsecond=0)  # rrule отбрасывает микросекунды
+        self._rrule = None
+
+    @classmethod
+    def from_recurrence(cls, recurrence, dtstart):
+        """Создает правило по текстовому описанию частоты, None для неповторяющихся событий."""
+        freq = RECURRENCE_FREQUENCIES.get(recurrence)
+        if freq is None or dtstart is None:
+            return None
+        return cls(freq, dtstart)
+
+    @property
+    def rrule(self):
+        """Эквивалентное правило dateutil (создается при первом обращении)."""
+        if self._rrule is None:
+            self._rrule = rrule(self.freq, dtstart=self.dtstart)
+        return self._rrule
+
+    def between(self, start, end):
+        """Перебирает повторения в промежутке [start, end] (границы включаются)."""
+        if end < self.dtstart or end < start:
+            return
+        if self.freq in FIXED_STEPS:
+            yield from self._between_fixed(start, end)
+        elif self.freq == MONTHLY:
+            yield from self._between_monthly(start, end)
+        elif self.freq == YEARLY:
+            yield from self._between_yearly(start, end)
+        else:
+            yield from self.rrule.between(start, end, inc=True)
+
+    def first_between(self, low, high):
+        """Первое повторение строго между low и high, None - если такого нет."""
+        for dt in self.between(low, high):
+            if dt >= high:
+                return None
+            if dt > low:
+                return dt
+        return None
+
+    def may_overlap(self, duration, other, other_duration):
+        """False, если повторения длительностью duration никогда не пересекаются с повторениями правила other
+        длительностью other_duration. Для частот с постоянным шагом разность начал повторений двух правил
+        всегда дает один и тот же остаток от деления на меньший шаг (он делит больший), поэтому достаточно
+        проверить ближайшую к нулю разность с этим остатком. Для остальных частот - всегда True."""
+        if self.freq not in FIXED_STEPS or other.freq not in FIXED_STEPS:
+            return True
+        step = min(FIXED_STEPS[self.freq], FIXED_STEPS[other.freq])
+        # наименьшая разность начал (other - self) с нужным остатком, большая -other_duration
+        difference = -other_duration + (other.dtstart - self.dtstart + other_duration) % step
+        if difference == -other_duration:
+            difference += step
+        return difference < duration
+
+    def _between_fixed(self, start, end):
+        step = FIXED_STEPS[self.freq]
+        n = 0
+        if start > self.dtstart:
+            n, rest = divmod(start - self.dtstart, step)
+            if rest:
+                n += 1
+        dt = self.dtstart + n * step
+        while dt <= end:
+            yield dt
+            dt += step
+
+    def _between_monthly(self, start, end):
+        # повторения приходятся на тот же день месяца, месяцы без такого дня пропускаются
+        first = max(start, self.dtstart)
+        last_month = end.year * 12 + end.month - 1
+        for month in range(first.year * 12 + first.month - 1, last_month + 1):
+            year, month_index = divmod(month, 12)
+            if self.dtstart.day <= days_in_month(year, month_index + 1):
+                dt = self.dtstart.replace(year=year, month=month_index + 1)
+                if dt > end:
+                    return
+                if dt >= first:
+                    yield dt
+
+    def _between_yearly(self, start, end):
+        # 29 февраля повторяется только в високосные годы
+        first = max(start, self.dtstart)
+        for year in range(first.year, end.year + 1):
+            if self.dtstart.month == 2 and self.dtstart.day > days_in_month(year, 2):
+                continue
+            dt = self.dtstart.replace(year=year)
+            if dt > end:
+                return
+            if dt >= first:
+                yield dt
+
+
+def expand_fixed(rules, starts, end):
+    """Повторения сразу многих правил с постоянным шагом (каждый день/неделю, см. FIXED_STEPS):
+    для rules[i] - повторения в промежутке [starts[i], end] (границы включаются).
+    Возвращает списки datetime в порядке rules, результат совпадает с RecurrenceRule.between.
+    Повторения вычисляются целочисленной арифметикой в секундах от EPOCH, с NumPy - для всех правил одним векторным
+    вычислением. Правила с другой частотой раскрываются через RecurrenceRule.between."""
+    fixed = [i for i, rule in enumerate(rules) if rule.freq in FIXED_STEPS]
+    result = [None] * len(rules)
+    if fixed:
+        high = (end - EPOCH) // SECOND  # округление вниз: повторение не позже end
+        dtstarts = [(rules[i].dtstart - EPOCH) // SECOND for i in fixed]
+        steps = [FIXED_STEPS[rules[i].freq] // SECOND for i in fixed]
+        lows = [-((EPOCH - starts[i]) // SECOND) for i in fixed]  # округление вверх: повторение не раньше start
+        expand = _expand_fixed_numpy if np is not None else _expand_fixed_python
+        for i, occurrences in zip(fixed, expand(dtstarts, steps, lows, high)):
+            result[i] = occurrences
+    for i, rule in enumerate(rules):
+        if result[i] is None:
+            result[i] = list(rule.between(starts[i], end))
+    return result
+
+
+def _expand_fixed_python(dtstarts, steps, lows, high):
+    for dtstart, step, low in zip(dtstarts, steps, lows):
+        first = max(0, -((dtstart - low) // step))  # номер первого повторения не раньше low
+        last = (high - dtstart) // step
+        yield [EPOCH + timedelta(seconds=dtstart + n * step) for n in range(first, last + 1)]
+
+
+def _expand_fixed_numpy(dtstarts, steps, lows, high):
+    dtstarts = np.array(dtstarts, dtype=np.int64)
+    steps = np.array(steps, dtype=np.int64)
+    first = np.maximum(0, -((dtstarts - np.array(lows, dtype=np.int64)) // steps))
+    counts = np.maximum((high - dtstarts) // steps - first + 1, 0)
+    ends = np.cumsum(counts)
+    # номер повторения внутри своего правила: 0, 1, ... counts[i] - 1 для каждого правила подряд
+    ordinals = np.arange(ends[-1]) - np.repeat(ends - counts, counts)
+    seconds = np.repeat(dtstarts + first * steps, counts) + ordinals * np.repeat(steps, counts)
+    occurrences = seconds.astype('datetime64[s]').astype(object).tolist()
+    return [occurrences[stop - count:stop] for stop, count in zip(ends.tolist(), counts.tolist())]
+
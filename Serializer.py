@@ -0,0 +1,120 @@
+"""
+Подключаемые сериализаторы снимка календарей (Backend.serializer).
+Сериализатор переводит словари Calendar.to_dict в байты и обратно, а также определяет формат файла-снимка:
+записи верхнего уровня (username -> календарь) пишутся друг за другом, для каждой известно смещение в файле,
+поэтому отдельный календарь можно прочитать, не разбирая весь файл (см. Backend.load_calendar_data).
+
+По умолчанию используется компактный JSON из стандартной библиотеки (без отступов, кириллица без \\uXXXX).
+orjson и msgpack подключаются, только если установлены, иначе get_serializer возвращает стандартный JSON.
+"""
+import json
+
+from JsonStream import iter_items, iter_pairs
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class JsonSerializer:
+    """Компактный JSON, снимок - объект JSON, в котором каждый календарь записан в отдельной строке."""
+    name = 'json'
+    format = 'json'  # сериализаторы с одинаковым форматом читают файлы друг друга
+    available = True
+
+    def dumps(self, obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def write_header(self, out):
+        out.write(b'{')
+
+    def write_entry(self, out, key, payload, first):
+        """Записывает пару ключ - значение (значение уже сериализовано), возвращает смещение значения в файле."""
+        out.write((b'\n' if first else b',\n') + self.dumps(key) + b':')
+        offset = out.tell()
+        out.write(payload)
+        return offset
+
+    def write_footer(self, out):
+        out.write(b'\n}\n')
+
+    def iter_items(self, f):
+        """Перебирает записи снимка из бинарного файла f: (ключ, значение, смещение значения, длина значения)."""
+        return iter_items(f)
+
+    def iter_pairs(self, f):
+        """Перебирает пары (ключ, значение) снимка из бинарного файла f."""
+        return iter_pairs(f)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """Тот же формат JSON, но сериализация и разбор календарей выполняются через orjson."""
+    name = 'orjson'
+    available = orjson is not None
+
+    def dumps(self, obj):
+        return orjson.dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgpackSerializer:
+    """Двоичный формат msgpack, снимок - последовательность пар ключ, значение."""
+    name = 'msgpack'
+    format = 'msgpack'
+    available = msgpack is not None
+
+    def dumps(self, obj):
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+    def write_header(self, out):
+        pass
+
+    def write_entry(self, out, key, payload, first):
+        out.write(self.dumps(key))
+        offset = out.tell()
+        out.write(payload)
+        return offset
+
+    def write_footer(self, out):
+        pass
+
+    def iter_items(self, f):
+        unpacker = msgpack.Unpacker(f, raw=False)
+        while True:
+            try:
+                key = unpacker.unpack()
+            except msgpack.OutOfData:
+                return
+            offset = unpacker.tell()
+            value = unpacker.unpack()
+            yield key, value, offset, unpacker.tell() - offset
+
+    def iter_pairs(self, f):
+        for key, value, _, _ in self.iter_items(f):
+            yield key, value
+
+
+SERIALIZERS = {serializer.name: serializer for serializer in (JsonSerializer, OrjsonSerializer, MsgpackSerializer)}
+
+
+def get_serializer(name='json'):
+    """Возвращает сериализатор по имени ('json', 'orjson', 'msgpack').
+    Если нужная библиотека не установлена, возвращается стандартный JSON."""
+    if name not in SERIALIZERS:
+        raise ValueError(f'Неизвестный сериализатор: {name}.')
+    serializer = SERIALIZERS[name]
+    return serializer() if serializer.available else JsonSerializer()
@@ -0,0 +1,469 @@
+"""
+HTTP/JSON API календаря поверх Backend (только стандартная библиотека: asyncio).
+
+Маршруты (тела запросов и ответов - JSON, даты - ISO 8601):
+    POST   /users                     регистрация {username, password} -> {token, username}
+    POST   /login                     вход {username, password} -> {token, username}
+    POST   /logout                    завершение сеанса
+    GET    /events?start=...&end=...  события и повторения периодических событий в промежутке (по умолчанию - сегодня)
+    POST   /events                    создание {title, start_time, end_time, description, recurrence, check_conflicts}
+    PATCH  /events/<id>               изменение {title, description, start_time, end_time, recurrence}
+    DELETE /events/<id>               удаление
+    POST   /events/<id>/invite        приглашение {participants: [username, ...]}
+    POST   /events/<id>/accept        принятие приглашения {check_conflicts}
+    POST   /events/<id>/decline       отказ от приглашения
+    GET    /notifications             непрочитанные уведомления (после ответа они считаются прочитанными)
+
+Каждый вход открывает сеанс Backend (см. Session), сеанс определяется токеном из заголовка
+Authorization: Bearer <token>. Токен действует session_ttl секунд после последнего запроса (по умолчанию час),
+затем токен удаляется и сервер отвечает 401. Запросы выполняются в пуле потоков, Backend блокирует только затронутые
+календари и события (см. Locks), поэтому запросы разных соединений обрабатываются параллельно.
+
+Соединения keep-alive (по умолчанию в HTTP/1.1). Запросы конвейера (pipelining) читаются, пока обрабатываются
+предыдущие: запросы чтения (GET) одного соединения выполняются параллельно, изменяющий запрос - после всех
+предыдущих запросов соединения, а ответы отправляются в порядке запросов.
+Изменения сохраняются в фоне (см. WriteBehind).
+
+Запуск: python Server.py [--host 127.0.0.1] [--port 8080]
+"""
+import argparse
+import asyncio
+import json
+import re
+import secrets
+import sys
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time
+from http import HTTPStatus
+from time import monotonic
+from urllib.parse import parse_qs, urlsplit
+
+from Backend import AuthenticationError, Backend, ConflictError, PermissionError
+from Calendar import RepetitionError
+from Event import Event, Occurrence
+from Recurrence import RECURRENCE_FREQUENCIES
+from WriteBehind import WriteBehind
+
+MAX_HEADERS_SIZE = 16 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+SAFE_METHODS = ('GET', 'HEAD')
+EVENT_FIELDS = ('title', 'description', 'start_time', 'end_time', 'recurrence')  # изменяемые поля события
+
+
+class HttpError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class Request:
+    __slots__ = ('method', 'path', 'query', 'headers', 'body', 'keep_alive')
+
+    def __init__(self, method, target, version, headers, body):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path.rstrip('/') or '/'
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+        connection = headers.get('connection', '').lower()
+        self.keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+    def json(self):
+        """Тело запроса как словарь (пустое тело - пустой словарь)."""
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Тело запроса должно быть в формате JSON.')
+        if not isinstance(data, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Тело запроса должно быть JSON-объектом.')
+        return data
+
+
+def response(status, payload, keep_alive=True):
+    """Собирает HTTP-ответ с JSON-телом."""
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    status = HTTPStatus(status)
+    head = (f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    return head.encode('ascii') + body
+
+
+def event_to_dict(event):
+    """Событие или повторение периодического события (Occurrence) для ответа."""
+    if isinstance(event, Occurrence):
+        return {**event.event.to_dict(), 'start_time': event.start_time.isoformat(),
+                'end_time': event.end_time.isoformat() if event.end_time is not None else None}
+    return event.to_dict()
+
+
+def parse_datetime(value, name):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HttpError(HTTPStatus.BAD_REQUEST, f'Поле {name} должно содержать дату в формате ISO 8601.')
+
+
+def required(data, name):
+    if name not in data:
+        raise HttpError(HTTPStatus.BAD_REQUEST, f'Не указано поле {name}.')
+    return data[name]
+
+
+class CalendarServer:
+    routes = [
+        ('POST', r'/users', 'register'),
+        ('POST', r'/login', 'login'),
+        ('POST', r'/logout', 'logout'),
+        ('GET', r'/events', 'events_in_range'),
+        ('POST', r'/events', 'create_event'),
+        ('PATCH', r'/events/(\d+)', 'update_event'),
+        ('DELETE', r'/events/(\d+)', 'delete_event'),
+        ('POST', r'/events/(\d+)/invite', 'invite'),
+        ('POST', r'/events/(\d+)/accept', 'accept'),
+        ('POST', r'/events/(\d+)/decline', 'decline'),
+        ('GET', r'/notifications', 'notifications'),
+    ]
+
+    def __init__(self, backend, persister=None, workers=32, max_pipeline=16, session_ttl=3600):
+        self.backend = backend
+        self.persister = persister  # отложенное сохранение изменений (WriteBehind), None - не сохранять
+        self.max_pipeline = max_pipeline  # сколько запросов конвейера одного соединения обрабатываются одновременно
+        self.session_ttl = session_ttl  # сколько секунд без запросов действует токен
+        self.sessions = OrderedDict()  # токен -> [Session, срок действия]; в порядке последнего использования
+        self._sessions_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='calendar-request')
+        self._routes = [(method, re.compile(pattern + '$'), getattr(self, name)) for method, pattern, name in self.routes]
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """Начинает принимать соединения, возвращает asyncio.Server (порт 0 - любой свободный)."""
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADERS_SIZE)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self.persister is not None:
+            self.persister.close()
+
+    async def handle_connection(self, reader, writer):
+        """Читает запросы соединения и ставит их в очередь ответов, ответы отправляет отдельная задача."""
+        responses = asyncio.Queue(self.max_pipeline)
+        sender = asyncio.create_task(self._send_responses(responses, writer))
+        in_flight, barrier = [], None  # выполняемые запросы и последний изменяющий запрос соединения
+        try:
+            while not sender.done():
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    await responses.put((self._error_response(e, keep_alive=False), False))
+                    break
+                except ConnectionError:
+                    break
+                if request is None:
+                    break
+                in_flight = [future for future in in_flight if not future.done()]
+                if request.method in SAFE_METHODS:
+                    future = asyncio.ensure_future(self._handle(request, [barrier] if barrier else []))
+                    in_flight.append(future)
+                else:
+                    future = asyncio.ensure_future(self._handle(request, in_flight))
+                    in_flight, barrier = [future], future
+                await responses.put((future, request.keep_alive))
+                if not request.keep_alive:
+                    break
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _send_responses(self, responses, writer):
+        """Отправляет ответы в порядке запросов."""
+        broken = False
+        while True:
+            item = await responses.get()
+            if item is None:
+                return
+            result, keep_alive = item
+            data = await result if isinstance(result, asyncio.Future) else result
+            if broken:  # клиент отключился: оставшиеся запросы только дожидаются выполнения
+                continue
+            try:
+                writer.write(data)
+                await writer.drain()
+            except ConnectionError:
+                broken = True
+            if not keep_alive:
+                return
+
+    async def _read_request(self, reader):
+        """Читает следующий запрос соединения, None - клиент закрыл соединение."""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HttpError(HTTPStatus.BAD_REQUEST, 'Неполный запрос.')
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, 'Слишком большие заголовки запроса.')
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Некорректная строка запроса.')
+        if version not in ('HTTP/1.0', 'HTTP/1.1'):
+            raise HttpError(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED, 'Поддерживаются HTTP/1.0 и HTTP/1.1.')
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        if 'transfer-encoding' in headers:
+            raise HttpError(HTTPStatus.LENGTH_REQUIRED, 'Тело запроса передается только с Content-Length.')
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Некорректный Content-Length.')
+        if length > MAX_BODY_SIZE:
+            raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Слишком большое тело запроса.')
+        try:
+            body = await reader.readexactly(length) if length else b''
+        except asyncio.IncompleteReadError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Неполное тело запроса.')
+        return Request(method.upper(), target, version, headers, body)
+
+    async def _handle(self, request, wait):
+        """Выполняет запрос в пуле потоков после запросов wait, возвращает HTTP-ответ."""
+        if wait:
+            await asyncio.wait(wait)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.dispatch, request)
+
+    def dispatch(self, request):
+        """Находит обработчик маршрута и выполняет его, ошибки Backend превращаются в коды ответа."""
+        try:
+            allowed = []
+            for method, pattern, handler in self._routes:
+                match = pattern.match(request.path)
+                if match:
+                    if method == request.method:
+                        status, payload = handler(request, *match.groups())
+                        return response(status, payload, request.keep_alive)
+                    allowed.append(method)
+            if allowed:
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, 'Метод не поддерживается.', allowed=allowed)
+            raise HttpError(HTTPStatus.NOT_FOUND, 'Адрес не найден.')
+        except HttpError as e:
+            return self._error_response(e, request.keep_alive)
+        except AuthenticationError as e:
+            return self._error_response(HttpError(HTTPStatus.UNAUTHORIZED, str(e)), request.keep_alive)
+        except PermissionError as e:
+            return self._error_response(HttpError(HTTPStatus.FORBIDDEN, str(e)), request.keep_alive)
+        except ConflictError as e:
+            return self._error_response(HttpError(HTTPStatus.CONFLICT, str(e), conflicts=[
+                event_to_dict(conflict) for conflict in e.conflicts]), request.keep_alive)
+        except RepetitionError as e:
+            return self._error_response(HttpError(HTTPStatus.CONFLICT, str(e)), request.keep_alive)
+        except (ValueError, TypeError) as e:
+            return self._error_response(HttpError(HTTPStatus.BAD_REQUEST, str(e)), request.keep_alive)
+        except Exception:
+            print(f'Ошибка при обработке запроса {request.method} {request.path}:', file=sys.stderr)
+            traceback.print_exc()
+            return self._error_response(HttpError(HTTPStatus.INTERNAL_SERVER_ERROR, 'Внутренняя ошибка сервера.'),
+                                        request.keep_alive)
+
+    @staticmethod
+    def _error_response(error, keep_alive):
+        return response(error.status, {'error': str(error), **error.details}, keep_alive)
+
+    def _changed(self, users=False):
+        if self.persister is not None:
+            self.persister.mark_dirty(users=users)
+
+    def _session(self, request):
+        """Сеанс по токену запроса; срок действия токена продлевается."""
+        scheme, _, token = request.headers.get('authorization', '').partition(' ')
+        now = monotonic()
+        with self._sessions_lock:
+            self._purge_sessions(now)
+            entry = self.sessions.get(token) if scheme.lower() == 'bearer' else None
+            if entry is None:
+                raise HttpError(HTTPStatus.UNAUTHORIZED, 'Требуется вход в систему.')
+            entry[1] = now + self.session_ttl
+            self.sessions.move_to_end(token)
+        return entry[0]
+
+    def _open_session(self, session):
+        token = secrets.token_urlsafe(24)
+        now = monotonic()
+        with self._sessions_lock:
+            self._purge_sessions(now)
+            self.sessions[token] = [session, now + self.session_ttl]
+        return {'token': token, 'username': session.logged_in_user.username}
+
+    def _purge_sessions(self, now):
+        """Удаляет токены с истекшим сроком действия (они в начале sessions), вызывается под _sessions_lock."""
+        while self.sessions:
+            token, (_, expires) = next(iter(self.sessions.items()))
+            if expires > now:
+                break
+            del self.sessions[token]
+
+    def _event(self, session, event_id):
+        """Событие из календаря пользователя сеанса (или из его приглашений)."""
+        event = Event.events_map.get(int(event_id))
+        calendar = session.current_calendar
+        if event is None or not (calendar.has_event(event) or calendar.has_unprocessed_event(event)):
+            raise HttpError(HTTPStatus.NOT_FOUND, 'Событие не найдено.')
+        return event
+
+    def register(self, request):
+        data = request.json()
+        username = Backend.validate_username_by_regex(str(required(data, 'username')))
+        password = Backend.validate_pass_by_regexp(str(required(data, 'password')))
+        session = self.backend.open_session()
+        with self.backend.lock:  # проверка и создание пользователя - одна операция
+            if self.backend.check_username_exists(username):
+                raise HttpError(HTTPStatus.CONFLICT, 'Пользователь с таким именем уже существует.')
+            if session.create_user(username, password) is None:
+                raise HttpError(HTTPStatus.BAD_REQUEST, 'Не удалось создать пользователя.')
+        self._changed(users=True)
+        return HTTPStatus.CREATED, self._open_session(session)
+
+    def login(self, request):
+        data = request.json()
+        session = self.backend.open_session()
+        session.login(str(required(data, 'username')), str(required(data, 'password')))
+        return HTTPStatus.OK, self._open_session(session)
+
+    def logout(self, request):
+        session = self._session(request)
+        with self._sessions_lock:
+            self.sessions.pop(request.headers['authorization'].partition(' ')[2], None)
+        session.logout()
+        return HTTPStatus.OK, {}
+
+    def events_in_range(self, request):
+        session = self._session(request)
+        today = datetime.now().date()
+        start = parse_datetime(request.query['start'], 'start') if 'start' in request.query \
+            else datetime.combine(today, time.min)
+        end = parse_datetime(request.query['end'], 'end') if 'end' in request.query \
+            else datetime.combine(today, time(23, 59))
+        grouped = self.backend.get_user_events_in_range(session.logged_in_user, start, end)
+        events = sorted((event for events in grouped.values() for event in events), key=lambda e: e.start_time)
+        return HTTPStatus.OK, {'events': [event_to_dict(event) for event in events]}
+
+    def _event_fields(self, data):
+        """Проверяет и преобразует поля события из тела запроса."""
+        fields = {name: data[name] for name in EVENT_FIELDS if name in data}
+        for name in ('start_time', 'end_time'):
+            if name in fields:
+                fields[name] = parse_datetime(fields[name], name)
+        if 'recurrence' in fields and fields['recurrence'] not in RECURRENCE_FREQUENCIES:
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Частота повторения должна быть одной из: '
+                            + ', '.join(RECURRENCE_FREQUENCIES) + '.')
+        return fields
+
+    def create_event(self, request):
+        session = self._session(request)
+        data = request.json()
+        fields = self._event_fields({'description': '', 'recurrence': 'один раз', **data})
+        for name in ('title', 'start_time', 'end_time'):
+            required(fields, name)
+        Backend.compare_dates(fields['start_time'], fields['end_time'])
+        event = session.create_event(fields['title'], fields['start_time'], fields['end_time'], fields['description'],
+                                     fields['recurrence'], check_conflicts=bool(data.get('check_conflicts')))
+        self._changed()
+        return HTTPStatus.CREATED, event_to_dict(event)
+
+    def update_event(self, request, event_id):
+        session = self._session(request)
+        event = self._event(session, event_id)
+        fields = self._event_fields(request.json())
+        Backend.compare_dates(fields.get('start_time', event.start_time), fields.get('end_time', event.end_time))
+        session.update_event(event, **fields)
+        self._changed()
+        return HTTPStatus.OK, event_to_dict(event)
+
+    def delete_event(self, request, event_id):
+        session = self._session(request)
+        session.delete_event(self._event(session, event_id))
+        self._changed()
+        return HTTPStatus.OK, {}
+
+    def invite(self, request, event_id):
+        session = self._session(request)
+        event = self._event(session, event_id)
+        usernames = required(request.json(), 'participants')
+        if not isinstance(usernames, list):
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Поле participants должно быть списком имен пользователей.')
+        unknown = [username for username in usernames if not self.backend.check_username_exists(username)]
+        if unknown:
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'Пользователь(-и) не найден(-ы).', unknown=unknown)
+        session.invite_participants(event, [self.backend.users[username] for username in usernames])
+        self._changed()
+        return HTTPStatus.OK, event_to_dict(event)
+
+    def accept(self, request, event_id):
+        session = self._session(request)
+        event = self._event(session, event_id)
+        if not session.current_calendar.has_unprocessed_event(event):
+            raise HttpError(HTTPStatus.CONFLICT, 'Приглашение на событие уже обработано.')
+        session.accept_invitation(event, check_conflicts=bool(request.json().get('check_conflicts')))
+        self._changed()
+        return HTTPStatus.OK, event_to_dict(event)
+
+    def decline(self, request, event_id):
+        session = self._session(request)
+        session.decline_invitation(self._event(session, event_id))
+        self._changed()
+        return HTTPStatus.OK, {}
+
+    def notifications(self, request):
+        session = self._session(request)
+        with self.backend._locked(session.logged_in_user):  # уведомления, пришедшие во время ответа, остаются непрочитанными
+            unread = [n.to_dict() for n in session.current_calendar.unread_notifications]
+            if unread:
+                for _ in session.get_unread_notifications():  # помечает уведомления прочитанными
+                    pass
+                self._changed()
+        return HTTPStatus.OK, {'notifications': unread}
+
+
+async def serve(host, port):
+    backend = Backend()
+    backend.load_user_data()
+    backend.load_calendar_data()
+    server = CalendarServer(backend, WriteBehind(backend))
+    listener = await server.start(host, port)
+    print(f'Сервер календаря запущен: http://{host}:{listener.sockets[0].getsockname()[1]}')
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP/JSON API календаря.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Сеанс пользователя поверх общего хранилища Backend.
+Backend хранит общие данные процесса (пользователи, календари, события, файлы), а вход в систему
+(logged_in_user, current_calendar) - один на экземпляр. Сеанс - легкий объект только со своим вошедшим
+пользователем и текущим календарем. Методы Backend, которые действуют от имени пользователя (создание событий,
+приглашения, уведомления), сеанс вызывает у Backend, передавая себя аргументом session, поэтому действия
+относятся к пользователю сеанса, а изменения попадают в общие данные. Остальные данные и методы
+(сохранение, поиск пользователей и т.д.) берутся у самого Backend (атрибут backend).
+Так один процесс (например, сервер) обслуживает одновременно много пользователей без копий данных.
+"""
+
+
+def _on_behalf(name):
+    """Метод сеанса: вызывает метод Backend name от имени сеанса."""
+    def method(self, *args, **kwargs):
+        return getattr(self.backend, name)(*args, session=self, **kwargs)
+    method.__name__ = name
+    method.__doc__ = f'Backend.{name} от имени пользователя сеанса.'
+    return method
+
+
+class Session:
+    __slots__ = ('backend', 'logged_in_user', 'current_calendar', '__weakref__')
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.logged_in_user = None
+        self.current_calendar = None
+
+    create_user = _on_behalf('create_user')
+    login = _on_behalf('login')
+    logout = _on_behalf('logout')
+    create_event = _on_behalf('create_event')
+    update_event = _on_behalf('update_event')
+    delete_event = _on_behalf('delete_event')
+    leave_event = _on_behalf('leave_event')
+    invite_participants = _on_behalf('invite_participants')
+    remove_participants = _on_behalf('remove_participants')
+    manage_unprocessed_evens = _on_behalf('manage_unprocessed_evens')
+    accept_invitation = _on_behalf('accept_invitation')
+    decline_invitation = _on_behalf('decline_invitation')
+    find_conflicts = _on_behalf('find_conflicts')
+    get_events_in_range = _on_behalf('get_events_in_range')
+    get_coming_events = _on_behalf('get_coming_events')
+    get_today_events = _on_behalf('get_today_events')
+    show_all_events = _on_behalf('show_all_events')
+    get_unread_notifications = _on_behalf('get_unread_notifications')
+
+    def __repr__(self):
+        username = self.logged_in_user.username if self.logged_in_user is not None else None
+        return f'Session(user={username!r})'
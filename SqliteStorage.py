@@ -0,0 +1,263 @@
+"""
+Хранилище данных в базе SQLite (модуль sqlite3 стандартной библиотеки).
+Каждое событие хранится один раз, календари ссылаются на события по идентификатору.
+Календарь загружается только при обращении к нему, поиск событий за период выполняется запросом
+по индексу (owner, start_time), непрочитанные уведомления ищутся по индексу (username, status).
+"""
+import sqlite3
+import threading
+
+from Recurrence import RECURRENCE_FREQUENCIES
+from Storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    password TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calendars (
+    username TEXT PRIMARY KEY,
+    owner TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    event_id INTEGER PRIMARY KEY,
+    title TEXT,
+    start_time TEXT,
+    end_time TEXT,
+    description TEXT,
+    recurrence TEXT,
+    organizer TEXT
+);
+CREATE TABLE IF NOT EXISTS participants (
+    event_id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (event_id, username)
+);
+CREATE TABLE IF NOT EXISTS calendar_events (
+    owner TEXT NOT NULL,
+    event_id INTEGER NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    recurring INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (owner, event_id)
+);
+CREATE INDEX IF NOT EXISTS calendar_events_owner_start ON calendar_events (owner, start_time);
+CREATE INDEX IF NOT EXISTS calendar_events_event ON calendar_events (event_id);
+CREATE TABLE IF NOT EXISTS invites (
+    username TEXT NOT NULL,
+    event_id INTEGER NOT NULL,
+    PRIMARY KEY (username, event_id)
+);
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    event_id INTEGER,
+    message TEXT,
+    status TEXT NOT NULL,
+    PRIMARY KEY (username, id)
+);
+CREATE INDEX IF NOT EXISTS notifications_user_status ON notifications (username, status);
+CREATE TABLE IF NOT EXISTS notifications_archive (
+    id INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    event_id INTEGER,
+    message TEXT,
+    status TEXT NOT NULL,
+    PRIMARY KEY (username, id)
+);
+CREATE TABLE IF NOT EXISTS id_counters (
+    name TEXT PRIMARY KEY,
+    next_id INTEGER NOT NULL
+);
+"""
+
+# начальные значения счетчиков идентификаторов для базы, созданной до появления таблицы id_counters
+ID_COUNTER_SOURCES = {'event': 'SELECT MAX(event_id) FROM events', 'notification': 'SELECT MAX(id) FROM notifications'}
+
+RECURRING = tuple(recurrence for recurrence, freq in RECURRENCE_FREQUENCIES.items() if freq is not None)
+
+EVENT_COLUMNS = 'e.event_id, e.title, e.start_time, e.end_time, e.description, e.recurrence, e.organizer'
+
+
+class SqliteStorage(Storage):
+    def __init__(self, path='calendar.db'):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()  # соединение используется из разных потоков
+        self._pending = []
+
+    def close(self):
+        self._connection.close()
+
+    def load_users(self):
+        with self._lock:
+            return self._connection.execute('SELECT username, password FROM users ORDER BY rowid').fetchall()
+
+    def save_users(self, users):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT INTO users (username, user_id, password) VALUES (?, ?, ?) '
+                'ON CONFLICT (username) DO UPDATE SET password = excluded.password',
+                [(user.username, user.user_id, user.get_password()) for user in users])
+
+    def calendar_usernames(self):
+        with self._lock:
+            return [username for username, in self._connection.execute('SELECT username FROM calendars ORDER BY rowid')]
+
+    def load_calendar(self, username):
+        with self._lock:
+            row = self._connection.execute('SELECT owner FROM calendars WHERE username = ?', (username,)).fetchone()
+            if row is None:
+                return None
+            events = self._select_events(
+                f'SELECT {EVENT_COLUMNS} FROM calendar_events c JOIN events e ON e.event_id = c.event_id '
+                'WHERE c.owner = ? ORDER BY c.rowid', (username,))
+            unprocessed_events = self._select_events(
+                f'SELECT {EVENT_COLUMNS} FROM invites i JOIN events e ON e.event_id = i.event_id '
+                'WHERE i.username = ? ORDER BY i.rowid', (username,))
+            notifications = [{'id': id, 'event_id': event_id, 'message': message, 'status': status}
+                             for id, event_id, message, status in self._connection.execute(
+                                 'SELECT id, event_id, message, status FROM notifications '
+                                 'WHERE username = ? ORDER BY rowid', (username,))]
+        return {'owner': row[0], 'events': events, 'unprocessed_events': unprocessed_events,
+                'notifications': notifications}
+
+    def events_in_range(self, username, start_date, end_date):
+        with self._lock:
+            return self._select_events(
+                f'SELECT {EVENT_COLUMNS} FROM calendar_events c JOIN events e ON e.event_id = c.event_id '
+                'WHERE c.owner = ? AND c.start_time <= ? AND (c.recurring OR c.end_time >= ?) '
+                'ORDER BY c.start_time', (username, end_date.isoformat(), start_date.isoformat()))
+
+    def archived_notifications(self, username):
+        with self._lock:
+            return [{'id': id, 'event_id': event_id, 'message': message, 'status': status}
+                    for id, event_id, message, status in self._connection.execute(
+                        'SELECT id, event_id, message, status FROM notifications_archive '
+                        'WHERE username = ? ORDER BY rowid', (username,))]
+
+    def _select_events(self, query, parameters):
+        """Выбирает события вместе с участниками и преобразует их в словари формата Event.to_dict."""
+        rows = self._connection.execute(query, parameters).fetchall()
+        participants = {}
+        ids = [row[0] for row in rows]
+        for i in range(0, len(ids), 500):  # ограничение SQLite на количество параметров запроса
+            chunk = ids[i:i + 500]
+            for event_id, username in self._connection.execute(
+                    f'SELECT event_id, username FROM participants WHERE event_id IN ({",".join("?" * len(chunk))}) '
+                    'ORDER BY event_id, position', chunk):
+                participants.setdefault(event_id, []).append(username)
+        return [{'event_id': event_id, 'title': title, 'start_time': start_time, 'end_time': end_time,
+                 'description': description, 'recurrence': recurrence,
+                 'participants': participants.get(event_id, []), 'organizer': organizer}
+                for event_id, title, start_time, end_time, description, recurrence, organizer in rows]
+
+    def save_calendars(self, calendars):
+        with self._lock, self._connection:
+            saved_events = set()  # общее событие нескольких календарей сохраняется один раз
+            for username, calendar in calendars.items():
+                self._connection.execute('DELETE FROM calendar_events WHERE owner = ?', (username,))
+                self._connection.execute('DELETE FROM invites WHERE username = ?', (username,))
+                self._connection.execute('DELETE FROM notifications WHERE username = ?', (username,))
+                self._apply({'op': 'calendar', 'username': username, 'owner': calendar.owner})
+                for event in calendar.events:
+                    self._save_event(event, saved_events)
+                    self._apply({'op': 'add_event', 'username': username, 'event_id': event.event_id})
+                for event in calendar.unprocessed_events:
+                    self._save_event(event, saved_events)
+                    self._apply({'op': 'invite', 'username': username, 'event_id': event.event_id})
+                for n in calendar.notifications:
+                    self._apply({'op': 'notify', 'usernames': [username], 'notification': n.to_dict()})
+
+    def _save_event(self, event, saved_events):
+        if event.event_id not in saved_events:
+            saved_events.add(event.event_id)
+            self._apply({'op': 'event', 'event': event.to_dict()})
+
+    def reserve_ids(self, name, count, floor=1):
+        """Резервирует блок идентификаторов в транзакции BEGIN IMMEDIATE, которая блокирует запись
+        в базу для других процессов до фиксации."""
+        with self._lock:
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._connection.execute('SELECT next_id FROM id_counters WHERE name = ?', (name,)).fetchone()
+                if row is None:
+                    last_id, = self._connection.execute(ID_COUNTER_SOURCES[name]).fetchone()
+                    row = ((last_id or 0) + 1,)
+                first = max(row[0], floor)
+                self._connection.execute('INSERT OR REPLACE INTO id_counters (name, next_id) VALUES (?, ?)',
+                                         (name, first + count))
+                self._connection.commit()
+            except BaseException:
+                self._connection.rollback()
+                raise
+        return first
+
+    def append(self, op, **data):
+        with self._lock:
+            self._pending.append({'op': op, **data})
+
+    def flush(self):
+        """Применяет накопленные изменения в одной транзакции."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if pending:
+                with self._connection:
+                    for record in pending:
+                        self._apply(record)
+        return len(pending)
+
+    def _apply(self, record):
+        """Выполняет SQL-запросы, соответствующие записи об изменении (см. Backend._apply_record)."""
+        op, execute = record['op'], self._connection.execute
+        if op == 'calendar':
+            execute('INSERT OR IGNORE INTO calendars (username, owner) VALUES (?, ?)',
+                    (record['username'], record['owner']))
+        elif op == 'event':
+            event = record['event']
+            recurring = int(event['recurrence'] in RECURRING)
+            execute('INSERT OR REPLACE INTO events (event_id, title, start_time, end_time, description, recurrence, '
+                    'organizer) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (event['event_id'], event['title'], event['start_time'], event['end_time'],
+                     event['description'], event['recurrence'], event['organizer']))
+            execute('DELETE FROM participants WHERE event_id = ?', (event['event_id'],))
+            self._connection.executemany(
+                'INSERT INTO participants (event_id, username, position) VALUES (?, ?, ?)',
+                [(event['event_id'], username, position) for position, username in enumerate(event['participants'])])
+            execute('UPDATE calendar_events SET start_time = ?, end_time = ?, recurring = ? WHERE event_id = ?',
+                    (event['start_time'], event['end_time'], recurring, event['event_id']))
+        elif op == 'event_deleted':
+            for table in ('events', 'participants', 'calendar_events', 'invites'):
+                execute(f'DELETE FROM {table} WHERE event_id = ?', (record['event_id'],))
+        elif op == 'add_event':
+            execute('INSERT OR IGNORE INTO calendar_events (owner, event_id, start_time, end_time, recurring) '
+                    f'SELECT ?, event_id, start_time, end_time, recurrence IN ({",".join("?" * len(RECURRING))}) '
+                    'FROM events WHERE event_id = ?', (record['username'], *RECURRING, record['event_id']))
+        elif op == 'remove_event':
+            execute('DELETE FROM calendar_events WHERE owner = ? AND event_id = ?',
+                    (record['username'], record['event_id']))
+        elif op == 'invite':
+            execute('INSERT OR IGNORE INTO invites (username, event_id) VALUES (?, ?)',
+                    (record['username'], record['event_id']))
+        elif op == 'processed':
+            execute('DELETE FROM invites WHERE username = ? AND event_id = ?', (record['username'], record['event_id']))
+        elif op == 'notify':
+            n = record['notification']
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO notifications (id, username, event_id, message, status) VALUES (?, ?, ?, ?, ?)',
+                [(n['id'], username, n['event_id'], n['message'], n['status']) for username in record['usernames']])
+        elif op == 'read':
+            execute("UPDATE notifications SET status = 'read' WHERE username = ? AND id = ?",
+                    (record['username'], record['notification_id']))
+        elif op == 'archive':
+            ids = record['notification_ids']
+            for i in range(0, len(ids), 500):  # ограничение SQLite на количество параметров запроса
+                chunk = ids[i:i + 500]
+                condition = f'username = ? AND id IN ({",".join("?" * len(chunk))})'
+                execute('INSERT OR IGNORE INTO notifications_archive (id, username, event_id, message, status) '
+                        f'SELECT id, username, event_id, message, status FROM notifications WHERE {condition} '
+                        'ORDER BY rowid', (record['username'], *chunk))
+                execute(f'DELETE FROM notifications WHERE {condition}', (record['username'], *chunk))
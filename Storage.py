@@ -0,0 +1,55 @@
+"""
+Интерфейс подключаемого хранилища данных для Backend.
+Хранилище загружает пользователей и календари (календарь - по требованию, при первом обращении),
+а изменения получает в виде тех же записей, что и журнал изменений (см. Journal и Backend._record):
+append копит записи, flush сохраняет их одной операцией.
+Хранилище - подкласс Storage, который реализует все абстрактные методы.
+"""
+from abc import ABC, abstractmethod
+
+
+class Storage(ABC):
+    @abstractmethod
+    def load_users(self):
+        """Возвращает пары (username, хеш пароля) всех пользователей."""
+
+    @abstractmethod
+    def save_users(self, users):
+        """Сохраняет пользователей (объекты User)."""
+
+    @abstractmethod
+    def calendar_usernames(self):
+        """Возвращает имена владельцев всех сохраненных календарей."""
+
+    @abstractmethod
+    def load_calendar(self, username):
+        """Возвращает словарь календаря пользователя в формате Calendar.to_dict (события - словари Event.to_dict)
+        или None, если календаря нет."""
+
+    @abstractmethod
+    def save_calendars(self, calendars):
+        """Полностью перезаписывает календари (словарь username -> Calendar)."""
+
+    @abstractmethod
+    def events_in_range(self, username, start_date, end_date):
+        """Возвращает события календаря пользователя, которые могут пересекаться с периодом (словари Event.to_dict)."""
+
+    @abstractmethod
+    def archived_notifications(self, username):
+        """Возвращает уведомления пользователя, перенесенные в архив (словари Notification.to_dict)."""
+
+    @abstractmethod
+    def reserve_ids(self, name, count, floor=1):
+        """Резервирует count идентификаторов подряд в счетчике name ('event', 'notification'),
+        не меньших floor, атомарно для всех процессов. Возвращает первый зарезервированный идентификатор."""
+
+    @abstractmethod
+    def append(self, op, **data):
+        """Запоминает запись об изменении."""
+
+    @abstractmethod
+    def flush(self):
+        """Сохраняет накопленные изменения, возвращает их количество."""
+
+    def close(self):
+        """Освобождает ресурсы хранилища."""
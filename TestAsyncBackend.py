@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from AsyncBackend import AsyncBackend
+from Backend import AuthenticationError, Backend
+
+
+class TestAsyncBackend(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.backend = Backend()
+        self.backend.calendars = {}
+        self.backend.create_user('johndoe', 'Johndoe123')
+        self.facade = AsyncBackend(self.backend)
+
+    def tearDown(self):
+        self.backend.reset()
+
+    async def test_slow_save_does_not_block_event_loop(self):
+        threads = []
+
+        def slow_save():
+            threads.append(threading.get_ident())
+            time.sleep(0.3)
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        with patch.object(self.backend, 'save_calendar_data', slow_save):
+            await self.facade.save_calendar_data()
+        task.cancel()
+        self.assertNotEqual(threads, [threading.get_ident()])
+        self.assertGreater(ticks, 10)  # цикл событий продолжал работу во время сохранения
+
+    async def test_login_and_today_events(self):
+        with self.assertRaises(AuthenticationError):
+            await self.facade.login('johndoe', 'wrong')
+        user = await self.facade.login('johndoe', 'Johndoe123')
+        self.assertIs(self.facade.logged_in_user, user)
+        now = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        event = await self.facade.create_event('Lunch', now, now + timedelta(hours=1), '', 'один раз')
+        tomorrow = await self.facade.create_event('Review', now + timedelta(days=1), now + timedelta(days=1, hours=1), '',
+                                                  'один раз')
+        started = time.monotonic()
+        today = await self.facade.get_today_events()
+        self.assertLess(time.monotonic() - started, 1)  # без пауз консольной версии
+        self.assertEqual([e for events in today.values() for e in events], [event])
+        with patch.object(self.backend, 'get_user_events_in_range',
+                          wraps=self.backend.get_user_events_in_range) as locked:  # метод под блокировками Backend
+            coming = await self.facade.get_coming_events()
+        locked.assert_called_once()
+        self.assertIn(tomorrow, [e for events in coming.values() for e in events])
+        await self.facade.logout()
+        self.assertIsNone(self.facade.logged_in_user)
+
+    async def test_calls_are_serialized(self):
+        active, overlaps = [], []
+
+        def save():
+            if active:
+                overlaps.append(True)
+            active.append(True)
+            time.sleep(0.05)
+            active.pop()
+
+        with patch.object(self.backend, 'save_user_data', save):
+            await asyncio.gather(*(self.facade.save_user_data() for _ in range(5)))
+        self.assertFalse(overlaps)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from AtomicFile import AtomicWrites
+from Backend import Backend, StaleDataError
+from Event import Event
+from FileLock import VersionLock
+from Journal import Journal
+from User import User
+
+
+class TestAtomicWrites(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'data.txt')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('old')
+        os.chmod(self.path, 0o640)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_commit_replaces_files(self):
+        with AtomicWrites() as writes:
+            writes.open(self.path, 'w', encoding='utf-8').write('new')
+            writes.open(self.path + '.idx', 'w', encoding='utf-8').write('index')
+            with open(self.path, encoding='utf-8') as f:
+                self.assertEqual(f.read(), 'old')  # до commit целевой файл не меняется
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'new')
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o640)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['data.txt', 'data.txt.idx'])
+
+    @unittest.skipIf(os.name == 'nt', 'права доступа POSIX')
+    def test_new_file_mode_follows_umask(self):
+        umask = os.umask(0o027)
+        try:
+            with AtomicWrites() as writes:
+                writes.open(self.path + '.new', 'w', encoding='utf-8').write('new')
+            self.assertEqual(os.umask(0o027), 0o027)  # umask процесса не менялся
+        finally:
+            os.umask(umask)
+        self.assertEqual(os.stat(self.path + '.new').st_mode & 0o777, 0o640)
+
+    def test_error_keeps_old_file(self):
+        with self.assertRaises(ValueError):
+            with AtomicWrites() as writes:
+                writes.open(self.path, 'w', encoding='utf-8').write('half of the')
+                raise ValueError('crash')
+        with open(self.path, encoding='utf-8') as f:
+            self.assertEqual(f.read(), 'old')
+        self.assertEqual(os.listdir(self.tmp.name), ['data.txt'])
+
+    def test_version_lock(self):
+        lock = VersionLock(self.path + '.lock')
+        self.assertEqual(lock.version, 0)
+        with lock.acquire(exclusive=True) as held:
+            self.assertEqual(held.bump(), 1)
+            self.assertEqual(held.bump(), 2)
+        self.assertEqual(VersionLock(self.path + '.lock').version, 2)
+
+    def test_version_lock_is_shared_by_threads(self):
+        lock, versions = VersionLock(self.path + '.lock'), []
+        with lock.acquire() as held:
+            thread = threading.Thread(target=lambda: versions.append(lock.version))  # своя разделяемая блокировка
+            thread.start()
+            thread.join()
+            self.assertIsNot(held, lock)  # у блока свой открытый файл, другой поток его не подменяет и не закрывает
+            self.assertEqual(held.version, 0)
+        self.assertEqual(versions, [0])
+
+
+class TestBackendSharedFiles(unittest.TestCase):
+    """Другой процесс, работающий с теми же файлами, моделируется отдельным интерпретатором."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend()
+        self.backend.calendars_storage_file = os.path.join(self.tmp.name, 'calendars.json')
+        self.backend.users_storage_file = os.path.join(self.tmp.name, 'users.csv')
+        self.backend.calendars = {}
+        self.organizer = self.backend.users['organizer'] = User('organizer', 'Password123')
+        self.backend.logged_in_user = self.organizer
+        self.backend.current_calendar = self.backend.get_calendar(self.organizer)
+        self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.save_user_data()
+        self.backend.save_calendar_data()
+
+    def tearDown(self):
+        self.backend.reset()
+        self.tmp.cleanup()
+
+    def run_other_process(self, code):
+        """Выполняет code в другом процессе с Backend, загрузившим те же файлы."""
+        script = textwrap.dedent(f'''
+            from datetime import datetime
+            from Backend import Backend
+            backend = Backend()
+            backend.calendars_storage_file = {self.backend.calendars_storage_file!r}
+            backend.users_storage_file = {self.backend.users_storage_file!r}
+            backend.use_journal = {self.backend.use_journal!r}
+            backend.load_user_data()
+            backend.load_calendar_data()
+        ''') + textwrap.dedent(code)
+        subprocess.run([sys.executable, '-c', script], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    def test_stale_snapshot_is_merged(self):
+        self.backend.calendars = {}
+        self.backend.load_calendar_data()  # счетчики id событий общие с другим процессом
+        self.backend.current_calendar = self.backend.get_calendar(self.organizer)
+        self.run_other_process('''
+            backend.create_user('guest', 'Password123')
+            backend.login('guest', 'Password123')
+            backend.create_event('Lunch', datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 13), '', 'один раз')
+            backend.save_calendar_data()
+        ''')
+        self.backend.create_event('Review', datetime(2024, 1, 2, 10), datetime(2024, 1, 2, 11), '', 'один раз')
+        with self.assertRaises(StaleDataError):  # снимок не перезаписывается поверх изменений другого процесса
+            self.backend.compact_calendar_data()
+        self.backend.save_calendar_data()  # изменения переносятся в новый снимок
+        self.assertIs(self.backend.current_calendar, self.backend.calendars['organizer'])
+        self.backend.calendars = {}
+        Event.events_map.clear()
+        self.backend.load_calendar_data()
+        self.assertEqual([e.title for e in self.backend.calendars['guest'].events], ['Lunch'])
+        self.assertEqual([e.title for e in self.backend.calendars['organizer'].events], ['Meeting', 'Review'])
+
+    def test_snapshot_mode_does_not_create_journal(self):
+        with patch.object(Journal, 'exclusive') as exclusive:  # файл журнала не создается даже на время блокировки
+            self.backend.save_calendar_data()
+        exclusive.assert_not_called()
+        self.assertNotIn('calendars.journal', os.listdir(self.tmp.name))
+
+    def test_users_of_other_process_are_kept(self):
+        self.run_other_process('''
+            backend.create_user('guest', 'Password123')
+            backend.save_user_data()
+        ''')
+        self.backend.create_user('another', 'Password123')
+        self.backend.save_user_data()
+        with open(self.backend.users_storage_file, encoding='utf-8') as f:
+            self.assertEqual(sorted(row['username'] for row in csv.DictReader(f)), ['another', 'guest', 'organizer'])
+
+    def test_journal_compaction_waits_for_foreign_records(self):
+        self.backend.use_journal = True
+        self.backend.journal_compaction_threshold = 1
+        self.backend.calendars = {}
+        self.backend.load_calendar_data()
+        other = Journal(self.backend.journal.path)  # другой процесс дописывает тот же журнал
+        other.append('read', username='organizer', notification_id=1)
+        other.flush()
+        self.backend.create_event('Review', datetime(2024, 1, 2, 10), datetime(2024, 1, 2, 11), '', 'один раз')
+        self.backend.save_calendar_data()  # сворачивание откладывается, записи остаются в журнале
+        self.assertEqual(next(Journal(self.backend.journal.path).read())['op'], 'read')
+        self.backend.journal_compaction_threshold = Backend.journal_compaction_threshold
+
+    def test_offsets_are_refreshed_after_other_process_saves(self):
+        self.backend.calendars = {}
+        Event.events_map.clear()
+        self.backend.load_calendar_data()  # календарь organizer еще не загружен
+        self.run_other_process('''
+            backend.create_user('guest', 'Password123')
+            backend.login('guest', 'Password123')
+            backend.create_event('Lunch with a long title', datetime(2024, 1, 1, 12), datetime(2024, 1, 1, 13), '',
+                                 'один раз')
+            backend.save_calendar_data()
+        ''')
+        self.assertEqual([e.title for e in self.backend.calendars['organizer'].events], ['Meeting'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,12 +5,13 @@ import unittest
 import uuid
 import hashlib
 import re
+import tempfile
 from datetime import datetime, timedelta
 from unittest.mock import patch
 
-from Backend import Backend, PermissionError, AuthenticationError
+from Backend import Backend, PermissionError, AuthenticationError, ConflictError
 from Event import Event
-from Calendar import Calendar
+from Calendar import Calendar, RepetitionError
 from User import User
 
 
@@ -19,9 +20,10 @@ from User import User
 
 class TestBackend(unittest.TestCase):
     def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
         self.backend = Backend()
-        self.backend.users_storage_file = 'test_users.csv'
-        self.backend.calendars_storage_file = 'test_calendars.json'
+        self.backend.users_storage_file = os.path.join(self.tmp.name, 'test_users.csv')
+        self.backend.calendars_storage_file = os.path.join(self.tmp.name, 'test_calendars.json')
         self.organizer = User("johndoe", "Johndoe123")
         self.backend.logged_in_user = self.organizer
         self.backend.current_calendar = self.backend.get_calendar(self.organizer)
@@ -36,12 +38,8 @@ class TestBackend(unittest.TestCase):
 
     def tearDown(self):
         # This function will run after each test to clean up any resources used in the test
-        User._usernames.clear()
-        User._users_by_username.clear()
-        Event.events_map.clear()
-        Event.count = 1
-        # self.event.participants.clear()
-        self.backend.users.clear()
+        self.backend.reset()
+        self.tmp.cleanup()
 
     def test_singleton(self):
         """Test the Backend class is a singleton."""
@@ -177,6 +175,45 @@ class TestBackend(unittest.TestCase):
         event = self.backend.create_event(title, start_time, end_time, description, recurrence)
         self.assertIn(event, self.backend.current_calendar.events)
 
+    def test_create_event_with_conflict_check(self):
+        standup = self.backend.create_event('Standup', datetime(2022, 12, 1, 10, 30), datetime(2022, 12, 1, 10, 45), '',
+                                            'каждый день')
+        with self.assertRaises(ConflictError) as raised:
+            self.backend.create_event('Test Event', self.start_time, self.end_time, '', 'один раз', check_conflicts=True)
+        self.assertEqual([conflict.event for conflict in raised.exception.conflicts], [standup])
+        self.assertEqual(raised.exception.conflicts[0].start_time, datetime(2023, 1, 1, 10, 30))
+        self.assertEqual(len(self.backend.current_calendar.events), 1)
+        event = self.backend.create_event('Test Event', self.start_time, datetime(2023, 1, 1, 10, 30), '', 'один раз',
+                                          check_conflicts=True)  # касание границами не считается пересечением
+        self.assertIn(event, self.backend.current_calendar.events)
+
+    def test_invite_participants_errors_are_raised(self):
+        self.backend.users.update({'johndoe': self.organizer, 'janedoe': self.participant})
+        guest = self.backend.users['guest'] = User('guest', 'Guest12345')
+        self.assertEqual(self.backend.invite_participants(self.event, [self.participant]), [self.participant])
+        with self.assertRaises(RepetitionError):  # уже приглашен - не приглашается никто
+            self.backend.invite_participants(self.event, [guest, self.participant])
+        self.assertFalse(self.backend.get_calendar(guest).has_unprocessed_event(self.event))
+        with self.assertRaises(ValueError):
+            self.backend.invite_participants(self.event, [User('stranger', 'Stranger123')])
+        self.backend.logged_in_user = guest
+        self.backend.current_calendar = self.backend.get_calendar(guest)
+        with self.assertRaises(ValueError):  # без приглашения
+            self.backend.accept_invitation(self.event)
+        self.assertFalse(self.event.has_participant(guest))
+
+    def test_accept_invitation_with_conflict_check(self):
+        self.backend.logged_in_user = self.participant
+        self.backend.current_calendar = self.backend.get_calendar(self.participant)
+        busy = self.backend.create_event('Busy', datetime(2022, 12, 25, 9), datetime(2022, 12, 25, 12), '',
+                                         'каждую неделю')
+        self.backend.current_calendar.add_unprocessed_events(self.event)
+        with self.assertRaises(ConflictError) as raised:
+            self.backend.accept_invitation(self.event, check_conflicts=True)
+        self.assertEqual([conflict.event for conflict in raised.exception.conflicts], [busy])
+        self.assertNotIn(self.event, self.backend.current_calendar.events)
+        self.assertIn(self.event, self.backend.current_calendar.unprocessed_events)
+
     def test_get_events_in_range(self):
         self.backend.current_calendar.add_event(self.event)
         start_date = datetime(2023, 1, 1, 10, 0)
@@ -202,16 +239,13 @@ class TestBackend(unittest.TestCase):
             {'username': 'test_user1', 'password': 'Password1'},
             {'username': 'test_user2', 'password': 'Password2'}
         ]
-        with open('test_users.csv', 'w', newline='') as file:
+        with open(self.backend.users_storage_file, 'w', newline='') as file:
             fieldnames = ['username', 'password']
             writer = csv.DictWriter(file, fieldnames=fieldnames)
             writer.writeheader()
             for user in test_user_data:
                 writer.writerow(user)
 
-        # Set the temporary CSV file as the users_storage_file
-        self.backend.users_storage_file = 'test_users.csv'
-
         # Call the load_user_data method
         self.backend.load_user_data()
 
@@ -220,9 +254,6 @@ class TestBackend(unittest.TestCase):
         self.assertIn('test_user1', self.backend.users)
         self.assertIn('test_user2', self.backend.users)
 
-        # Clean up the temporary CSV file
-        os.remove('test_users.csv')
-
     def test_save_user_data(self):
         # Add test user data to the users dictionary
         self.backend.users = {
@@ -243,7 +274,6 @@ class TestBackend(unittest.TestCase):
         self.assertEqual(saved_users[0]['password'], 'Password1')
         self.assertEqual(saved_users[1]['username'], 'test_user2')
         self.assertEqual(saved_users[1]['password'], 'Password2')
-        os.remove('test_users.csv')
 
 
 
@@ -264,7 +294,6 @@ class TestBackend(unittest.TestCase):
         self.assertEqual(len(saved_calendars), 2)
         self.assertIn('test_user1', saved_calendars)
         self.assertIn('test_user2', saved_calendars)
-        os.remove('test_calendars.json')
 
     def test_load_calendar_data(self):
         self.backend.calendars = {
@@ -283,8 +312,5 @@ class TestBackend(unittest.TestCase):
         self.assertEqual(len(self.backend.calendars), 2)
         self.assertIn('test_user1', self.backend.calendars)
         self.assertIn('test_user2', self.backend.calendars)
-
-        # Clean up the temporary JSON file
-        os.remove('test_calendars.json')
 if __name__ == "__main__":
     unittest.main()
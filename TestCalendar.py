@@ -3,6 +3,7 @@ from datetime import timedelta, datetime
 
 from Calendar import RepetitionError, Calendar
 from Event import Event
+from Notification import Notification
 from User import User
 
 
@@ -18,7 +19,8 @@ class TestCalendar(unittest.TestCase):
         # This function will run after each test to clean up any resources used in the test
         User._usernames.clear()
         Event.events_map.clear()
-        self.event.participants.clear()
+        for participant in self.event.participants:
+            self.event.remove_participant(participant)
         Event.count = 1
 
     def test_add_event(self):
@@ -30,6 +32,42 @@ class TestCalendar(unittest.TestCase):
         self.calendar.remove_event(self.event)
         self.assertNotIn(self.event, self.calendar.events)
 
+    def test_membership_keeps_order(self):
+        events = [Event(f'Event {i}', self.start_time, self.end_time) for i in range(3)]
+        for event in events:
+            self.calendar.add_event(event)
+        self.calendar.add_event(events[0])
+        self.calendar.remove_event(events[1])
+        self.assertEqual(self.calendar.events, (events[0], events[2]))
+        self.assertTrue(self.calendar.has_event(events[2]))
+        self.assertFalse(self.calendar.has_event(events[1]))
+        self.calendar.add_unprocessed_events(events[1])
+        self.assertTrue(self.calendar.has_unprocessed_event(events[1]))
+        self.calendar.mark_event_as_processed(events[1])
+        with self.assertRaises(ValueError):
+            self.calendar.mark_event_as_processed(events[1])
+
+    def test_collections_are_read_only(self):
+        with self.assertRaises(AttributeError):
+            self.calendar.events.append(self.event)
+        with self.assertRaises(AttributeError):
+            self.calendar.notifications.append(Notification(1, 'Message'))
+        with self.assertRaises(AttributeError):
+            self.event.participants.append(self.test_user)
+
+    def test_unread_queue(self):
+        for i in range(1, 4):
+            self.calendar.notify(Notification(1, f'Message {i}', id=i))
+        self.calendar.mark_notification_read(2)
+        self.calendar.mark_notification_read(1)
+        self.assertEqual([n.id for n in self.calendar.unread_notifications], [3])
+        self.assertEqual([(n.id, n.status) for n in self.calendar.notifications],
+                         [(1, 'read'), (2, 'read'), (3, 'unread')])  # порядок поступления, а не прочтения
+        self.assertEqual([n['id'] for n in self.calendar.to_dict()['notifications']], [1, 2, 3])
+        self.assertEqual([n.id for n in self.calendar.pop_archivable_notifications(keep=1)], [2])
+        self.assertFalse(self.calendar.has_notification(2))
+        self.assertTrue(self.calendar.has_notification(3))
+
     def test_get_coming_events_contains_event(self):
         # Добавляем событие в календарь
         self.calendar.add_event(self.event)
@@ -45,6 +83,59 @@ class TestCalendar(unittest.TestCase):
         events_in_range = self.calendar.get_events_in_range(self.start_time, self.start_time + timedelta(days=1))
         self.assertIn(self.event.title, [event.title for events in events_in_range.values() for event in events])
 
+    def test_get_events_in_range_includes_overlapping(self):
+        start = datetime(2024, 1, 1, 22, 0)
+        event = Event(title="Night shift", start_time=start, end_time=start + timedelta(hours=10),
+                      organizer=self.test_user, recurrence='один раз')
+        self.calendar.add_event(event)
+        events_in_range = self.calendar.get_events_in_range(datetime(2024, 1, 2, 0, 0), datetime(2024, 1, 2, 23, 59))
+        self.assertIn(event, [event for events in events_in_range.values() for event in events])
+
+    def test_update_event_reindexes(self):
+        start = datetime(2024, 1, 1, 10, 0)
+        event = Event(title="Review", start_time=start, end_time=start + timedelta(hours=1),
+                      organizer=self.test_user, recurrence='один раз')
+        self.calendar.add_event(event)
+        event.update_event(start_time=start + timedelta(days=3), end_time=start + timedelta(days=3, hours=1))
+        self.assertFalse(self.calendar.get_events_in_range(start, start + timedelta(days=1)))
+        self.assertTrue(self.calendar.get_events_in_range(start + timedelta(days=3), start + timedelta(days=4)))
+
+    def test_find_conflicts(self):
+        review = Event(title="Review", start_time=datetime(2024, 3, 6, 10, 0), end_time=datetime(2024, 3, 6, 11, 0),
+                       organizer=self.test_user, recurrence='один раз')
+        self.calendar.add_event(review)
+        # еженедельное событие по средам пересекается с событием через пять недель после начала
+        self.assertEqual(self.calendar.find_conflicts(datetime(2024, 1, 31, 10, 30), datetime(2024, 1, 31, 12, 0),
+                                                      'каждую неделю'), [review])
+        self.assertEqual(self.calendar.find_conflicts(datetime(2024, 1, 31, 10, 30), datetime(2024, 1, 31, 12, 0),
+                                                      'каждую неделю', exclude=review), [])
+        self.assertEqual(self.calendar.find_conflicts(datetime(2024, 3, 6, 11, 0), datetime(2024, 3, 6, 12, 0)), [])
+
+    def test_find_conflicts_between_recurring_events(self):
+        standup = Event(title="Standup", start_time=datetime(2024, 1, 1, 10, 0), end_time=datetime(2024, 1, 1, 10, 30),
+                        organizer=self.test_user, recurrence='каждый день')
+        planning = Event(title="Planning", start_time=datetime(2024, 6, 3, 9, 0), end_time=datetime(2024, 6, 3, 11, 0),
+                         organizer=self.test_user, recurrence='каждый месяц')
+        self.calendar.add_event(standup)
+        self.calendar.add_event(planning)
+        # еженедельное событие по средам: первое пересечение с ежедневным - в день его начала,
+        # с ежемесячным - 3 июля 2024 (среда)
+        conflicts = self.calendar.find_conflicts(datetime(2024, 3, 6, 10, 15), datetime(2024, 3, 6, 11, 15),
+                                                 'каждую неделю')
+        self.assertEqual([(c.event, c.start_time) for c in conflicts],
+                         [(standup, datetime(2024, 3, 6, 10, 0)), (planning, datetime(2024, 7, 3, 9, 0))])
+        # ежедневное событие сразу после standup только касается его повторений
+        self.assertEqual(self.calendar.find_conflicts(datetime(2024, 2, 1, 10, 30), datetime(2024, 2, 1, 10, 45),
+                                                      'каждый день', exclude=planning), [])
+
+    def test_recurrence_expansion_does_not_register_events(self):
+        self.calendar.add_event(self.event)
+        count, registered = Event.count, len(Event.events_map)
+        events_in_range = self.calendar.get_events_in_range(self.start_time, self.start_time + timedelta(days=30))
+        self.assertEqual(sum(len(events) for events in events_in_range.values()), 31)
+        self.assertEqual(Event.count, count)
+        self.assertEqual(len(Event.events_map), registered)
+
     def test_add_unprocessed_event(self):
         self.calendar.add_unprocessed_events(self.event)
         self.assertIn(self.event, self.calendar.unprocessed_events)
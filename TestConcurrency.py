@@ -0,0 +1,146 @@
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from Backend import Backend, PermissionError
+from Calendar import RepetitionError
+from Locks import LockStripes, SharedLock
+
+
+class TestLocks(unittest.TestCase):
+    def test_stripes_are_taken_in_order(self):
+        stripes = LockStripes(8)
+        keys = [('calendar', f'user{i}') for i in range(20)]
+        with stripes.hold(keys):
+            with stripes.hold(keys[:3]):  # уже удерживаемые полосы берутся повторно без ожидания
+                pass
+        first, last = sorted(range(20), key=lambda i: stripes.index(keys[i]))[::19]
+        if stripes.index(keys[first]) != stripes.index(keys[last]):
+            with stripes.hold([keys[last]]):
+                with self.assertRaises(RuntimeError):
+                    with stripes.hold([keys[first]]):
+                        pass
+
+    def test_exclusive_waits_for_shared(self):
+        lock, events = SharedLock(), []
+        entered = threading.Event()
+
+        def reader():
+            with lock.shared():
+                entered.set()
+                events.append('read')
+                threading.Event().wait(0.1)
+                events.append('read done')
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        entered.wait()
+        with lock:
+            events.append('write')
+            with lock.shared():  # под исключительной блокировкой разделяемая берется без ожидания
+                pass
+        thread.join()
+        self.assertEqual(events, ['read', 'read done', 'write'])
+        with lock.shared(), self.assertRaises(RuntimeError):
+            lock.acquire()
+
+
+class TestConcurrentBackend(unittest.TestCase):
+    """Сотни потоков (как обработчики запросов сервера) приглашают, принимают приглашения и покидают события."""
+    users_count = 12
+    threads_count = 300
+    operations = 30
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend()
+        self.backend.calendars_storage_file = os.path.join(self.tmp.name, 'calendars.json')
+        self.backend.notification_retention = 5  # прочитанные уведомления уходят в архив из разных потоков
+        self.backend.calendars = {}
+        self.users = []
+        for i in range(self.users_count):
+            self.users.append(self.backend.create_user(f'user{i}', 'Password123'))
+        self.backend.logout()
+        self.events = []
+        for user in self.users[:4]:
+            session = self.backend.open_session()
+            session.login(user.username, 'Password123')
+            for hour in (10, 14):
+                start = datetime(2024, 1, 1, hour)
+                self.events.append(session.create_event(f'Meeting of {user}', start, start + timedelta(hours=1), '',
+                                                        'один раз'))
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # частые переключения потоков - больше чередований операций
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+        self.backend.reset()
+        self.tmp.cleanup()
+
+    def work(self, number, barrier, errors):
+        rng = random.Random(number)
+        session = self.backend.open_session()
+        user = self.users[number % self.users_count]
+        session.login(user.username, 'Password123')
+        barrier.wait()
+        try:
+            for _ in range(self.operations):
+                event = rng.choice(self.events)
+                if event.organizer is user:
+                    invitees = [invitee for invitee in rng.sample(self.users, 3)
+                                if not self.backend.calendars[invitee.username].has_event(event)
+                                and not self.backend.calendars[invitee.username].has_unprocessed_event(event)]
+                    try:
+                        session.invite_participants(event, invitees)
+                    except RepetitionError:  # участника только что пригласил другой сеанс организатора
+                        pass
+                elif session.current_calendar.has_unprocessed_event(event):
+                    try:
+                        if rng.random() < 0.8:
+                            session.accept_invitation(event)
+                        else:
+                            session.decline_invitation(event)
+                    except ValueError:  # приглашение уже обработал другой сеанс того же пользователя
+                        pass
+                elif event.has_participant(user):
+                    try:
+                        session.leave_event(event)
+                    except PermissionError:  # другой сеанс того же пользователя уже покинул событие
+                        pass
+                else:
+                    list(session.get_unread_notifications())
+        except Exception as e:
+            errors.append(e)
+
+    def test_invariants_hold_under_contention(self):
+        barrier = threading.Barrier(self.threads_count)
+        errors = []
+        threads = [threading.Thread(target=self.work, args=(i, barrier, errors)) for i in range(self.threads_count)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        calendars = {user: self.backend.calendars[user.username] for user in self.users}
+        for event in self.events:
+            self.assertTrue(event.has_participant(event.organizer))
+            for participant in event.participants:
+                self.assertTrue(calendars[participant].has_event(event))
+        for user, calendar in calendars.items():
+            for event in calendar.events:
+                self.assertTrue(event.has_participant(user))
+                self.assertFalse(calendar.has_unprocessed_event(event))
+            ids = [n.id for n in list(calendar.notifications) + self.backend.get_archived_notifications(user)]
+            self.assertEqual(len(ids), len(set(ids)))
+        self.assertGreater(sum(len(event.participants) for event in self.events), len(self.events))
+
+
+if __name__ == '__main__':
+    unittest.main()
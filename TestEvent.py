@@ -23,7 +23,8 @@ class TestEvent(unittest.TestCase):
         # This function will run after each test to clean up any resources used in the test
         User._usernames.clear()
         Event.events_map.clear()
-        self.event.participants.clear()
+        for participant in self.event.participants:
+            self.event.remove_participant(participant)
         Event.count = 1
         User._users_by_username.clear()
 
@@ -49,6 +50,23 @@ class TestEvent(unittest.TestCase):
         self.event.remove_participant(self.participant)
         self.assertNotIn(self.participant, self.event.participants)
 
+    def test_membership_is_hashed(self):
+        self.assertIn(self.event, {self.event})
+        self.assertEqual(hash(self.event), hash(self.event.event_id))
+        self.assertTrue(self.event.has_participant(self.organizer))
+        self.assertFalse(self.event.has_participant(self.participant))
+        self.event.update_event(participants=[self.participant, self.organizer])
+        self.assertEqual(self.event.participants, (self.organizer, self.participant))
+
+    def test_compact_storage(self):
+        self.assertFalse(hasattr(self.event, '__dict__'))
+        self.assertFalse(hasattr(self.organizer, '__dict__'))
+        self.event.update_event(start_time=datetime(2023, 1, 1, 10, 30, 45), end_time="01.01.2023 12:15")
+        self.assertIsInstance(self.event._start_time, int)
+        self.assertEqual(self.event.start_time, datetime(2023, 1, 1, 10, 30))  # секунды отбрасываются
+        self.assertEqual(self.event.end_time, datetime(2023, 1, 1, 12, 15))
+        self.assertEqual(self.event.to_dict()['start_time'], '2023-01-01T10:30:00')
+
     def test_update_event(self):
         new_description = "Updated description"
         new_end_time = datetime(2023, 1, 1, 12, 0)
@@ -78,6 +96,8 @@ class TestEvent(unittest.TestCase):
         self.assertEqual(periodic_event.description, self.description)
         self.assertEqual(periodic_event.start_time, new_start_time)
         self.assertEqual(periodic_event.end_time, new_end_time)
+        self.assertIs(periodic_event.event, self.event)
+        self.assertNotIn(periodic_event, Event.events_map.values())
 
 
 
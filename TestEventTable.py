@@ -0,0 +1,69 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from Calendar import Calendar
+from Event import Event
+from EventTable import EventTable
+from User import User
+
+RECURRENCES = ['один раз', 'один раз', 'каждый день', 'каждую неделю', 'каждый месяц', 'каждый год']
+
+
+class TestEventTable(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(15)
+        self.users = [User(f'user{i}', 'Password123') for i in range(5)]
+        self.calendars = {user.username: Calendar(user.user_id) for user in self.users}
+        shared = Event('Shared', datetime(2024, 1, 10, 9), datetime(2024, 1, 10, 10), '', None, 'один раз',
+                       self.users[0])
+        for calendar in self.calendars.values():
+            calendar.add_event(shared)
+        for user in self.users[:4]:  # у последнего пользователя только общее событие
+            for i in range(60):
+                start = datetime(2024, 1, 1) + timedelta(minutes=rng.randrange(0, 90 * 24 * 60, 15))
+                event = Event(f'Event {i}', start, start + timedelta(minutes=rng.choice([15, 60, 24 * 60])), '', None,
+                              rng.choice(RECURRENCES), user)
+                self.calendars[user.username].add_event(event)
+        self.windows = [(datetime(2024, 1, 1) + timedelta(days=day, seconds=30), datetime(2024, 1, 1) +
+                         timedelta(days=day + length, seconds=-30)) for day, length in [(0, 1), (9, 1), (30, 7),
+                                                                                       (80, 30), (200, 2)]]
+
+    def tearDown(self):
+        User._usernames.clear()
+        User._users_by_username.clear()
+        Event.events_map.clear()
+        Event.count = 1
+
+    def check_matches_calendars(self):
+        table = EventTable(self.calendars)
+        for start_date, end_date in self.windows:
+            expected = {username: calendar.get_events_in_range(start_date, end_date)
+                        for username, calendar in self.calendars.items()}
+            self.assertEqual(table.events_in_range(start_date, end_date), expected)
+        for username, calendar in self.calendars.items():
+            expected = [calendar.get_events_in_range(start_date, end_date) for start_date, end_date in self.windows]
+            self.assertEqual(table.user_events_in_windows(username, self.windows), expected)
+
+    def test_matches_get_events_in_range(self):
+        self.check_matches_calendars()
+
+    def test_without_numpy(self):
+        with patch.object(EventTable, 'available', False):
+            self.check_matches_calendars()
+
+    @unittest.skipUnless(EventTable.available, 'NumPy не установлен')
+    def test_columns(self):
+        table = EventTable(self.calendars)
+        self.assertEqual(len(table.events), 5 + 4 * 60)
+        self.assertEqual(list(table.owner_ids[:2]), [0, 0])
+        self.assertTrue((table.starts[table.codes == 0] <= table.ends[table.codes == 0]).all())
+
+    def test_empty_calendars(self):
+        table = EventTable({'nobody': Calendar('nobody')})
+        self.assertEqual(table.events_in_range(*self.windows[0]), {'nobody': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import random
+import unittest
+from datetime import date, datetime, timedelta
+
+from Backend import Backend
+from Calendar import Calendar
+from Event import Event
+from FreeBusy import MINUTES_PER_DAY, day_bitmap, free_runs
+from User import User
+
+
+class TestFreeBusy(unittest.TestCase):
+    def test_day_bitmap(self):
+        events = [Event('Morning', datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 10, 30)),
+                  Event('Night', datetime(2023, 12, 31, 23), datetime(2024, 1, 1, 0, 15)),
+                  Event('Late', datetime(2024, 1, 1, 23, 50), datetime(2024, 1, 2, 1))]
+        bitmap = day_bitmap(events, date(2024, 1, 1))
+        self.assertEqual(list(free_runs(~bitmap, 0, MINUTES_PER_DAY)), [(0, 15), (9 * 60, 10 * 60 + 30),
+                                                                        (23 * 60 + 50, MINUTES_PER_DAY)])
+
+    def tearDown(self):
+        User._usernames.clear()
+        User._users_by_username.clear()
+        Event.events_map.clear()
+        Event.count = 1
+
+
+class TestCommonFreeSlots(unittest.TestCase):
+    def setUp(self):
+        self.backend = Backend()
+        self.backend.calendars = {}
+        self.users = [User(f'user{i}', 'Password123') for i in range(3)]
+        for user in self.users:
+            self.backend.users[user.username] = user
+        self.login(self.users[0])
+        self.window = (datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 18))
+
+    def tearDown(self):
+        self.backend.reset()
+
+    def login(self, user):
+        self.backend.logged_in_user = user
+        self.backend.current_calendar = self.backend.get_calendar(user)
+
+    def slots(self, users=None, duration=timedelta(minutes=30)):
+        return self.backend.find_common_free_slots(users or self.users, self.window, duration)
+
+    def test_free_slots_follow_changes(self):
+        self.assertEqual(self.slots(), [self.window])
+        event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.assertEqual(self.slots(), [(datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 10)),
+                                        (datetime(2024, 1, 1, 11), datetime(2024, 1, 1, 18))])
+        self.backend.update_event(event, start_time=datetime(2024, 1, 1, 12), end_time=datetime(2024, 1, 1, 17, 45))
+        self.assertEqual(self.slots(), [(datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 12))])
+        self.assertEqual(self.slots(duration=timedelta(minutes=10)), [(datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 12)),
+                                                                      (datetime(2024, 1, 1, 17, 45), self.window[1])])
+        self.backend.delete_event(event)
+        self.assertEqual(self.slots(), [self.window])
+
+    def test_accept_and_leave(self):
+        event = self.backend.create_event('Standup', datetime(2023, 12, 1, 9), datetime(2023, 12, 1, 9, 30), '',
+                                          'каждый день')
+        self.backend.invite_participants(event, [self.users[1]])
+        self.assertEqual(self.slots(self.users[1:]), [self.window])  # приглашение еще не принято
+        self.login(self.users[1])
+        self.backend.accept_invitation(event)
+        self.assertEqual(self.slots(self.users[1:]), [(datetime(2024, 1, 1, 9, 30), self.window[1])])
+        self.backend.leave_event(event)
+        self.assertEqual(self.slots(self.users[1:]), [self.window])
+
+    def test_matches_events_in_range(self):
+        rnd = random.Random(17)
+        calendar = Calendar('owner')
+        for i in range(100):
+            start = datetime(2024, 1, 1) + timedelta(minutes=rnd.randrange(0, 7 * MINUTES_PER_DAY, 5))
+            calendar.add_event(Event(f'Event {i}', start, start + timedelta(minutes=rnd.randrange(5, 300, 5)), '',
+                                     None, rnd.choice(['один раз', 'один раз', 'каждый день', 'каждую неделю'])))
+        for offset in range(7):
+            day = date(2024, 1, 1) + timedelta(days=offset)
+            busy = set()
+            day_start = datetime(day.year, day.month, day.day)
+            occurrences = calendar.get_events_in_range(day_start, day_start + timedelta(days=1) - timedelta(microseconds=1))
+            for occurrence in (event for events in occurrences.values() for event in events):
+                for minute in range(MINUTES_PER_DAY):
+                    moment = day_start + timedelta(minutes=minute)
+                    if occurrence.start_time < moment + timedelta(minutes=1) and occurrence.end_time > moment:
+                        busy.add(minute)
+            bitmap = calendar.busy_bitmap(day)
+            self.assertEqual({minute for minute in range(MINUTES_PER_DAY) if bitmap >> minute & 1}, busy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from Event import Event
+from IdAllocator import IdAllocator
+from SqliteStorage import SqliteStorage
+
+
+def allocate_in_process(path, count):
+    allocator = IdAllocator.for_file(path, 'event', block_size=7)
+    return [allocator.allocate() for _ in range(count)]
+
+
+class TestIdAllocator(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'test.ids')
+
+    def tearDown(self):
+        Event.events_map.clear()
+        Event.count = 1
+        Event.id_allocator = None
+        self.tmp.cleanup()
+
+    def test_reserves_once_per_block(self):
+        reserved = []
+        counter = iter(range(1, 1000, 10))
+        allocator = IdAllocator(lambda count, floor: reserved.append(count) or next(counter), block_size=10)
+        self.assertEqual([allocator.allocate() for _ in range(25)], list(range(1, 26)))
+        self.assertEqual(reserved, [10, 10, 10])
+
+    def test_floor_skips_used_ids(self):
+        allocator = IdAllocator.for_file(self.path, 'event', block_size=10)
+        self.assertEqual(allocator.allocate(), 1)
+        self.assertEqual(allocator.allocate(floor=5), 5)
+        self.assertEqual(allocator.allocate(floor=50), 50)
+        self.assertEqual(IdAllocator.for_file(self.path, 'event').allocate(), 60)
+
+    def test_counters_are_separate_and_persistent(self):
+        events = IdAllocator.for_file(self.path, 'event', block_size=3)
+        notifications = IdAllocator.for_file(self.path, 'notification', block_size=3)
+        self.assertEqual([events.allocate(), notifications.allocate(), events.allocate()], [1, 1, 2])
+        self.assertEqual(list(IdAllocator.for_file(self.path, 'event').allocate_block(5)), [4, 5, 6, 7, 8])
+        self.assertEqual(events.allocate(), 3)
+        self.assertEqual(events.allocate(), 9)
+
+    def test_processes_do_not_collide(self):
+        with multiprocessing.Pool(4) as pool:
+            results = pool.starmap(allocate_in_process, [(self.path, 200)] * 4)
+        ids = [event_id for result in results for event_id in result]
+        self.assertEqual(len(ids), 800)
+        self.assertEqual(len(set(ids)), 800)
+
+    def test_sqlite_counter_starts_after_stored_ids(self):
+        path = os.path.join(self.tmp.name, 'test.db')
+        first, second = SqliteStorage(path), SqliteStorage(path)
+        try:
+            first.append('event', event={'event_id': 41, 'title': 'Old', 'start_time': None, 'end_time': None,
+                                         'description': '', 'recurrence': 'один раз', 'participants': [],
+                                         'organizer': None})
+            first.flush()
+            a = IdAllocator.for_storage(first, 'event', block_size=5)
+            b = IdAllocator.for_storage(second, 'event', block_size=5)
+            self.assertEqual([a.allocate(), b.allocate(), a.allocate()], [42, 47, 43])
+            self.assertEqual(second.reserve_ids('notification', 1), 1)
+        finally:
+            first.close()
+            second.close()
+
+    def test_event_ids_survive_restart(self):
+        Event.id_allocator = IdAllocator.for_file(self.path, 'event')
+        first = Event('First', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11))
+        # другой процесс (или перезапуск) не знает о созданных событиях, но получает новый блок id
+        Event.count = 1
+        Event.id_allocator = IdAllocator.for_file(self.path, 'event')
+        second = Event('Second', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11))
+        self.assertNotEqual(first.event_id, second.event_id)
+        self.assertIs(Event.events_map[first.event_id], first)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from IntervalIndex import IntervalIndex
+
+
+class TestIntervalIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = IntervalIndex(lambda interval: interval)
+        self.base = datetime(2024, 1, 1)
+
+    def test_add_and_overlapping(self):
+        self.index.add(1, (self.base, self.base + timedelta(hours=1)))
+        self.index.add(2, (self.base + timedelta(hours=3), self.base + timedelta(hours=4)))
+        found = self.index.overlapping(self.base + timedelta(minutes=30), self.base + timedelta(hours=2))
+        self.assertEqual(found, [(self.base, self.base + timedelta(hours=1))])
+
+    def test_remove(self):
+        self.index.add(1, (self.base, self.base + timedelta(hours=1)))
+        self.index.remove(1)
+        self.assertNotIn(1, self.index)
+        self.assertEqual(self.index.overlapping(self.base, self.base + timedelta(days=1)), [])
+
+    def test_readd_replaces_interval(self):
+        self.index.add(1, (self.base, self.base + timedelta(hours=1)))
+        self.index.add(1, (self.base + timedelta(days=2), self.base + timedelta(days=2, hours=1)))
+        self.assertEqual(len(self.index), 1)
+        self.assertEqual(self.index.overlapping(self.base, self.base + timedelta(days=1)), [])
+
+    def test_matches_linear_scan(self):
+        rnd = random.Random(42)
+        intervals = {}
+        for i in range(500):
+            start = self.base + timedelta(minutes=rnd.randrange(0, 60 * 24 * 30))
+            intervals[i] = (start, start + timedelta(minutes=rnd.randrange(0, 60 * 24 * 3)))
+            self.index.add(i, intervals[i])
+        for i in range(0, 500, 3):
+            self.index.remove(i)
+            del intervals[i]
+        for _ in range(50):
+            lo = self.base + timedelta(minutes=rnd.randrange(0, 60 * 24 * 30))
+            hi = lo + timedelta(minutes=rnd.randrange(0, 60 * 24 * 5))
+            expected = sorted((s, e) for s, e in intervals.values() if s <= hi and e >= lo)
+            self.assertEqual(sorted(self.index.overlapping(lo, hi)), expected)
+        self.assertEqual(sorted(self.index), sorted(intervals.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
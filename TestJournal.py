@@ -0,0 +1,144 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from Backend import Backend
+from Event import Event
+from Journal import Journal
+from User import User
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = Journal(os.path.join(self.tmp.name, 'test.journal'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_flush_appends_pending_records(self):
+        self.journal.append('read', username='kate', notification_id=1)
+        self.journal.append('read', username='kate', notification_id=2)
+        self.assertEqual(self.journal.flush(), 2)
+        self.journal.append('read', username='kate', notification_id=3)
+        self.journal.flush()
+        self.assertEqual([record['notification_id'] for record in self.journal.read()], [1, 2, 3])
+        self.assertEqual(len(self.journal), 3)
+
+    def test_torn_last_line_is_ignored(self):
+        self.journal.append('read', username='kate', notification_id=1)
+        self.journal.flush()
+        with open(self.journal.path, 'a', encoding='utf-8') as f:
+            f.write('{"op": "rea')
+        self.assertEqual(len(list(self.journal.read())), 1)
+
+    def test_truncate(self):
+        self.journal.append('read', username='kate', notification_id=1)
+        self.journal.flush()
+        self.journal.truncate()
+        self.assertEqual(list(self.journal.read()), [])
+        self.assertEqual(len(self.journal), 0)
+
+
+class TestBackendJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend()
+        self.backend.calendars_storage_file = os.path.join(self.tmp.name, 'test_calendars.json')
+        self.backend.use_journal = True
+        self.backend.calendars = {}
+        self.organizer = self.backend.users['organizer'] = User('organizer', 'Password123')
+        self.participant = self.backend.users['participant'] = User('participant', 'Password123')
+        self.backend.get_calendar(self.participant)
+        self.backend.logged_in_user = self.organizer
+        self.backend.current_calendar = self.backend.get_calendar(self.organizer)
+        self.backend.compact_calendar_data()
+
+    def tearDown(self):
+        self.backend.reset()
+        self.tmp.cleanup()
+
+    def reload(self):
+        """Имитирует перезапуск: очищает события в памяти и загружает снимок вместе с журналом."""
+        Event.events_map.clear()
+        self.backend.calendars = {}
+        self.backend.load_calendar_data()
+
+    def test_save_appends_to_journal_without_rewriting_snapshot(self):
+        with open(self.backend.calendars_storage_file, encoding='utf-8') as f:
+            snapshot = f.read()
+        event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.invite_participants(event, [self.participant])
+        self.backend.save_calendar_data()
+        with open(self.backend.calendars_storage_file, encoding='utf-8') as f:
+            self.assertEqual(f.read(), snapshot)
+        ops = [record['op'] for record in self.backend.journal.read()]
+        self.assertEqual(ops, ['event', 'add_event', 'invite', 'notify'])
+
+    def test_replay_restores_state(self):
+        event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.invite_participants(event, [self.participant])
+        self.backend.logged_in_user = self.participant
+        self.backend.current_calendar = self.backend.get_calendar(self.participant)
+        self.backend.accept_invitation(event)
+        list(self.backend.get_unread_notifications())
+        self.backend.save_calendar_data()
+        self.reload()
+        participant_calendar = self.backend.calendars['participant']
+        self.assertEqual([e.event_id for e in participant_calendar.events], [event.event_id])
+        self.assertFalse(participant_calendar.unprocessed_events)
+        self.assertEqual([n.status for n in participant_calendar.notifications], ['read'])
+        self.assertEqual(len(self.backend.calendars['organizer'].notifications), 1)
+        self.assertEqual(Event.events_map[event.event_id].participants, (self.organizer, self.participant))
+
+    def test_replay_is_idempotent_after_compaction(self):
+        self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.save_calendar_data()
+        records = list(self.backend.journal.read())
+        self.backend.compact_calendar_data()
+        with open(self.backend.journal.path, 'w', encoding='utf-8') as f:  # сбой между записью снимка и очисткой журнала
+            f.writelines(json.dumps(record) + '\n' for record in records)
+        self.reload()
+        self.assertEqual(len(self.backend.calendars['organizer'].events), 1)
+
+    def test_compaction_after_threshold(self):
+        self.backend.journal_compaction_threshold = 3
+        self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.create_event('Review', datetime(2024, 1, 2, 10), datetime(2024, 1, 2, 11), '', 'один раз')
+        self.backend.save_calendar_data()
+        self.assertFalse(os.path.exists(self.backend.journal.path))
+        with open(self.backend.calendars_storage_file, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['organizer']['events']), 2)
+
+    def send_and_read_notifications(self, count):
+        event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        for i in range(count):
+            self.backend.dispatcher.dispatch(event, 'updated', [self.participant], title=f'Meeting {i}')
+        self.backend.logged_in_user = self.participant
+        self.backend.current_calendar = self.backend.get_calendar(self.participant)
+        return list(self.backend.get_unread_notifications())
+
+    def test_read_notifications_are_archived(self):
+        self.backend.notification_retention = 1
+        self.assertEqual(len(self.send_and_read_notifications(3)), 3)
+        self.backend.save_calendar_data()
+        self.reload()
+        calendar = self.backend.calendars['participant']
+        self.assertEqual([n.message for n in calendar.notifications], ["Событие 'Meeting 2' было изменено организатором."])
+        self.assertEqual([n.message for n in self.backend.get_archived_notifications(self.participant)],
+                         ["Событие 'Meeting 0' было изменено организатором.",
+                          "Событие 'Meeting 1' было изменено организатором."])
+
+    def test_delete_event_is_replayed(self):
+        event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.delete_event(event)
+        self.backend.save_calendar_data()
+        self.reload()
+        self.assertFalse(self.backend.calendars['organizer'].events)
+        self.assertNotIn(event.event_id, Event.events_map)
+
+
+if __name__ == '__main__':
+    unittest.main()
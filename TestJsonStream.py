@@ -0,0 +1,45 @@
+import io
+import json
+import unittest
+
+from JsonStream import iter_items, iter_pairs
+
+
+class TestJsonStream(unittest.TestCase):
+    def setUp(self):
+        self.document = {
+            'kate': {'events': [{'title': 'Встреча', 'id': 1}], 'count': 12345},
+            'valentin': {'events': [], 'note': 'x' * 1000},
+            'empty': {},
+            'number': 3.5,
+        }
+
+    def items(self, text, chunk_size=7):
+        return list(iter_items(io.BytesIO(text.encode('utf-8')), chunk_size=chunk_size))
+
+    def test_items_match_json_load(self):
+        for indent in (None, 4):
+            for ensure_ascii in (True, False):
+                text = json.dumps(self.document, indent=indent, ensure_ascii=ensure_ascii)
+                items = self.items(text)
+                self.assertEqual({key: value for key, value, _, _ in items}, self.document)
+
+    def test_offsets_point_to_values(self):
+        data = json.dumps(self.document, indent=4, ensure_ascii=False).encode('utf-8')
+        for key, value, offset, length in iter_items(io.BytesIO(data), chunk_size=5):
+            self.assertEqual(json.loads(data[offset:offset + length]), value)
+
+    def test_empty_object(self):
+        self.assertEqual(self.items(' { } '), [])
+
+    def test_truncated_document(self):
+        with self.assertRaises(ValueError):
+            self.items(json.dumps(self.document)[:-20])
+
+    def test_iter_pairs(self):
+        pairs = iter_pairs(io.BytesIO(json.dumps(self.document).encode('utf-8')))
+        self.assertEqual(dict(pairs), self.document)
+
+
+if __name__ == '__main__':
+    unittest.main()
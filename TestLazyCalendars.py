@@ -0,0 +1,182 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from datetime import datetime
+
+from Backend import Backend
+from Event import Event
+from LazyCalendars import LazyCalendars
+from Notification import Notification
+from Serializer import get_serializer
+from User import User
+
+
+class TestLazyCalendars(unittest.TestCase):
+    def setUp(self):
+        self.loads = []
+        self.calendars = LazyCalendars(lambda username: self.loads.append(username) or f'calendar of {username}',
+                                       ['kate', 'valentin'])
+
+    def test_loads_on_first_access(self):
+        self.assertIn('kate', self.calendars)
+        self.assertEqual(len(self.calendars), 2)
+        self.assertEqual(self.loads, [])
+        self.assertEqual(self.calendars['kate'], 'calendar of kate')
+        self.calendars.get('kate')
+        self.assertEqual(self.loads, ['kate'])
+        self.assertTrue(self.calendars.is_loaded('kate'))
+        self.assertFalse(self.calendars.is_loaded('valentin'))
+
+    def test_setitem_replaces_unloaded(self):
+        self.calendars['valentin'] = 'new calendar'
+        self.assertEqual(self.calendars['valentin'], 'new calendar')
+        self.assertEqual(self.loads, [])
+        self.assertEqual(list(self.calendars), ['valentin', 'kate'])
+
+
+class TestBackendLazyLoading(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend()
+        self.backend.calendars_storage_file = os.path.join(self.tmp.name, 'test_calendars.json')
+        self.backend.calendars = {}
+        self.users = [User(f'user{i}', 'Password123') for i in range(3)]
+        for user in self.users:
+            self.backend.users[user.username] = user
+            self.backend.logged_in_user = user
+            self.backend.current_calendar = self.backend.get_calendar(user)
+            self.backend.create_event(f'Event of {user}', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.logged_in_user = self.users[0]
+        self.backend._notify([self.users[1]], Notification(1, 'Test'))
+        self.backend.save_calendar_data()
+        self.next_ids = Event.count, Notification.count
+
+    def tearDown(self):
+        self.backend.reset()
+        self.tmp.cleanup()
+
+    def restart(self):
+        Event.events_map.clear()
+        Event.count = Notification.count = 1
+        self.backend.calendars = {}
+        self.backend.load_calendar_data()
+
+    def test_only_requested_calendar_is_parsed(self):
+        self.restart()
+        self.assertEqual(len(self.backend.calendars), 3)
+        self.assertEqual(self.backend.calendars.loaded(), {})
+        calendar = self.backend.get_calendar(self.users[1])
+        self.assertEqual([event.title for event in calendar.events], ['Event of user1'])
+        self.assertEqual(list(self.backend.calendars.loaded()), ['user1'])
+        self.assertEqual(len(Event.events_map), 1)
+
+    def test_ids_continue_after_unloaded_calendars(self):
+        self.restart()
+        self.assertEqual((Event.count, Notification.count), self.next_ids)
+
+    def test_unloaded_calendars_are_preserved_on_save(self):
+        self.restart()
+        self.backend.logged_in_user = self.users[0]
+        self.backend.current_calendar = self.backend.get_calendar(self.users[0])
+        self.backend.create_event('Second', datetime(2024, 1, 2, 10), datetime(2024, 1, 2, 11), '', 'один раз')
+        self.backend.save_calendar_data()
+        with open(self.backend.calendars_storage_file, encoding='utf-8') as f:
+            saved = json.load(f)
+        self.assertEqual([len(saved[user.username]['events']) for user in self.users], [2, 1, 1])
+        self.assertEqual(len(saved['user1']['notifications']), 1)
+
+    def test_index_is_rebuilt_when_missing(self):
+        os.remove(self.backend.calendars_storage_file + '.idx')
+        self.restart()
+        self.assertEqual(self.backend.calendars.loaded(), {})
+        self.assertEqual(Event.count, 4)
+        self.assertEqual(self.backend.get_calendar(self.users[2]).events[0].title, 'Event of user2')
+
+    def test_legacy_snapshot_is_indexed(self):
+        with open(self.backend.calendars_storage_file, encoding='utf-8') as f:
+            saved = json.load(f)
+        with open(self.backend.calendars_storage_file, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=4)
+        self.restart()
+        self.assertEqual(self.backend.calendars.loaded(), {})
+        self.assertEqual(self.backend.calendars['user0'].events[0].title, 'Event of user0')
+        self.backend.save_calendar_data()
+        self.restart()
+        self.assertEqual(self.backend.calendars['user2'].events[0].title, 'Event of user2')
+    def test_snapshot_is_read_by_same_format_serializer(self):
+        with patch.object(self.backend, 'serializer', get_serializer('orjson')):
+            self.restart()
+            self.assertEqual(self.backend.calendars.loaded(), {})
+            self.assertEqual(self.backend.calendars['user1'].events[0].title, 'Event of user1')
+
+    def share_first_event(self):
+        event = self.backend.calendars['user0'].events[0]
+        self.backend.logged_in_user = self.users[0]
+        self.backend.invite_participants(event, [self.users[1]])
+        self.backend.logged_in_user = self.users[1]
+        self.backend.current_calendar = self.backend.get_calendar(self.users[1])
+        self.backend.accept_invitation(event)
+        self.backend.save_calendar_data()
+        return event
+
+    def test_shared_event_is_stored_once(self):
+        event = self.share_first_event()
+        with open(self.backend.calendars_storage_file, encoding='utf-8') as f:
+            text = f.read()
+        saved = json.loads(text)
+        self.assertEqual(text.count('"title":"Event of user0"'), 1)
+        self.assertEqual(sorted(key for key in saved if key.startswith('#')), ['#1', '#2', '#3'])
+        self.assertEqual(saved['user1']['events'], [2, event.event_id])
+        self.restart()
+        shared = self.backend.calendars['user1'].events[1]
+        self.assertIs(self.backend.calendars['user0'].events[0], shared)
+        self.assertEqual([participant.username for participant in shared.participants], ['user0', 'user1'])
+
+    def test_deleted_event_is_dropped_from_event_table(self):
+        event_id = self.share_first_event().event_id
+        self.restart()
+        self.backend.logged_in_user = self.users[0]
+        self.backend.current_calendar = self.backend.get_calendar(self.users[0])
+        self.backend.delete_event(self.backend.current_calendar.events[0])
+        self.backend.save_calendar_data()
+        with open(self.backend.calendars_storage_file, encoding='utf-8') as f:
+            saved = json.load(f)
+        self.assertNotIn(f'#{event_id}', saved)
+        self.assertIn('#3', saved)  # событие незагруженного календаря скопировано из старого снимка
+        self.assertEqual(saved['user1']['events'], [2])
+
+    def test_deleted_event_drops_pending_invites(self):
+        event_id = self.backend.calendars['user0'].events[0].event_id
+        self.backend.invite_participants(self.backend.calendars['user0'].events[0], self.users[1:])
+        self.backend.save_calendar_data()
+        self.restart()
+        self.backend.logged_in_user = self.users[0]
+        self.backend.current_calendar = self.backend.get_calendar(self.users[0])
+        self.assertEqual([event.event_id for event in self.backend.calendars['user1'].unprocessed_events], [event_id])
+        self.backend.delete_event(self.backend.current_calendar.events[0])
+        self.assertEqual(self.backend.calendars['user1'].unprocessed_events, ())
+        self.assertEqual(self.backend.calendars['user2'].unprocessed_events, ())  # загружен после удаления
+        self.backend.save_calendar_data()
+        with open(self.backend.calendars_storage_file, encoding='utf-8') as f:
+            self.assertNotIn(f'#{event_id}', json.load(f))
+        self.restart()
+        for user in self.users[1:]:
+            self.assertEqual(self.backend.calendars[user.username].unprocessed_events, ())
+        self.assertNotIn(event_id, Event.events_map)
+
+    def test_snapshot_with_embedded_events_is_loaded(self):
+        self.restart()
+        legacy = {user.username: dict(self.backend.calendars[user.username].to_dict(),
+                                      events=[event.to_dict() for event in self.backend.calendars[user.username].events])
+                  for user in self.users}
+        with open(self.backend.calendars_storage_file, 'w', encoding='utf-8') as f:
+            json.dump(legacy, f, indent=4)
+        self.restart()
+        self.assertEqual(self.backend.calendars['user2'].events[0].title, 'Event of user2')
+        self.assertEqual(Event.count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
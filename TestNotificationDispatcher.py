@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from Backend import Backend
+from Event import Event
+from Notification import Notification
+from SqliteStorage import SqliteStorage
+from User import User
+
+
+class TestNotificationDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend()
+        self.backend.calendars_storage_file = os.path.join(self.tmp.name, 'test_calendars.json')
+        self.backend.use_journal = True
+        self.backend.calendars = {}
+        self.users = [User(f'user{i}', 'Password123') for i in range(4)]
+        for user in self.users:
+            self.backend.users[user.username] = user
+        self.organizer = self.users[0]
+        self.backend.logged_in_user = self.organizer
+        self.backend.current_calendar = self.backend.get_calendar(self.organizer)
+        self.event = self.backend.create_event('All hands', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '',
+                                               'один раз')
+
+    def tearDown(self):
+        self.backend.reset()
+        self.tmp.cleanup()
+
+    def test_one_record_and_one_notification_for_all_recipients(self):
+        recipients = self.users[1:] + [self.users[1], None]
+        n = self.backend.dispatcher.dispatch(self.event, 'updated', recipients)
+        self.assertEqual(n.message, "Событие 'All hands' было изменено организатором.")
+        self.assertEqual(list(self.backend.journal.read()), [])  # рассылка не сохраняет, сохраняет save_calendar_data
+        self.backend.save_calendar_data()
+        records = list(self.backend.journal.read())
+        self.assertEqual([record['op'] for record in records if record['op'] != 'calendar'],
+                         ['event', 'add_event', 'notify'])
+        self.assertEqual(records[-1]['usernames'], ['user1', 'user2', 'user3'])
+        inboxes = [self.backend.calendars[user.username].notifications for user in self.users[1:]]
+        self.assertTrue(all(inbox == (n,) and inbox[0] is n for inbox in inboxes))  # одно уведомление на всех
+        self.backend.calendars['user1'].mark_notification_read(n.id)  # у каждого получателя свой статус прочтения
+        self.assertEqual(self.backend.calendars['user1'].notifications[0].status, 'read')
+        self.assertEqual([n.status, self.backend.calendars['user2'].notifications[0].status], ['unread', 'unread'])
+
+    def test_no_recipients(self):
+        self.assertIsNone(self.backend.dispatcher.dispatch(self.event, 'deleted', [None]))
+        self.assertNotIn('notify', [record['op'] for record in self.backend.journal.read()])
+
+    def test_leave_event_sends_one_notification(self):
+        for user in self.users[1:]:
+            self.event.add_participant(user)
+        self.backend.logged_in_user = self.users[3]
+        self.backend.current_calendar = self.backend.get_calendar(self.users[3])
+        self.backend.leave_event(self.event)
+        self.backend.save_calendar_data()
+        notifications = [record for record in self.backend.journal.read() if record['op'] == 'notify']
+        self.assertEqual(len(notifications), 1)
+        self.assertEqual(notifications[0]['usernames'], ['user0', 'user1', 'user2'])
+        self.assertEqual(notifications[0]['notification']['message'], 'Участник user3 покинул событие All hands.')
+
+    def test_unloaded_calendars_are_not_loaded(self):
+        storage = SqliteStorage(os.path.join(self.tmp.name, 'test.db'))
+        try:
+            self.backend.use_journal = False
+            self.backend.storage = storage
+            self.backend.save_user_data()
+            self.backend.save_calendar_data()
+            for user in self.users[1:]:
+                self.backend.get_calendar(user)
+            self.backend.save_calendar_data()
+            self.backend.load_calendar_data()
+            self.backend.dispatcher.dispatch(self.event, 'deleted', self.users[1:])
+            self.assertEqual(list(self.backend.calendars.loaded()), [])
+            self.backend.save_calendar_data()
+            calendar = self.backend.calendars['user2']
+            self.assertEqual([n.message for n in calendar.notifications], ["Событие 'All hands' было удалено организатором."])
+        finally:
+            self.backend.storage = None
+            Event.id_allocator = Notification.id_allocator = None
+            storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+from unittest.mock import patch
+
+from dateutil.rrule import rrule, DAILY, WEEKLY, MONTHLY, YEARLY
+
+import Recurrence
+
+from Event import Event
+from Recurrence import RecurrenceRule, expand_fixed
+from User import User
+
+
+class TestRecurrenceRule(unittest.TestCase):
+    def assertMatchesRrule(self, freq, dtstart, start, end):
+        expected = rrule(freq, dtstart=dtstart).between(start, end, inc=True)
+        self.assertEqual(list(RecurrenceRule(freq, dtstart).between(start, end)), expected,
+                         f'freq={freq}, dtstart={dtstart}, window=({start}, {end})')
+
+    def test_matches_rrule(self):
+        rnd = random.Random(7)
+        for _ in range(400):
+            freq = rnd.choice([DAILY, WEEKLY, MONTHLY, YEARLY])
+            dtstart = datetime(2000, 1, 1) + timedelta(minutes=rnd.randrange(0, 60 * 24 * 365 * 10))
+            start = dtstart + timedelta(minutes=rnd.randrange(-60 * 24 * 400, 60 * 24 * 365 * 6))
+            end = start + timedelta(minutes=rnd.randrange(0, 60 * 24 * 800))
+            self.assertMatchesRrule(freq, dtstart, start, end)
+
+    def test_month_end_and_leap_day(self):
+        self.assertMatchesRrule(MONTHLY, datetime(2023, 1, 31, 9, 0), datetime(2023, 1, 1), datetime(2024, 12, 31))
+        self.assertMatchesRrule(YEARLY, datetime(2020, 2, 29, 9, 0), datetime(2021, 1, 1), datetime(2033, 1, 1))
+
+    def test_window_bounds_are_inclusive(self):
+        dtstart = datetime(2024, 1, 1, 10, 0)
+        occurrences = list(RecurrenceRule(DAILY, dtstart).between(datetime(2024, 1, 3, 10, 0), datetime(2024, 1, 5, 10, 0)))
+        self.assertEqual(occurrences, [datetime(2024, 1, d, 10, 0) for d in (3, 4, 5)])
+
+
+class TestExpandFixed(unittest.TestCase):
+    def random_rules(self, rnd, count):
+        rules, starts = [], []
+        for _ in range(count):
+            freq = rnd.choice([DAILY, WEEKLY, DAILY, WEEKLY, MONTHLY, YEARLY])
+            dtstart = datetime(1968, 1, 1) + timedelta(seconds=rnd.randrange(0, 60 * 60 * 24 * 365 * 4))
+            rules.append(RecurrenceRule(freq, dtstart))
+            starts.append(dtstart + timedelta(seconds=rnd.randrange(-60 * 60 * 24 * 400, 60 * 60 * 24 * 365),
+                                              microseconds=rnd.randrange(0, 1000000)))
+        return rules, starts
+
+    def assertMatchesRrule(self, seed):
+        rnd = random.Random(seed)
+        for _ in range(20):
+            rules, starts = self.random_rules(rnd, rnd.randrange(0, 40))
+            end = max(starts, default=datetime(2000, 1, 1)) + timedelta(seconds=rnd.randrange(-60 * 60 * 24 * 30,
+                                                                                              60 * 60 * 24 * 400))
+            expected = [rrule(rule.freq, dtstart=rule.dtstart).between(start, end, inc=True)
+                        for rule, start in zip(rules, starts)]
+            self.assertEqual(expand_fixed(rules, starts, end), expected)
+
+    @unittest.skipUnless(Recurrence.np is not None, 'NumPy не установлен')
+    def test_numpy_matches_rrule(self):
+        self.assertMatchesRrule(16)
+
+    def test_integer_arithmetic_matches_rrule(self):
+        with patch.object(Recurrence, 'np', None):
+            self.assertMatchesRrule(17)
+
+    def test_no_rules(self):
+        self.assertEqual(expand_fixed([], [], datetime(2024, 1, 1)), [])
+
+
+class TestEventRule(unittest.TestCase):
+    def setUp(self):
+        self.organizer = User('rule_owner', 'Password123')
+        self.event = Event('Standup', datetime(2024, 1, 1, 10, 0), datetime(2024, 1, 1, 10, 15),
+                           recurrence='каждый день', organizer=self.organizer)
+
+    def tearDown(self):
+        User._usernames.clear()
+        User._users_by_username.clear()
+        Event.events_map.clear()
+        Event.count = 1
+
+    def test_rule_is_cached(self):
+        self.assertIs(self.event.rule, self.event.rule)
+
+    def test_update_event_invalidates_rule(self):
+        rule = self.event.rule
+        self.event.update_event(recurrence='каждую неделю')
+        self.assertIsNot(self.event.rule, rule)
+        self.assertEqual(self.event.rule.freq, WEEKLY)
+        self.event.update_event(start_time=datetime(2024, 2, 1, 10, 0))
+        self.assertEqual(self.event.rule.dtstart, datetime(2024, 2, 1, 10, 0))
+
+    def test_non_recurring_event_has_no_rule(self):
+        self.event.update_event(recurrence='один раз')
+        self.assertIsNone(self.event.rule)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import unittest
+from unittest.mock import patch
+
+from Serializer import JsonSerializer, MsgpackSerializer, OrjsonSerializer, SERIALIZERS, get_serializer
+
+
+class TestSerializer(unittest.TestCase):
+    def setUp(self):
+        self.calendars = {
+            'kate': {'owner': 'kate', 'events': [{'event_id': 1, 'title': 'Встреча', 'recurrence': 'каждую неделю',
+                                                  'participants': ['kate'], 'organizer': None}],
+                     'unprocessed_events': [], 'notifications': []},
+            'valentin': {'owner': 'valentin', 'events': [], 'unprocessed_events': [], 'notifications': []},
+        }
+        self.serializers = [serializer() for serializer in SERIALIZERS.values() if serializer.available]
+
+    def write_snapshot(self, serializer):
+        out = io.BytesIO()
+        serializer.write_header(out)
+        offsets = {}
+        for username, calendar_data in self.calendars.items():
+            payload = serializer.dumps(calendar_data)
+            offsets[username] = [serializer.write_entry(out, username, payload, first=not offsets), len(payload)]
+        serializer.write_footer(out)
+        return out.getvalue(), offsets
+
+    def test_round_trip(self):
+        for serializer in self.serializers:
+            with self.subTest(serializer=serializer.name):
+                self.assertEqual(serializer.loads(serializer.dumps(self.calendars)), self.calendars)
+
+    def test_snapshot_offsets(self):
+        for serializer in self.serializers:
+            with self.subTest(serializer=serializer.name):
+                data, offsets = self.write_snapshot(serializer)
+                items = list(serializer.iter_items(io.BytesIO(data)))
+                self.assertEqual({key: value for key, value, _, _ in items}, self.calendars)
+                self.assertEqual({key: [offset, length] for key, _, offset, length in items}, offsets)
+                for username, (offset, length) in offsets.items():
+                    self.assertEqual(serializer.loads(data[offset:offset + length]), self.calendars[username])
+                self.assertEqual(dict(serializer.iter_pairs(io.BytesIO(data))), self.calendars)
+
+    def test_json_is_compact(self):
+        data = JsonSerializer().dumps(self.calendars['kate'])
+        self.assertIn('Встреча'.encode('utf-8'), data)
+        self.assertNotIn(b'\\u', data)
+        self.assertNotIn(b', ', data)
+
+    def test_fallback_to_json(self):
+        with patch.object(OrjsonSerializer, 'available', False), patch.object(MsgpackSerializer, 'available', False):
+            self.assertEqual(get_serializer('orjson').name, 'json')
+            self.assertEqual(get_serializer('msgpack').name, 'json')
+        with self.assertRaises(ValueError):
+            get_serializer('yaml')
+
+
+if __name__ == '__main__':
+    unittest.main()
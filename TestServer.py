@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from Backend import Backend
+from Server import CalendarServer
+
+
+class Client:
+    """HTTP-клиент для тестов: одно keep-alive соединение, запросы можно отправлять конвейером."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.token = None
+
+    @classmethod
+    async def connect(cls, port):
+        return cls(*await asyncio.open_connection('127.0.0.1', port))
+
+    def encode(self, method, path, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        lines = [f'{method} {path} HTTP/1.1', 'Host: localhost', f'Content-Length: {len(data)}']
+        if self.token is not None:
+            lines.append(f'Authorization: Bearer {self.token}')
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('ascii') + data
+
+    async def read_response(self):
+        head = (await self.reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        status = int(head[0].split(' ')[1])
+        headers = {name.lower(): value.strip() for name, _, value in (line.partition(':') for line in head[1:] if line)}
+        body = await self.reader.readexactly(int(headers['content-length']))
+        return status, json.loads(body), headers
+
+    async def request(self, method, path, body=None, headers=None):
+        self.writer.write(self.encode(method, path, body, headers))
+        await self.writer.drain()
+        return await self.read_response()
+
+    async def sign_up(self, username):
+        status, data, _ = await self.request('POST', '/users', {'username': username, 'password': 'Password123'})
+        self.token = data['token']
+        return status
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend()
+        self.backend.calendars_storage_file = os.path.join(self.tmp.name, 'calendars.json')
+        self.backend.users_storage_file = os.path.join(self.tmp.name, 'users.csv')
+        self.backend.calendars = {}
+        self.server = CalendarServer(self.backend, workers=4)
+        self.listener = await self.server.start('127.0.0.1', 0)
+        self.port = self.listener.sockets[0].getsockname()[1]
+        self.clients = []
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        self.listener.close()
+        await self.listener.wait_closed()
+        self.server.close()
+        self.backend.reset()
+        self.tmp.cleanup()
+
+    async def client(self, username=None):
+        client = await Client.connect(self.port)
+        self.clients.append(client)
+        if username is not None:
+            self.assertEqual(await client.sign_up(username), 201)
+        return client
+
+    async def test_login_and_events(self):
+        kate = await self.client('kate')
+        self.assertEqual((await kate.request('POST', '/users', {'username': 'kate', 'password': 'Password123'}))[0], 409)
+        status, event, _ = await kate.request('POST', '/events', {
+            'title': 'Meeting', 'start_time': '2024-01-01T10:00', 'end_time': '2024-01-01T11:00',
+            'recurrence': 'каждый день'})
+        self.assertEqual((status, event['organizer']), (201, 'kate'))
+        status, data, _ = await kate.request('GET', '/events?start=2024-01-01T00:00&end=2024-01-03T23:59')
+        self.assertEqual([e['start_time'] for e in data['events']],
+                         ['2024-01-01T10:00:00', '2024-01-02T10:00:00', '2024-01-03T10:00:00'])
+        status, event, _ = await kate.request('PATCH', f"/events/{event['event_id']}", {'title': 'Review'})
+        self.assertEqual((status, event['title']), (200, 'Review'))
+        self.assertEqual((await kate.request('DELETE', f"/events/{event['event_id']}"))[0], 200)
+        self.assertEqual((await kate.request('DELETE', f"/events/{event['event_id']}"))[0], 404)
+
+        another = await self.client()
+        self.assertEqual((await another.request('GET', '/events'))[0], 401)
+        status, data, _ = await another.request('POST', '/login', {'username': 'kate', 'password': 'Password123'})
+        self.assertEqual((status, data['username']), (200, 'kate'))
+        status, _, _ = await another.request('POST', '/login', {'username': 'kate', 'password': 'wrong'})
+        self.assertEqual(status, 401)
+
+    async def test_invitations_and_notifications(self):
+        kate, valentin = await self.client('kate'), await self.client('valentin')
+        _, event, _ = await kate.request('POST', '/events', {
+            'title': 'Meeting', 'start_time': '2024-01-01T10:00', 'end_time': '2024-01-01T11:00'})
+        path = f"/events/{event['event_id']}"
+        status, _, _ = await kate.request('POST', path + '/invite', {'participants': ['valentin', 'nobody']})
+        self.assertEqual(status, 400)
+        await kate.request('POST', path + '/invite', {'participants': ['valentin']})
+        status, data, _ = await valentin.request('GET', '/notifications')
+        self.assertEqual(len(data['notifications']), 1)
+        self.assertEqual((await valentin.request('GET', '/notifications'))[1], {'notifications': []})
+        self.assertEqual((await valentin.request('PATCH', path, {'title': 'Mine'}))[0], 403)
+        status, event, _ = await valentin.request('POST', path + '/accept')
+        self.assertEqual((status, event['participants']), (200, ['kate', 'valentin']))
+        self.assertEqual((await valentin.request('POST', path + '/accept'))[0], 409)
+        status, data, _ = await kate.request('GET', '/notifications')
+        self.assertIn('valentin', data['notifications'][0]['message'])
+        self.assertEqual((await kate.request('POST', path + '/invite', {'participants': ['valentin']}))[0], 409)
+
+    async def test_tokens_expire(self):
+        self.server.session_ttl = 60
+        with patch('Server.monotonic', return_value=1000):
+            kate = await self.client('kate')
+        with patch('Server.monotonic', return_value=1050):
+            self.assertEqual((await kate.request('GET', '/events'))[0], 200)  # срок продлевается до 1110
+        with patch('Server.monotonic', return_value=1100):
+            self.assertEqual((await kate.request('GET', '/events'))[0], 200)
+        with patch('Server.monotonic', return_value=1200):
+            self.assertEqual((await kate.request('GET', '/events'))[0], 401)
+        self.assertEqual(len(self.server.sessions), 0)
+
+    async def test_conflicts_and_errors(self):
+        kate = await self.client('kate')
+        body = {'title': 'Meeting', 'start_time': '2024-01-01T10:00', 'end_time': '2024-01-01T11:00'}
+        await kate.request('POST', '/events', body)
+        status, data, _ = await kate.request('POST', '/events', {**body, 'check_conflicts': True})
+        self.assertEqual((status, [e['title'] for e in data['conflicts']]), (409, ['Meeting']))
+        self.assertEqual((await kate.request('POST', '/events', {**body, 'end_time': 'tomorrow'}))[0], 400)
+        self.assertEqual((await kate.request('POST', '/events', {**body, 'recurrence': 'hourly'}))[0], 400)
+        self.assertEqual((await kate.request('GET', '/nowhere'))[0], 404)
+        status, data, _ = await kate.request('PUT', '/events')
+        self.assertEqual((status, sorted(data['allowed'])), (405, ['GET', 'POST']))
+        kate.writer.write(b'POST /login HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}')
+        self.assertEqual((await kate.read_response())[0], 400)
+
+    async def test_pipelining_and_keep_alive(self):
+        kate = await self.client('kate')
+        start = datetime(2024, 1, 1, 9)
+        requests = [kate.encode('POST', '/events', {'title': f'Event {i}', 'start_time': start.replace(hour=9 + i).isoformat(),
+                                                    'end_time': start.replace(hour=10 + i).isoformat()})
+                    for i in range(5)]
+        requests.append(kate.encode('GET', '/events?start=2024-01-01T00:00&end=2024-01-01T23:59'))
+        kate.writer.write(b''.join(requests))  # все запросы одной записью, не дожидаясь ответов
+        responses = [await kate.read_response() for _ in requests]
+        self.assertEqual([status for status, _, _ in responses], [201] * 5 + [200])
+        self.assertEqual([e['title'] for e in responses[-1][1]['events']], [f'Event {i}' for i in range(5)])
+        self.assertTrue(all(headers['connection'] == 'keep-alive' for _, _, headers in responses))
+        status, _, headers = await kate.request('GET', '/events', headers={'Connection': 'close'})
+        self.assertEqual((status, headers['connection']), (200, 'close'))
+        self.assertEqual(await kate.reader.read(), b'')  # сервер закрыл соединение
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from Backend import Backend
+from Event import Event
+from Session import Session
+from User import User
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.backend = Backend()
+        self.backend.calendars = {}
+        self.kate = self.backend.open_session()
+        self.valentin = self.backend.open_session()
+        self.kate.create_user('kate', 'Password123')  # регистрация входит в систему в сеансе
+        self.valentin.create_user('valentin', 'Password123')
+
+    def tearDown(self):
+        self.backend.reset()
+
+    def test_sessions_have_own_login(self):
+        self.assertIsInstance(self.kate, Session)
+        self.assertEqual(self.kate.logged_in_user.username, 'kate')
+        self.assertEqual(self.valentin.logged_in_user.username, 'valentin')
+        self.assertIsNone(self.backend.logged_in_user)
+        self.assertIs(self.kate.current_calendar, self.backend.calendars['kate'])
+        self.valentin.logout()
+        self.assertEqual(self.kate.logged_in_user.username, 'kate')
+
+    def test_sessions_share_data(self):
+        event = self.kate.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.kate.invite_participants(event, [self.backend.users['valentin']])
+        self.assertEqual(self.valentin.current_calendar.get_unprocessed_events(), [event])
+        self.valentin.accept_invitation(event)
+        self.assertEqual(self.backend.calendars['valentin'].events, (event,))
+        self.assertEqual(self.backend.calendars['kate'].events, (event,))
+
+    def test_session_holds_only_login(self):
+        with self.assertRaises(AttributeError):
+            self.kate.use_journal = True
+        self.assertFalse(hasattr(self.kate, 'save_calendar_data'))
+        self.assertEqual(self.backend._changed_users, {'kate', 'valentin'})  # состояние Backend остается у Backend
+        with patch.object(self.backend, 'create_event') as create_event:
+            self.kate.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.assertIs(create_event.call_args.kwargs['session'], self.kate)
+
+    def test_reset(self):
+        self.backend.use_journal = True
+        self.backend.reset()
+        self.assertFalse(self.backend.use_journal)
+        self.assertEqual((self.backend.users, self.backend.calendars), ({}, {}))
+        self.assertFalse(User.is_username_taken('kate'))
+        self.assertEqual(len(self.backend._sessions), 0)
+
+    def test_concurrent_sessions(self):
+        sessions = []
+        for i in range(20):
+            session = self.backend.open_session()
+            session.create_user(f'user{i}', 'Password123')
+            sessions.append(session)
+
+        def create_events(session):
+            for i in range(25):
+                session.create_event(f'Event {i}', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+
+        threads = [threading.Thread(target=create_events, args=(session,)) for session in sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for session in sessions:
+            events = self.backend.calendars[session.logged_in_user.username].events
+            self.assertEqual(len(events), 25)
+            self.assertTrue(all(event.organizer is session.logged_in_user for event in events))
+        self.assertEqual(len({event.event_id for event in Event.events_map.values()}), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from Backend import Backend
+from Event import Event
+from SqliteStorage import SqliteStorage
+from Storage import Storage
+from User import User
+
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SqliteStorage(os.path.join(self.tmp.name, 'test.db'))
+        self.backend = Backend()
+        self.backend.storage = self.storage
+        self.backend.calendars = {}
+        self.organizer = self.backend.users['organizer'] = User('organizer', 'Password123')
+        self.participant = self.backend.users['participant'] = User('participant', 'Password123')
+        self.backend.save_user_data()
+        self.backend.logged_in_user = self.organizer
+        self.backend.current_calendar = self.backend.get_calendar(self.organizer)
+
+    def tearDown(self):
+        self.backend.reset()
+        self.storage.close()
+        self.tmp.cleanup()
+
+    def restart(self):
+        """Имитирует перезапуск: в памяти остаются только пользователи."""
+        Event.events_map.clear()
+        self.backend.calendars = {}
+        self.backend.load_calendar_data()
+
+    def test_users_roundtrip(self):
+        self.assertEqual([username for username, _ in self.storage.load_users()], ['organizer', 'participant'])
+
+    def test_calendar_is_loaded_on_demand(self):
+        event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.invite_participants(event, [self.participant])
+        self.backend.save_calendar_data()
+        self.restart()
+        self.assertFalse(self.backend.calendars.is_loaded('participant'))
+        participant_calendar = self.backend.get_calendar(self.participant)
+        self.assertEqual([e.event_id for e in participant_calendar.unprocessed_events], [event.event_id])
+        self.assertEqual([n.status for n in participant_calendar.notifications], ['unread'])
+        self.assertFalse(self.backend.calendars.is_loaded('organizer'))
+
+    def test_accept_and_read_are_persisted(self):
+        event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.invite_participants(event, [self.participant])
+        self.backend.logged_in_user = self.participant
+        self.backend.current_calendar = self.backend.get_calendar(self.participant)
+        self.backend.accept_invitation(event)
+        list(self.backend.get_unread_notifications())
+        self.backend.save_calendar_data()
+        self.restart()
+        participant_calendar = self.backend.get_calendar(self.participant)
+        self.assertEqual([e.event_id for e in participant_calendar.events], [event.event_id])
+        self.assertFalse(participant_calendar.unprocessed_events)
+        self.assertEqual([n.status for n in participant_calendar.notifications], ['read'])
+        self.assertEqual(participant_calendar.events[0].participants, (self.organizer, self.participant))
+
+    def test_read_notifications_are_archived(self):
+        self.backend.notification_retention = 0
+        try:
+            event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+            self.backend.invite_participants(event, [self.participant])
+            self.backend.logged_in_user = self.participant
+            self.backend.current_calendar = self.backend.get_calendar(self.participant)
+            list(self.backend.get_unread_notifications())
+            self.backend.save_calendar_data()
+            self.restart()
+            self.assertFalse(self.backend.get_calendar(self.participant).notifications)
+            self.assertEqual([n.event_id for n in self.backend.get_archived_notifications(self.participant)],
+                             [event.event_id])
+        finally:
+            self.backend.notification_retention = Backend.notification_retention
+
+    def test_range_query_is_pushed_down(self):
+        self.backend.create_event('Past', datetime(2023, 1, 1, 10), datetime(2023, 1, 1, 11), '', 'один раз')
+        self.backend.create_event('Standup', datetime(2023, 6, 1, 9), datetime(2023, 6, 1, 9, 15), '', 'каждый день')
+        self.backend.create_event('Review', datetime(2024, 1, 2, 10), datetime(2024, 1, 2, 11), '', 'один раз')
+        self.backend.save_calendar_data()
+        self.restart()
+        rows = self.storage.events_in_range('organizer', datetime(2024, 1, 2), datetime(2024, 1, 2, 23, 59))
+        self.assertEqual([row['title'] for row in rows], ['Standup', 'Review'])
+        events = self.backend.get_user_events_in_range(self.organizer, datetime(2024, 1, 2), datetime(2024, 1, 2, 23, 59))
+        self.assertEqual(sorted(event.title for day in events.values() for event in day), ['Review', 'Standup'])
+        self.assertFalse(self.backend.calendars.is_loaded('organizer'))
+
+    def test_delete_event(self):
+        event = self.backend.create_event('Meeting', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '', 'один раз')
+        self.backend.save_calendar_data()
+        self.backend.delete_event(event)
+        self.backend.save_calendar_data()
+        self.restart()
+        self.assertFalse(self.backend.get_calendar(self.organizer).events)
+
+    def test_indexes(self):
+        indexes = {row[1] for table in ('calendar_events', 'notifications')
+                   for row in self.storage._connection.execute(f'PRAGMA index_list({table})')}
+        self.assertIn('calendar_events_owner_start', indexes)
+        self.assertIn('notifications_user_status', indexes)
+
+    def test_storage_interface(self):
+        class Incomplete(Storage):
+            def load_users(self):
+                return []
+
+        with self.assertRaises(TypeError):  # остальные методы интерфейса не реализованы
+            Incomplete()
+        self.assertIsInstance(self.storage, Storage)
+
+
+if __name__ == '__main__':
+    unittest.main()
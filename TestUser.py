@@ -9,6 +9,10 @@ class TestUser(unittest.TestCase):
         # This will be called before every test function
         User._usernames.clear()
 
+    def tearDown(self):
+        User._usernames.clear()
+        User._users_by_username.clear()
+
     def test_init(self):
         username = "user1"
         password = "password123"
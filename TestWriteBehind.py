@@ -0,0 +1,143 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+from Backend import Backend
+from Event import Event
+from Notification import Notification
+from User import User
+from WriteBehind import WriteBehind
+
+
+class CountingBackend:
+    """Заменитель Backend, который считает сохранения."""
+
+    def __init__(self, fail=0):
+        self.lock = threading.RLock()
+        self.calendar_saves = 0
+        self.user_saves = 0
+        self.attempts = 0
+        self.fail = fail  # сколько первых сохранений завершится ошибкой
+
+    def save_calendar_data(self):
+        self.attempts += 1
+        if self.fail:
+            self.fail -= 1
+            raise OSError('disk is full')
+        self.calendar_saves += 1
+
+    def save_user_data(self):
+        self.user_saves += 1
+
+
+class TestWriteBehind(unittest.TestCase):
+    def test_changes_are_coalesced_after_delay(self):
+        backend = CountingBackend()
+        persister = WriteBehind(backend, delay=0.1, max_dirty=1000)
+        for _ in range(50):
+            persister.mark_dirty()
+        self.assertEqual(backend.calendar_saves, 0)  # mark_dirty не пишет на диск
+        time.sleep(0.4)
+        self.assertEqual(backend.calendar_saves, 1)
+        self.assertEqual(persister.pending, 0)
+        persister.close()
+
+    def test_threshold_triggers_save(self):
+        backend = CountingBackend()
+        persister = WriteBehind(backend, delay=60, max_dirty=5)
+        for _ in range(5):
+            persister.mark_dirty()
+        for _ in range(100):
+            if backend.calendar_saves:
+                break
+            time.sleep(0.01)
+        self.assertEqual(backend.calendar_saves, 1)
+        persister.close()
+
+    def test_flush_and_close_save_immediately(self):
+        backend = CountingBackend()
+        persister = WriteBehind(backend, delay=60)
+        persister.mark_dirty(users=True)
+        persister.flush()
+        self.assertEqual((backend.calendar_saves, backend.user_saves), (1, 1))
+        persister.flush()  # нечего сохранять
+        self.assertEqual(backend.calendar_saves, 1)
+        persister.mark_dirty()
+        persister.close()
+        self.assertEqual(backend.calendar_saves, 2)
+        with self.assertRaises(RuntimeError):
+            persister.mark_dirty()
+
+    def test_failed_save_is_retried(self):
+        backend = CountingBackend(fail=1)
+        persister = WriteBehind(backend, delay=60)
+        persister.mark_dirty()
+        persister.flush()
+        self.assertEqual(persister.pending, 1)
+        persister.close()
+        self.assertEqual((backend.calendar_saves, persister.pending), (1, 0))
+
+    def test_failed_saves_back_off(self):
+        backend = CountingBackend(fail=1000)
+        persister = WriteBehind(backend, delay=0.05, max_dirty=3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(3):  # порог достигнут - без паузы после ошибки сохранения шли бы подряд
+                persister.mark_dirty()
+            time.sleep(0.5)
+            self.assertLessEqual(backend.attempts, 5)  # 0, 0.05, 0.15, 0.35 с
+            self.assertIsInstance(persister.error, OSError)
+            self.assertEqual(persister.pending, 3)
+            backend.fail = 0
+            persister.close()
+        self.assertEqual((backend.calendar_saves, persister.pending, persister.error), (1, 0, None))
+
+
+class TestWriteBehindBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = Backend()
+        self.backend.calendars_storage_file = os.path.join(self.tmp.name, 'calendars.json')
+        self.backend.users_storage_file = os.path.join(self.tmp.name, 'users.csv')
+        self.backend.calendars = {}
+        self.backend.logged_in_user = User('organizer', 'Password123')
+        self.backend.current_calendar = self.backend.get_calendar(self.backend.logged_in_user)
+
+    def tearDown(self):
+        self.backend.calendars_storage_file = Backend.calendars_storage_file
+        self.backend.users_storage_file = Backend.users_storage_file
+        self.backend.calendars = {}
+        self.backend._calendar_offsets = {}
+        self.backend._event_offsets = {}
+        self.backend.logout()
+        User._usernames.clear()
+        User._users_by_username.clear()
+        Event.events_map.clear()
+        Event.count = 1
+        Event.id_allocator = Notification.id_allocator = None
+        self.tmp.cleanup()
+
+    def test_changes_reach_snapshot(self):
+        persister = WriteBehind(self.backend, delay=0.01)
+
+        def create_events():  # изменения продолжаются во время фоновых сохранений
+            for i in range(200):
+                self.backend.create_event(f'Event {i}', datetime(2024, 1, 1, 10), datetime(2024, 1, 1, 11), '',
+                                          'один раз')
+                persister.mark_dirty()
+
+        writer = threading.Thread(target=create_events)
+        writer.start()
+        writer.join()
+        persister.close()
+        self.backend.calendars = {}
+        self.backend.load_calendar_data()
+        self.assertEqual(len(self.backend.calendars['organizer'].events), 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
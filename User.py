@@ -6,6 +6,7 @@ import uuid
 
 
 class User:
+    __slots__ = ('_username', '_password', '_user_id')
     _users_by_username = {}  # словарь для хранения пользователей по username
     _usernames = set()  # множество на уровне класса для контроля уникальности username
     def __init__(self, username, password):
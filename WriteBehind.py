@@ -0,0 +1,120 @@
+"""
+Отложенное сохранение (write-behind) данных Backend в фоновом потоке.
+Вместо сохранения после каждого действия интерфейс отмечает изменения (mark_dirty), а фоновый поток
+объединяет их в одно сохранение: через delay секунд после первого несохраненного изменения
+или сразу, как только их накопится max_dirty. Диск не входит во время отклика интерфейса.
+Сохранение выполняется под блокировкой Backend.lock, поэтому не пересекается с изменениями данных.
+flush сохраняет все накопленное немедленно (при выходе из аккаунта), close - перед завершением программы
+(вызывается и автоматически, через atexit).
+После неудачного сохранения поток повторяет попытку не сразу, а с растущей паузой (от delay до max_backoff),
+последняя ошибка доступна в error.
+"""
+import atexit
+import threading
+import time
+
+
+class WriteBehind:
+    def __init__(self, backend, delay=2.0, max_dirty=20, max_backoff=60.0):
+        self.backend = backend
+        self.delay = delay  # секунд от первого несохраненного изменения до сохранения
+        self.max_dirty = max_dirty  # количество изменений, после которого сохранение начинается сразу
+        self.max_backoff = max_backoff  # наибольшая пауза перед повтором неудачного сохранения
+        self.error = None  # ошибка последнего сохранения, None - сохранение удалось
+        self._condition = threading.Condition()
+        self._dirty = 0  # несохраненные изменения календарей
+        self._dirty_users = False  # изменились данные пользователей
+        self._first_dirty = None  # время первого несохраненного изменения (time.monotonic)
+        self._saving = False
+        self._failures = 0  # неудачных сохранений подряд
+        self._retry_at = None  # время, раньше которого неудачное сохранение не повторяется
+        self._closed = False
+        self._thread = None
+        atexit.register(self.close)
+
+    def mark_dirty(self, users=False):
+        """Отмечает изменение календарей (и данных пользователей, если users=True), сохранение - позже."""
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Отложенное сохранение уже остановлено.')
+            if not self._dirty and not self._dirty_users:
+                self._first_dirty = time.monotonic()
+            self._dirty += 1
+            self._dirty_users = self._dirty_users or users
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    @property
+    def pending(self):
+        """Количество несохраненных изменений."""
+        with self._condition:
+            return self._dirty
+
+    def flush(self):
+        """Сохраняет все накопленные изменения в вызывающем потоке, дожидаясь окончания фонового сохранения."""
+        with self._condition:
+            while self._saving:
+                self._condition.wait()
+            if self._dirty or self._dirty_users:
+                self._save()
+
+    def close(self):
+        """Сохраняет накопленные изменения и останавливает фоновый поток."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        with self._condition:
+            while True:
+                while not (self._dirty or self._dirty_users or self._closed):
+                    self._condition.wait()
+                if self._closed:
+                    return  # оставшиеся изменения сохраняет close
+                # ждем, пока накопятся изменения: до истечения задержки или порога количества изменений,
+                # но после ошибки - не раньше окончания паузы перед повтором
+                while not self._closed:
+                    deadline = self._retry_at or 0
+                    if self._dirty < self.max_dirty:
+                        deadline = max(deadline, self._first_dirty + self.delay)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._dirty or self._dirty_users:
+                    self._save()
+
+    def _save(self):
+        """Сохраняет изменения, вызывается под self._condition; на время записи блокировка отпускается."""
+        dirty, dirty_users = self._dirty, self._dirty_users
+        self._dirty, self._dirty_users, self._saving = 0, False, True
+        self._condition.release()
+        try:
+            with self.backend.lock:
+                if dirty_users:
+                    self.backend.save_user_data()
+                self.backend.save_calendar_data()
+        except Exception as e:
+            error = e
+        else:
+            error = None
+        finally:
+            self._condition.acquire()
+            self._saving = False
+        self.error = error
+        if error is None:
+            self._failures, self._retry_at = 0, None
+        else:  # не сохраненные из-за ошибки изменения остаются отмеченными, повтор - после паузы
+            self._failures += 1
+            backoff = min(max(self.delay, 0.1) * 2 ** (self._failures - 1), self.max_backoff)
+            self._first_dirty = now = time.monotonic()
+            self._retry_at = now + backoff
+            self._dirty += dirty
+            self._dirty_users = self._dirty_users or dirty_users
+            print(f'Не удалось сохранить данные: {error}. Повтор через {backoff:.1f} с.')
+        self._condition.notify_all()